@@ -21,6 +21,12 @@ sys.path.append(str(Path(__file__).parent.parent))
 from simulation.mc_sim import mc_sim
 from simulation.qmc_sim import qmc_sim
 from var_cvar.var_cvar import var_cvar
+from preprocessing.rolling_moments import cube_moments
+from preprocessing.compute_covariance import rolling_cube
+from preprocessing.storage import load_returns
+from backtesting.kupiec_test import _transition_counts, _independence_lr
+from backtesting.clustering import violation_runs, clustering_summary
+from scipy.stats import chi2
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "data" / "processed"
@@ -50,17 +56,14 @@ def compute_rolling_var(returns, window=252, n_sims=10000, method='mc'):
 
     print(f"Computing rolling VaR ({method})...")
 
-    for t in range(window, n_obs):
-        # Estimate from rolling window
-        window_returns = returns.iloc[t-window:t]
-        mu = window_returns.mean().values
-        cov = window_returns.cov().values
-
+    # Estimate from the precomputed rolling covariance cube
+    cube = rolling_cube(returns, window, path=DATA_PATH)
+    for t, date, mu, cov, L in cube_moments(returns, cube):
         # Simulate scenarios
         if method == 'mc':
-            scenarios = mc_sim(mu, cov, n_sims)
+            scenarios = mc_sim(mu, cov, n_sims, L=L)
         else:
-            scenarios = qmc_sim(mu, cov, n_sims, method=method)
+            scenarios = qmc_sim(mu, cov, n_sims, method=method, L=L)
 
         portfolio_ret = scenarios @ weights
         var_val, _ = var_cvar(portfolio_ret, alpha=0.95)
@@ -69,7 +72,7 @@ def compute_rolling_var(returns, window=252, n_sims=10000, method='mc'):
         actual_ret = actual_returns[t]
         is_violation = 1 if actual_ret < var_val else 0
 
-        dates.append(returns.index[t])
+        dates.append(date)
         var_estimates.append(var_val)
         violations.append(is_violation)
 
@@ -98,40 +101,13 @@ def analyze_violation_clustering(violations_df):
     violations = violations_df['violation'].values
     dates = violations_df['date'].values
 
-    # Find clusters (consecutive violations)
-    clusters = []
-    current_cluster = []
-
-    for i, v in enumerate(violations):
-        if v == 1:
-            current_cluster.append(i)
-        else:
-            if current_cluster:
-                clusters.append(current_cluster)
-                current_cluster = []
-
-    if current_cluster:
-        clusters.append(current_cluster)
-
-    # Statistics
-    if clusters:
-        cluster_sizes = [len(c) for c in clusters]
-        max_cluster = max(cluster_sizes)
-        avg_cluster = np.mean(cluster_sizes)
-        n_clusters = len(clusters)
-
-        # Time between clusters
-        if n_clusters > 1:
-            cluster_starts = [c[0] for c in clusters]
-            gaps = np.diff(cluster_starts)
-            avg_gap = np.mean(gaps)
-        else:
-            avg_gap = np.nan
-    else:
-        max_cluster = 0
-        avg_cluster = 0
-        n_clusters = 0
-        avg_gap = np.nan
+    # Clusters = runs of consecutive violations
+    runs = violation_runs(violations)
+    stats_row = clustering_summary(violations).iloc[0]
+    n_clusters = int(stats_row['n_clusters'])
+    max_cluster = int(stats_row['max_cluster'])
+    avg_cluster = stats_row['avg_cluster']
+    avg_gap = stats_row['avg_gap']
 
     print("\n" + "=" * 60)
     print("Violation Clustering Analysis")
@@ -147,19 +123,27 @@ def analyze_violation_clustering(violations_df):
     print("Major Violation Clusters (size ≥ 3)")
     print("=" * 60)
 
-    for i, cluster in enumerate(clusters):
-        if len(cluster) >= 3:
-            start_date = pd.Timestamp(dates[cluster[0]])
-            end_date = pd.Timestamp(dates[cluster[-1]])
-            size = len(cluster)
-            print(f"Cluster {i+1}: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')} ({size} consecutive days)")
+    for i in np.flatnonzero(runs.lengths >= 3):
+        start_date = pd.Timestamp(dates[runs.starts[i]])
+        end_date = pd.Timestamp(dates[runs.starts[i] + runs.lengths[i] - 1])
+        print(f"Cluster {i+1}: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')} ({runs.lengths[i]} consecutive days)")
+
+    print("\n" + "=" * 60)
+    print("Duration-Based Independence Test (Weibull)")
+    print("=" * 60)
+    print(f"Weibull shape b = {stats_row['weibull_b']:.3f} (b < 1: violations cluster, b = 1: independent)")
+    print(f"Test statistic: LR_dur = {stats_row['LR_dur']:.3f}, p-value: {stats_row['p_dur']:.4f}")
 
     return {
         'n_clusters': n_clusters,
         'max_cluster': max_cluster,
         'avg_cluster': avg_cluster,
         'avg_gap': avg_gap,
-        'clusters': clusters
+        'cluster_starts': runs.starts,
+        'cluster_lengths': runs.lengths,
+        'weibull_b': stats_row['weibull_b'],
+        'LR_dur': stats_row['LR_dur'],
+        'p_dur': stats_row['p_dur']
     }
 
 def plot_violation_timeline(violations_df, output_path):
@@ -229,46 +213,15 @@ def christoffersen_independence_test(violations):
     Returns:
         LR_ind statistic and p-value
     """
-    from scipy.stats import chi2
-
-    # Transition matrix
-    n_00 = n_01 = n_10 = n_11 = 0
-
-    for i in range(len(violations) - 1):
-        if violations[i] == 0 and violations[i+1] == 0:
-            n_00 += 1
-        elif violations[i] == 0 and violations[i+1] == 1:
-            n_01 += 1
-        elif violations[i] == 1 and violations[i+1] == 0:
-            n_10 += 1
-        elif violations[i] == 1 and violations[i+1] == 1:
-            n_11 += 1
+    violations = np.atleast_2d(np.asarray(violations)).astype(bool)
+    n_00, n_01, n_10, n_11 = (int(n[0]) for n in _transition_counts(violations, np.ones_like(violations)))
 
     # Probabilities
-    if (n_00 + n_01) > 0:
-        p_01 = n_01 / (n_00 + n_01)
-    else:
-        p_01 = 0
-
-    if (n_10 + n_11) > 0:
-        p_11 = n_11 / (n_10 + n_11)
-    else:
-        p_11 = 0
-
-    p = (n_01 + n_11) / (n_00 + n_01 + n_10 + n_11)
-
-    # Likelihood ratio
-    def safe_log(x):
-        return np.log(x) if x > 0 else 0
-
-    L_1 = (n_00 * safe_log(1 - p) + n_01 * safe_log(p) +
-           n_10 * safe_log(1 - p) + n_11 * safe_log(p))
-
-    L_2 = (n_00 * safe_log(1 - p_01) + n_01 * safe_log(p_01) +
-           n_10 * safe_log(1 - p_11) + n_11 * safe_log(p_11))
+    p_01 = n_01 / (n_00 + n_01) if (n_00 + n_01) > 0 else 0
+    p_11 = n_11 / (n_10 + n_11) if (n_10 + n_11) > 0 else 0
 
-    LR_ind = -2 * (L_1 - L_2)
-    p_value = 1 - chi2.cdf(LR_ind, df=1)
+    LR_ind = float(_independence_lr(n_00, n_01, n_10, n_11))
+    p_value = chi2.sf(LR_ind, df=1)
 
     print("\n" + "=" * 60)
     print("Christoffersen Independence Test")
@@ -299,7 +252,7 @@ def main():
     print("=" * 60)
 
     # Load data
-    returns = pd.read_csv(DATA_PATH / "returns.csv", index_col=0, parse_dates=True)
+    returns = load_returns(path=DATA_PATH)
     print(f"\nLoaded returns: {returns.shape}")
     print(f"Date range: {returns.index[0]} to {returns.index[-1]}")
 
@@ -326,6 +279,9 @@ def main():
         'max_cluster_size': clustering_stats['max_cluster'],
         'avg_cluster_size': clustering_stats['avg_cluster'],
         'avg_gap_days': clustering_stats['avg_gap'],
+        'weibull_b': clustering_stats['weibull_b'],
+        'LR_dur': clustering_stats['LR_dur'],
+        'p_value_dur': clustering_stats['p_dur'],
         'LR_ind': LR_ind,
         'p_value': p_value,
         'p_violation_given_no_prior': p_01,
@@ -0,0 +1,152 @@
+"""
+Prefix-sum index over VaR violation series
+
+IndexedBacktest stores, per series, the cumulative number of violations
+and of consecutive violation pairs (1 -> 1 transitions). Every count the
+Kupiec and Christoffersen tests need for a window of days [a, b] follows
+from four lookups:
+
+    violations                           = H[b+1] - H[a]
+    n1  (pairs starting with a violation) = H[b] - H[a]
+    n11                                   = P[b] - P[a]
+    n01 = (H[b+1] - H[a+1]) - n11,   n0 = (b - a) - n1
+
+so coverage and independence statistics of any window, or of thousands
+of sliding windows at once, cost O(1) per window and series.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from backtesting.kupiec_test import _kupiec_lr, _independence_lr
+
+class IndexedBacktest:
+    """
+    Violation series of several methods indexed for window queries
+
+    Parameters:
+    -----------
+    violations : array-like, shape (n_series, T) or (T,)
+        Binary violation indicators (1 = violation)
+    dates : array-like of datetime, length T, optional
+        Date of each column, required for date-based queries
+    names : list of str, optional
+        Label of each series
+    """
+
+    def __init__(self, violations, dates=None, names=None):
+        hits = np.atleast_2d(np.asarray(violations)).astype(np.int64)
+        n_series, T = hits.shape
+
+        self.names = list(names) if names is not None else list(range(n_series))
+        self.dates = pd.DatetimeIndex(dates) if dates is not None else None
+        self.n_obs = T
+
+        # H[:, t] = violations among days [0, t)
+        self.cum_hits = np.zeros((n_series, T + 1), dtype=np.int64)
+        np.cumsum(hits, axis=1, out=self.cum_hits[:, 1:])
+
+        # P[:, t] = 1 -> 1 transitions among pairs (j, j+1) with j < t
+        self.cum_pairs = np.zeros((n_series, T), dtype=np.int64)
+        np.cumsum(hits[:, :-1] & hits[:, 1:], axis=1, out=self.cum_pairs[:, 1:])
+
+    @classmethod
+    def from_backtest(cls, df_backtest, methods):
+        """Index the violations (actual_return < VaR) of each {name: VaR column}"""
+        var_estimates = df_backtest[list(methods.values())].values.T
+        hits = df_backtest['actual_return'].values < var_estimates
+        return cls(hits, df_backtest.index, list(methods))
+
+    def positions(self, start, end):
+        """
+        Inclusive position range [a, b] of the days in [start, end]
+
+        Empty ranges come back with b = a - 1.
+        """
+        a = self.dates.searchsorted(pd.to_datetime(start), side='left')
+        b = self.dates.searchsorted(pd.to_datetime(end), side='right') - 1
+        return a, b
+
+    def counts(self, a, b):
+        """
+        Violation and transition counts of the windows [a, b] (inclusive positions)
+
+        a and b may be scalars or equal-length arrays of window bounds.
+
+        Returns:
+        --------
+        counts : dict of ndarray, each shape (n_series, n_windows)
+            n, violations, n00, n01, n10, n11
+        """
+        a = np.atleast_1d(np.asarray(a, dtype=np.int64))
+        b = np.atleast_1d(np.asarray(b, dtype=np.int64))
+
+        # Evaluate empty windows (b < a) as a one-day window, then zero them
+        empty = b < a
+        a = np.minimum(a, self.n_obs - 1)
+        b = np.where(empty, a, b)
+
+        H = self.cum_hits
+        P = self.cum_pairs
+        violations = H[:, b + 1] - H[:, a]
+        n1 = H[:, b] - H[:, a]
+        n11 = P[:, b] - P[:, a]
+        n01 = H[:, b + 1] - H[:, a + 1] - n11
+        n0 = (b - a) - n1
+
+        counts = {
+            'n': np.broadcast_to(b - a + 1, violations.shape),
+            'violations': violations,
+            'n00': n0 - n01,
+            'n01': n01,
+            'n10': n1 - n11,
+            'n11': n11
+        }
+        return {key: np.where(empty, 0, value) for key, value in counts.items()}
+
+    def tests(self, a, b, alpha=0.95):
+        """
+        Kupiec / Christoffersen / conditional coverage tests of the windows [a, b]
+
+        Returns:
+        --------
+        results : dict of ndarray, each shape (n_series, n_windows)
+            Same keys as backtesting.kupiec_test.coverage_tests
+        """
+        c = self.counts(a, b)
+        n = c['n']
+
+        LR_uc = _kupiec_lr(c['violations'], n, alpha)
+        LR_ind = _independence_lr(c['n00'], c['n01'], c['n10'], c['n11'])
+        LR_cc = LR_uc + LR_ind
+
+        return {
+            'n': n,
+            'violations': c['violations'],
+            'violation_rate': np.divide(c['violations'], n, out=np.zeros(n.shape), where=n > 0),
+            'LR_uc': LR_uc,
+            'p_uc': stats.chi2.sf(LR_uc, df=1),
+            'LR_ind': LR_ind,
+            'p_ind': stats.chi2.sf(LR_ind, df=1),
+            'LR_cc': LR_cc,
+            'p_cc': stats.chi2.sf(LR_cc, df=2)
+        }
+
+    def period_tests(self, periods, alpha=0.95):
+        """Tests of date windows given as a list of (start, end)"""
+        bounds = np.array([self.positions(start, end) for start, end in periods], dtype=np.int64)
+        return self.tests(bounds[:, 0], bounds[:, 1], alpha)
+
+    def sliding_tests(self, length, step=1, alpha=0.95):
+        """
+        Tests of every window of `length` days, advancing by `step`
+
+        Returns:
+        --------
+        ends : ndarray
+            Position of the last day of each window
+        results : dict of ndarray, each shape (n_series, n_windows)
+        """
+        a = np.arange(0, self.n_obs - length + 1, step)
+        b = a + length - 1
+        return b, self.tests(a, b, alpha)
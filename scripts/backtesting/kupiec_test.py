@@ -1,6 +1,105 @@
+"""
+VaR backtests: Kupiec unconditional coverage, Christoffersen independence
+and conditional coverage
+
+All likelihoods are evaluated in logs (with 0 * log 0 = 0), so the
+statistics stay finite for histories of any length. coverage_tests runs
+all three tests on a whole (n_series, T) violation matrix at once; the
+single-series functions are thin wrappers around the same kernels.
+"""
+
 import numpy as np
 from scipy import stats
+from scipy.special import xlogy, xlog1py
+from instrumentation import timed
+
+def _bernoulli_loglik(n_fail, n_pass, p):
+    """log(p**n_fail * (1-p)**n_pass), elementwise"""
+    return xlogy(n_fail, p) + xlog1py(n_pass, -p)
+
+def _kupiec_lr(violations, n, alpha):
+    """LR_uc for arrays of violation counts and sample sizes"""
+    violations = np.asarray(violations, dtype=float)
+    n = np.asarray(n, dtype=float)
+    pi = np.divide(violations, n, out=np.zeros_like(violations), where=n > 0)
+    lr = -2 * (_bernoulli_loglik(violations, n - violations, 1 - alpha)
+               - _bernoulli_loglik(violations, n - violations, pi))
+    return np.maximum(lr, 0.0)
+
+def _independence_lr(n00, n01, n10, n11):
+    """LR_ind from first-order transition counts (arrays)"""
+    n0 = n00 + n01
+    n1 = n10 + n11
+    pi_0 = np.divide(n01, n0, out=np.zeros(np.shape(n0)), where=n0 > 0)
+    pi_1 = np.divide(n11, n1, out=np.zeros(np.shape(n1)), where=n1 > 0)
+    n_trans = n0 + n1
+    pi = np.divide(n01 + n11, n_trans, out=np.zeros(np.shape(n_trans)), where=n_trans > 0)
+
+    lr = -2 * (_bernoulli_loglik(n01 + n11, n00 + n10, pi)
+               - _bernoulli_loglik(n01, n00, pi_0)
+               - _bernoulli_loglik(n11, n10, pi_1))
+    return np.maximum(lr, 0.0)
+
+def _transition_counts(hits, valid):
+    """n00, n01, n10, n11 per row, counting only pairs of consecutive valid days"""
+    pair = valid[:, :-1] & valid[:, 1:]
+    prev = hits[:, :-1]
+    nxt = hits[:, 1:]
+    n0 = np.sum(pair & ~prev, axis=1)
+    n1 = np.sum(pair & prev, axis=1)
+    n01 = np.sum(pair & ~prev & nxt, axis=1)
+    n11 = np.sum(pair & prev & nxt, axis=1)
+    return n0 - n01, n01, n1 - n11, n11
+
+@timed('statistical_tests')
+def coverage_tests(violations, alpha=0.95, mask=None):
+    """
+    Kupiec, Christoffersen independence and conditional coverage tests of
+    many violation series in one vectorized pass
 
+    Parameters:
+    -----------
+    violations : array-like, shape (n_series, T) or (T,)
+        Binary violation indicators (1 = violation)
+    alpha : float
+        VaR confidence level
+    mask : array-like of bool, broadcastable to violations, optional
+        Days to include (e.g. one row per sub-period). Transitions are
+        only counted between consecutive days that are both included
+
+    Returns:
+    --------
+    results : dict of ndarray, each shape (n_series,)
+        n, violations, violation_rate, LR_uc, p_uc, LR_ind, p_ind,
+        LR_cc, p_cc
+    """
+    hits = np.atleast_2d(np.asarray(violations)).astype(bool)
+    if mask is None:
+        valid = np.ones_like(hits)
+    else:
+        valid = np.broadcast_to(np.atleast_2d(np.asarray(mask, dtype=bool)), hits.shape)
+    hits = hits & valid
+
+    n = valid.sum(axis=1)
+    count = hits.sum(axis=1)
+
+    LR_uc = _kupiec_lr(count, n, alpha)
+    LR_ind = _independence_lr(*_transition_counts(hits, valid))
+    LR_cc = LR_uc + LR_ind
+
+    return {
+        'n': n,
+        'violations': count,
+        'violation_rate': np.divide(count, n, out=np.zeros(len(n)), where=n > 0),
+        'LR_uc': LR_uc,
+        'p_uc': stats.chi2.sf(LR_uc, df=1),
+        'LR_ind': LR_ind,
+        'p_ind': stats.chi2.sf(LR_ind, df=1),
+        'LR_cc': LR_cc,
+        'p_cc': stats.chi2.sf(LR_cc, df=2)
+    }
+
+@timed('statistical_tests')
 def kupiec_test(violations, n, alpha=0.95):
     """
     Kupiec's unconditional coverage test (LR_uc)
@@ -23,21 +122,12 @@ def kupiec_test(violations, n, alpha=0.95):
     p_value : float
         P-value from chi-squared distribution with 1 df
     """
-    if violations == 0:
-        violations = 1e-10  # Avoid log(0)
-
-    pi = violations / n
-    expected_rate = 1 - alpha
-
-    LR_uc = -2 * (
-        np.log((1-expected_rate)**(n-violations) * expected_rate**violations)
-        - np.log((1-pi)**(n-violations) * pi**violations)
-    )
-
-    p_value = 1 - stats.chi2.cdf(LR_uc, df=1)
+    LR_uc = float(_kupiec_lr(violations, n, alpha))
+    p_value = stats.chi2.sf(LR_uc, df=1)
 
     return LR_uc, p_value
 
+@timed('statistical_tests')
 def christoffersen_test(violations_binary):
     """
     Christoffersen's independence test (LR_ind) and conditional coverage test (LR_cc)
@@ -56,36 +146,15 @@ def christoffersen_test(violations_binary):
     p_value_ind : float
         P-value for independence test
     """
-    violations = np.array(violations_binary)
-
-    # Transition counts
-    n00 = np.sum((violations[:-1] == 0) & (violations[1:] == 0))
-    n01 = np.sum((violations[:-1] == 0) & (violations[1:] == 1))
-    n10 = np.sum((violations[:-1] == 1) & (violations[1:] == 0))
-    n11 = np.sum((violations[:-1] == 1) & (violations[1:] == 1))
-
-    # Transition probabilities
-    pi_0 = n01 / (n00 + n01) if (n00 + n01) > 0 else 0
-    pi_1 = n11 / (n10 + n11) if (n10 + n11) > 0 else 0
-    pi = (n01 + n11) / len(violations)
-
-    # Avoid log(0)
-    if pi_0 == 0: pi_0 = 1e-10
-    if pi_1 == 0: pi_1 = 1e-10
-    if pi == 0: pi = 1e-10
-    if 1 - pi_0 == 0: pi_0 = 1 - 1e-10
-    if 1 - pi_1 == 0: pi_1 = 1 - 1e-10
-    if 1 - pi == 0: pi = 1 - 1e-10
-
-    # Independence test
-    L1 = (1 - pi)**(n00 + n10) * pi**(n01 + n11)
-    L2 = (1 - pi_0)**n00 * pi_0**n01 * (1 - pi_1)**n10 * pi_1**n11
-
-    LR_ind = -2 * np.log(L1 / L2)
-    p_value_ind = 1 - stats.chi2.cdf(LR_ind, df=1)
+    violations = np.atleast_2d(np.asarray(violations_binary)).astype(bool)
+    counts = _transition_counts(violations, np.ones_like(violations))
+
+    LR_ind = float(_independence_lr(*counts)[0])
+    p_value_ind = stats.chi2.sf(LR_ind, df=1)
 
     return LR_ind, p_value_ind
 
+@timed('statistical_tests')
 def conditional_coverage_test(violations_binary, n, alpha=0.95):
     """
     Christoffersen's conditional coverage test (LR_cc = LR_uc + LR_ind)
@@ -114,6 +183,6 @@ def conditional_coverage_test(violations_binary, n, alpha=0.95):
     LR_ind, _ = christoffersen_test(violations_binary)
 
     LR_cc = LR_uc + LR_ind
-    p_value_cc = 1 - stats.chi2.cdf(LR_cc, df=2)
+    p_value_cc = stats.chi2.sf(LR_cc, df=2)
 
     return LR_cc, p_value_cc
@@ -0,0 +1,157 @@
+"""
+Benchmark: incremental rolling_moments vs per-day recomputation and the covariance cube
+
+- accuracy: mean, covariance and Cholesky factor of every window from
+  rolling_moments (rank-1 update/downdate) against a direct .mean(),
+  np.cov and np.linalg.cholesky of the same window, with and without the
+  periodic exact refresh; a [start, stop) slice must match the full pass
+  bit for bit. Any error above tolerance fails the run
+- speed: wall time of one full pass for rolling_moments, per-day
+  recomputation and cube_moments (cube build included)
+
+Usage:
+    python scripts/benchmarks/bench_rolling_moments.py [--check]
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import argparse
+import time
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from preprocessing.rolling_moments import rolling_moments, cube_moments
+from preprocessing.compute_covariance import rolling_cov_cube
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+RESULTS_PATH = PROJECT_ROOT / "results" / "benchmarks"
+
+WINDOW = 252
+
+# Max relative error allowed against the direct window computation
+TOLERANCE = 1e-10
+
+def synthetic_returns(n_obs, d, seed=0):
+    """Correlated daily returns with a volatility regime change halfway"""
+    rng = np.random.default_rng(seed)
+    A = rng.standard_normal((d, d))
+    L = np.linalg.cholesky(A @ A.T / d + np.eye(d)) * 0.01
+    X = rng.standard_normal((n_obs, d)) @ L.T
+    X[n_obs // 2:] *= 3
+    return pd.DataFrame(X, index=pd.bdate_range('2000-01-03', periods=n_obs))
+
+def direct_moments(X, t, window=WINDOW):
+    """Mean, covariance and Cholesky factor of X[t-window:t] computed from scratch"""
+    block = X[t-window:t]
+    cov = np.cov(block, rowvar=False)
+    return block.mean(axis=0), cov, np.linalg.cholesky(cov)
+
+def rel_error(approx, exact):
+    """Max |approx - exact| relative to the largest entry of exact"""
+    return np.max(np.abs(approx - exact)) / np.max(np.abs(exact))
+
+def check_accuracy(shapes=((2000, 3), (2000, 10))):
+    """Max relative error of rolling_moments per (n_obs, d, refresh), with a pass flag"""
+    results = {'n_obs': [], 'd': [], 'refresh': [], 'err_mu': [], 'err_cov': [], 'err_chol': []}
+
+    for n_obs, d in shapes:
+        returns = synthetic_returns(n_obs, d)
+        X = returns.values
+        # Default refresh, and none at all so every day goes through the rank-1 path
+        for refresh in [None, n_obs]:
+            err = np.zeros(3)
+            for m in rolling_moments(returns, WINDOW, refresh=refresh):
+                exact = direct_moments(X, m.t)
+                err = np.maximum(err, [rel_error(a, e) for a, e in zip((m.mu, m.cov, m.chol), exact)])
+
+            results['n_obs'].append(n_obs)
+            results['d'].append(d)
+            results['refresh'].append(WINDOW if refresh is None else refresh)
+            for key, value in zip(['err_mu', 'err_cov', 'err_chol'], err):
+                results[key].append(value)
+
+    df_results = pd.DataFrame(results)
+    df_results['passed'] = df_results[['err_mu', 'err_cov', 'err_chol']].max(axis=1) < TOLERANCE
+    for _, row in df_results.iterrows():
+        status = '✅' if row['passed'] else '❌'
+        print(f"  {status} n_obs={row['n_obs']:,} d={row['d']:<3d} refresh={row['refresh']:<5d} "
+              f"mu={row['err_mu']:.1e}  cov={row['err_cov']:.1e}  chol={row['err_chol']:.1e}")
+    return df_results
+
+def check_slices(n_obs=1000, d=3, refresh=50):
+    """A [start, stop) slice yields bit-identical moments to the full pass"""
+    returns = synthetic_returns(n_obs, d)
+    full = {m.t: m for m in rolling_moments(returns, WINDOW, refresh=refresh)}
+    ok = True
+    for start, stop in [(WINDOW + 1, 400), (437, 611), (700, n_obs)]:
+        for m in rolling_moments(returns, WINDOW, start, stop, refresh=refresh):
+            ref = full[m.t]
+            ok &= all(np.array_equal(a, b) for a, b in zip(m[2:], ref[2:]))
+    print(f"  {'✅' if ok else '❌'} slices match the full pass")
+    return ok
+
+def benchmark_speed(n_obs=2000, d_list=(3, 10, 50)):
+    """Wall time of one full pass of each moment source"""
+    results = {'d': [], 'time_incremental': [], 'time_recompute': [], 'time_cube': []}
+
+    for d in d_list:
+        returns = synthetic_returns(n_obs, d)
+        X = returns.values
+
+        def incremental():
+            for _ in rolling_moments(returns, WINDOW):
+                pass
+
+        def recompute():
+            for t in range(WINDOW, n_obs):
+                direct_moments(X, t)
+
+        def cube():
+            for _ in cube_moments(returns, rolling_cov_cube(returns, WINDOW)):
+                pass
+
+        times = []
+        for func in (incremental, recompute, cube):
+            t_start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t_start)
+
+        results['d'].append(d)
+        results['time_incremental'].append(times[0])
+        results['time_recompute'].append(times[1])
+        results['time_cube'].append(times[2])
+        print(f"  d={d:<3d} incremental={times[0]*1e3:9.2f}ms  recompute={times[1]*1e3:9.2f}ms  "
+              f"cube={times[2]*1e3:9.2f}ms")
+
+    return pd.DataFrame(results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-window moment engine accuracy and speed")
+    parser.add_argument('--check', action='store_true',
+                        help="only run the accuracy checks (exit status 1 on failure)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Rolling Moments Benchmark")
+    print("=" * 60)
+
+    print(f"\nAccuracy against direct window moments (tol {TOLERANCE:.0e}):")
+    df_accuracy = check_accuracy()
+    slices_ok = check_slices()
+    if not (df_accuracy['passed'].all() and slices_ok):
+        raise SystemExit("\n❌ Rolling moments check failed")
+    print("\n✅ All rolling moments checks passed")
+    if args.check:
+        return
+
+    print("\nFull pass over 2,000 days:")
+    df_speed = benchmark_speed()
+
+    RESULTS_PATH.mkdir(parents=True, exist_ok=True)
+    df_accuracy.to_csv(RESULTS_PATH / "rolling_moments_accuracy.csv", index=False)
+    df_speed.to_csv(RESULTS_PATH / "rolling_moments_speed.csv", index=False)
+    print(f"\nResults saved to: {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Benchmark: inverse-CDF transforms of simulation.transforms vs scipy
+
+- accuracy: max relative error of inverse_normal (ndtri / Acklam), the
+  tabulated inverse_t and mixing_scale against scipy over uniform points
+  and far-tail probabilities; any error above its tolerance (or a scalar
+  input that does not match the array result) fails the run
+- speed: best wall time per transform for several n
+- experiment: wall time of robustness_tdist.run_tdist_experiment (with
+  independent t marginals) using the tabulated inverse t and with
+  scipy.stats.t.ppf swapped back in
+
+Usage:
+    python scripts/benchmarks/bench_transforms.py [--check]
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from functools import partial
+from unittest import mock
+import tempfile
+import time
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+import argparse
+from scipy.special import ndtri
+from scipy.stats import norm, chi2
+from scipy.stats import t as student_t
+from simulation.transforms import inverse_normal, inverse_t, acklam_ndtri, mixing_scale
+from preprocessing.storage import load_returns
+from experiments.robustness_tdist import run_tdist_experiment
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_PATH = PROJECT_ROOT / "data" / "processed"
+RESULTS_PATH = PROJECT_ROOT / "results" / "benchmarks"
+RESULTS_PATH.mkdir(parents=True, exist_ok=True)
+
+DFS = [1, 2.5, 3, 4, 5, 10, 30, 100]
+
+# Max relative error allowed against the scipy reference
+TOLERANCES = {
+    'inverse_normal (ndtri)': 1e-15,
+    'inverse_normal (acklam)': 1e-13,
+    'inverse_t': 1e-9,
+    'mixing_scale': 1e-9
+}
+
+# Modules that bind inverse_t at import time, patched for the scipy reference run
+INVERSE_T_USERS = ['simulation.qmc_cache.inverse_t', 'simulation.portfolio_sim.inverse_t']
+
+def best_time(func, repeats):
+    """Best wall time of `repeats` calls"""
+    times = []
+    for _ in range(repeats):
+        t_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t_start)
+    return min(times)
+
+def test_points(n=1_000_000, seed=0):
+    """Uniform points plus log-spaced probabilities down to 1e-15 in both tails"""
+    u = np.random.default_rng(seed).random(n)
+    tails = np.logspace(-15, -1, 10_000)
+    return np.concatenate([u, tails, 1 - tails])
+
+def max_rel_error(approx, exact):
+    """Max of |approx - exact| / max(1, |exact|)"""
+    return np.max(np.abs(approx - exact) / np.maximum(1.0, np.abs(exact)))
+
+def check_accuracy():
+    """Max relative error of every transform against scipy, with its tolerance"""
+    u = test_points()
+    results = {'transform': [], 'df': [], 'max_rel_error': [], 'tolerance': []}
+
+    def record(name, df, approx, exact):
+        results['transform'].append(name)
+        results['df'].append(df)
+        results['max_rel_error'].append(max_rel_error(approx, exact))
+        results['tolerance'].append(TOLERANCES[name])
+
+    z = ndtri(u)
+    record('inverse_normal (ndtri)', np.inf, inverse_normal(u), norm.ppf(u))
+    record('inverse_normal (acklam)', np.inf, acklam_ndtri(u), z)
+
+    for df in DFS:
+        record('inverse_t', df, inverse_t(u, df), student_t.ppf(u, df))
+        record('mixing_scale', df, mixing_scale(u, df), np.sqrt(df / chi2.ppf(u, df)))
+
+    df_results = pd.DataFrame(results)
+    df_results['passed'] = df_results['max_rel_error'] < df_results['tolerance']
+    for _, row in df_results.iterrows():
+        status = '✅' if row['passed'] else '❌'
+        print(f"  {status} {row['transform']:26s} df={row['df']:<6g} "
+              f"max rel error={row['max_rel_error']:.2e} (tol {row['tolerance']:.0e})")
+    return df_results
+
+def check_scalars(u=0.3, df=5):
+    """Scalar inputs give the same value as a one-element array; returns the failing names"""
+    cases = {
+        'inverse_normal (acklam)': lambda x: inverse_normal(x, method='acklam'),
+        'inverse_t': lambda x: inverse_t(x, df),
+        'mixing_scale': lambda x: mixing_scale(x, df)
+    }
+    failed = []
+    for name, func in cases.items():
+        try:
+            ok = np.ndim(func(u)) == 0 and func(u) == func(np.array([u]))[0]
+        except (TypeError, ValueError):
+            ok = False
+        print(f"  {'✅' if ok else '❌'} {name:26s} scalar input")
+        if not ok:
+            failed.append(name)
+    return failed
+
+def benchmark_speed(n_list, df=5):
+    """Best time of scipy and simulation.transforms for n uniform points"""
+    results = {
+        'transform': [],
+        'n': [],
+        'time_scipy': [],
+        'time_fast': [],
+        'speedup': []
+    }
+
+    for n in n_list:
+        u = np.random.default_rng(0).random(n)
+        repeats = max(3, min(50, int(1e7 // n)))
+        inverse_t(u[:1], df)  # build the table outside the timing
+
+        cases = {
+            'inverse_normal (ndtri)': (lambda: norm.ppf(u), lambda: inverse_normal(u)),
+            'inverse_normal (acklam)': (lambda: norm.ppf(u), lambda: inverse_normal(u, method='acklam')),
+            f'inverse_t (df={df})': (lambda: student_t.ppf(u, df), lambda: inverse_t(u, df))
+        }
+
+        print(f"\nn={n:,}")
+        for name, (reference, fast) in cases.items():
+            t_ref = best_time(reference, repeats)
+            t_new = best_time(fast, repeats)
+
+            results['transform'].append(name)
+            results['n'].append(n)
+            results['time_scipy'].append(t_ref)
+            results['time_fast'].append(t_new)
+            results['speedup'].append(t_ref / t_new)
+
+            print(f"  {name:24s}: scipy={t_ref*1e3:9.3f}ms  fast={t_new*1e3:9.3f}ms  "
+                  f"speedup={t_ref/t_new:5.2f}x")
+
+    return pd.DataFrame(results)
+
+def benchmark_tdist_experiment(returns, df=5, n_sims=10000, n_runs=20):
+    """Wall time of run_tdist_experiment with the tabulated and the scipy inverse t"""
+    def run():
+        np.random.seed(42)
+        # Keep the experiment's own CSV out of results/simulation
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('experiments.robustness_tdist.RESULTS_PATH', Path(tmp)):
+            t_start = time.perf_counter()
+            run_tdist_experiment(returns, df=df, n_sims=n_sims, n_runs=n_runs, distribution='t')
+            return time.perf_counter() - t_start
+
+    t_fast = run()
+
+    scipy_t = partial(inverse_t, exact=True)
+    with mock.patch(INVERSE_T_USERS[0], scipy_t), mock.patch(INVERSE_T_USERS[1], scipy_t):
+        t_ref = run()
+
+    return pd.DataFrame({
+        'df': [df],
+        'n_sims': [n_sims],
+        'n_runs': [n_runs],
+        'time_scipy': [t_ref],
+        'time_fast': [t_fast],
+        'speedup': [t_ref / t_fast]
+    })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inverse-CDF transform accuracy and speed")
+    parser.add_argument('--check', action='store_true',
+                        help="only run the accuracy checks (exit status 1 on failure)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Inverse-CDF Transform Benchmark")
+    print("=" * 60)
+
+    print("\nAccuracy against scipy:")
+    df_accuracy = check_accuracy()
+    failed = list(df_accuracy.loc[~df_accuracy['passed'], 'transform'].unique())
+    failed += check_scalars()
+    if failed:
+        raise SystemExit(f"\n❌ Accuracy check failed: {', '.join(failed)}")
+    print("\n✅ All accuracy checks passed")
+    if args.check:
+        return
+
+    df_speed = benchmark_speed([10_000, 100_000, 1_000_000])
+
+    df_accuracy.to_csv(RESULTS_PATH / "transforms_accuracy.csv", index=False)
+    df_speed.to_csv(RESULTS_PATH / "transforms_speed.csv", index=False)
+
+    if (DATA_PATH / "returns.csv").exists():
+        returns = load_returns(path=DATA_PATH)
+        df_experiment = benchmark_tdist_experiment(returns)
+        t_ref, t_new = df_experiment.loc[0, ['time_scipy', 'time_fast']]
+        print(f"\nrun_tdist_experiment: scipy={t_ref:.2f}s  fast={t_new:.2f}s  "
+              f"speedup={t_ref/t_new:.2f}x")
+        df_experiment.to_csv(RESULTS_PATH / "transforms_tdist_experiment.csv", index=False)
+    else:
+        print("\n⚠️  returns.csv not found, skipping run_tdist_experiment timing")
+
+    print(f"\nResults saved to: {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()
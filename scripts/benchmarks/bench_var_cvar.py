@@ -0,0 +1,111 @@
+"""
+Benchmark: selection-based tail_stats vs the original np.quantile + mask var_cvar
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import time
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from var_cvar.var_cvar import tail_stats
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+RESULTS_PATH = PROJECT_ROOT / "results" / "benchmarks"
+RESULTS_PATH.mkdir(parents=True, exist_ok=True)
+
+def var_cvar_quantile(losses, alpha=0.95):
+    """Original implementation: full np.quantile plus boolean tail mask"""
+    VaR = np.quantile(losses, 1 - alpha)
+    CVaR = losses[losses <= VaR].mean()
+    return VaR, CVaR
+
+def best_time(func, repeats):
+    """Best wall time of `repeats` calls"""
+    times = []
+    for _ in range(repeats):
+        t_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t_start)
+    return min(times)
+
+def benchmark_var_cvar(n_sims_list, alphas=(0.95, 0.975, 0.99), n_runs=50, seed=0):
+    """
+    Time the quantile/mask implementation against tail_stats
+
+    For each n_sims three cases are timed:
+    - single: one series, one alpha
+    - alphas: one series, all alphas
+    - batch: n_runs series, all alphas (tail_stats batch axis vs Python loop)
+    """
+    rng = np.random.default_rng(seed)
+
+    results = {
+        'n_sims': [],
+        'case': [],
+        'time_quantile': [],
+        'time_tail_stats': [],
+        'speedup': [],
+        'max_abs_diff': []
+    }
+
+    for n_sims in n_sims_list:
+        print(f"\nn_sims={n_sims:,}")
+        repeats = max(3, min(50, int(1e7 // n_sims)))
+        # Keep the batch case within ~400 MB
+        batch_runs = max(1, min(n_runs, int(5e7 // n_sims)))
+
+        losses = rng.standard_normal(n_sims) * 0.01
+        batch = rng.standard_normal((batch_runs, n_sims)) * 0.01
+
+        cases = {
+            'single': (
+                lambda: var_cvar_quantile(losses, alphas[0]),
+                lambda: tail_stats(losses, alphas[0])
+            ),
+            'alphas': (
+                lambda: [var_cvar_quantile(losses, a) for a in alphas],
+                lambda: tail_stats(losses, alphas)
+            ),
+            'batch': (
+                lambda: [[var_cvar_quantile(row, a) for a in alphas] for row in batch],
+                lambda: tail_stats(batch, alphas)
+            )
+        }
+
+        for case, (reference, kernel) in cases.items():
+            t_ref = best_time(reference, repeats)
+            t_new = best_time(kernel, repeats)
+
+            ref_val = np.array(reference(), dtype=float).reshape(-1, 2)
+            var_new, cvar_new = kernel()
+            new_val = np.column_stack([np.ravel(var_new), np.ravel(cvar_new)])
+            max_diff = np.max(np.abs(ref_val - new_val))
+
+            results['n_sims'].append(n_sims)
+            results['case'].append(case)
+            results['time_quantile'].append(t_ref)
+            results['time_tail_stats'].append(t_new)
+            results['speedup'].append(t_ref / t_new)
+            results['max_abs_diff'].append(max_diff)
+
+            print(f"  {case:7s}: quantile={t_ref*1e3:9.3f}ms  tail_stats={t_new*1e3:9.3f}ms  "
+                  f"speedup={t_ref/t_new:5.2f}x  max|diff|={max_diff:.1e}")
+
+    return pd.DataFrame(results)
+
+def main():
+    print("=" * 60)
+    print("VaR/CVaR Kernel Benchmark")
+    print("=" * 60)
+
+    n_sims_list = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+    df_results = benchmark_var_cvar(n_sims_list)
+
+    output_path = RESULTS_PATH / "var_cvar_kernel.csv"
+    df_results.to_csv(output_path, index=False)
+    print(f"\nResults saved to: {output_path}")
+
+if __name__ == "__main__":
+    main()
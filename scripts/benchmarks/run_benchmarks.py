@@ -0,0 +1,336 @@
+"""
+Benchmark suite for the simulation, risk and backtest hot paths
+
+Times each kernel in isolation over a grid of n_sims and d, records
+throughput (paths/sec, days/sec), peak traced memory and a seeded result
+value, and appends the run to a JSON history so regressions can be compared
+commit to commit.
+
+Usage:
+    python scripts/benchmarks/run_benchmarks.py [--quick] [--filter NAME]
+                                                [--repeats N] [--no-save]
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+import scipy
+from simulation.mc_sim import mc_sim
+from simulation.qmc_sim import qmc_sim
+from simulation.tdist_sim import mc_sim_tdist, qmc_sim_tdist
+from simulation.portfolio_sim import simulate_portfolio_returns
+from simulation.factorization import batched_cholesky
+from simulation.transforms import inverse_normal, inverse_t
+from var_cvar.var_cvar import var_cvar
+from backtesting.kupiec_test import (kupiec_test, christoffersen_test, conditional_coverage_test,
+                                     coverage_tests)
+from experiments.stress_backtesting import _backtest_days
+from preprocessing.storage import load_returns
+from preprocessing.compute_covariance import rolling_cov_cube, ewma_cov_cube
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_PATH = PROJECT_ROOT / "data" / "processed"
+RESULTS_PATH = PROJECT_ROOT / "results" / "benchmarks"
+HISTORY_FILE = RESULTS_PATH / "benchmark_history.json"
+
+# Relative slowdown reported as a regression when comparing runs
+REGRESSION_THRESHOLD = 1.2
+
+FULL_GRID = {
+    'n_sims': [1_000, 10_000, 100_000],
+    'd': [3, 10, 50],
+    'n_obs': [1_000, 10_000]
+}
+
+QUICK_GRID = {
+    'n_sims': [1_000, 10_000],
+    'd': [3, 10],
+    'n_obs': [1_000]
+}
+
+def synthetic_params(d, seed=0):
+    """Reproducible mean vector and positive definite covariance of dimension d"""
+    rng = np.random.default_rng(seed)
+    mu = rng.uniform(0.0001, 0.0003, d)
+    vol = rng.uniform(0.01, 0.03, d)
+    A = rng.standard_normal((d, d))
+    corr = A @ A.T + d * np.eye(d)
+    scale = 1 / np.sqrt(np.diag(corr))
+    corr = corr * np.outer(scale, scale)
+    cov = corr * np.outer(vol, vol)
+    return mu, cov
+
+def measure(func, repeats):
+    """
+    Best wall time over `repeats` calls, plus peak traced memory of one call
+
+    Memory is measured in a separate call because tracemalloc slows
+    allocation-heavy code and would distort the timing.
+    """
+    func()  # warm-up (imports, caches, page faults)
+
+    times = []
+    for _ in range(repeats):
+        t_start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t_start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak, result
+
+def _scalar(value):
+    """First element of a benchmark result as a JSON-safe float"""
+    value = float(np.ravel(value)[0])
+    return value if np.isfinite(value) else None
+
+def simulation_cases(grid):
+    """(name, params, func, units) for every simulator on the n_sims x d grid"""
+    cases = []
+    for d in grid['d']:
+        mu, cov = synthetic_params(d)
+        weights = np.ones(d) / d
+        for n_sims in grid['n_sims']:
+            params = {'n_sims': n_sims, 'd': d}
+            # Each result is the simulated portfolio mean (a seeded checksum)
+            cases += [
+                ('mc_sim', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights: mc_sim(mu, cov, n, rng=0) @ w, n_sims),
+                ('qmc_sim_sobol', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights:
+                     qmc_sim(mu, cov, n, method='sobol', rng=0) @ w, n_sims),
+                ('qmc_sim_halton', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights:
+                     qmc_sim(mu, cov, n, method='halton', rng=0) @ w, n_sims),
+                ('mc_sim_tdist', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights: mc_sim_tdist(mu, cov, n, rng=0) @ w, n_sims),
+                ('qmc_sim_tdist', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights: qmc_sim_tdist(mu, cov, n, rng=0) @ w, n_sims),
+                ('mc_sim_tdist_marginal', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights:
+                     mc_sim_tdist(mu, cov, n, rng=0, multivariate=False) @ w, n_sims),
+                ('qmc_sim_tdist_marginal', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights:
+                     qmc_sim_tdist(mu, cov, n, rng=0, multivariate=False) @ w, n_sims),
+                ('simulate_portfolio_returns', params,
+                 lambda mu=mu, cov=cov, n=n_sims, w=weights:
+                     simulate_portfolio_returns(mu, cov, w, n, rng=0), n_sims),
+            ]
+    return cases
+
+def transform_cases(grid):
+    """Inverse normal and inverse t (df=5) of n_sims x d uniform points"""
+    cases = []
+    for d in grid['d']:
+        for n_sims in grid['n_sims']:
+            u = np.random.default_rng(0).random((n_sims, d))
+            params = {'n_sims': n_sims, 'd': d}
+            cases += [
+                ('inverse_normal', params, lambda u=u: inverse_normal(u), n_sims),
+                ('inverse_t', params, lambda u=u: inverse_t(u, 5), n_sims),
+            ]
+    return cases
+
+def risk_cases(grid):
+    """var_cvar on simulated portfolio returns for every n_sims"""
+    rng = np.random.default_rng(0)
+    cases = []
+    for n_sims in grid['n_sims']:
+        losses = rng.standard_normal(n_sims) * 0.01
+        cases.append(('var_cvar', {'n_sims': n_sims},
+                      lambda x=losses: var_cvar(x, 0.95)[0], n_sims))
+    return cases
+
+def backtest_test_cases(grid):
+    """Kupiec / Christoffersen tests on Bernoulli violation sequences"""
+    rng = np.random.default_rng(0)
+    cases = []
+    for n_obs in grid['n_obs']:
+        hits = (rng.random(n_obs) < 0.05).astype(int)
+        params = {'n_obs': n_obs}
+        cases += [
+            ('kupiec_test', params, lambda h=hits: kupiec_test(h.sum(), len(h))[0], n_obs),
+            ('christoffersen_test', params, lambda h=hits: christoffersen_test(h)[0], n_obs),
+            ('conditional_coverage_test', params,
+             lambda h=hits: conditional_coverage_test(h, len(h))[0], n_obs),
+        ]
+        # All three tests on 300 series (methods x portfolios x periods) at once
+        many = (rng.random((300, n_obs)) < 0.05).astype(int)
+        cases.append(('coverage_tests_300', params,
+                      lambda h=many: coverage_tests(h)['LR_cc'][0], 300 * n_obs))
+    return cases
+
+def covariance_cases(grid):
+    """Rolling (window 252) and EWMA covariance cubes of synthetic return histories and their factors"""
+    cases = []
+    for d in grid['d']:
+        mu, cov = synthetic_params(d)
+        for n_obs in grid['n_obs']:
+            returns = pd.DataFrame(np.random.default_rng(0).multivariate_normal(mu, cov, n_obs),
+                                   index=pd.bdate_range('2000-01-03', periods=n_obs))
+            params = {'n_obs': n_obs, 'd': d}
+            cases += [
+                ('rolling_cov_cube', params,
+                 lambda r=returns: rolling_cov_cube(r, 252).cube[-1, 0], n_obs),
+                ('ewma_cov_cube', params,
+                 lambda r=returns: ewma_cov_cube(r).cube[-1, 0], n_obs),
+                ('batched_cholesky', params,
+                 lambda c=rolling_cov_cube(returns, 252).cube: batched_cholesky(c)[-1, 0, 0],
+                 n_obs - 251),
+            ]
+    return cases
+
+def backtest_day_cases(grid):
+    """One rolling-backtest day (moments + MC/Sobol/Halton VaR) on the real data"""
+    returns = load_returns(path=DATA_PATH)
+    weights = np.ones(returns.shape[1]) / returns.shape[1]
+    window = 252
+    cube = rolling_cov_cube(returns, window)
+    cases = []
+    for n_sims in grid['n_sims']:
+        cases.append(('rolling_backtest_day', {'n_sims': n_sims, 'd': returns.shape[1]},
+                      lambda n=n_sims: _backtest_days(returns, weights, cube, 0.95, n, None,
+                                                      'pcg64', window, window + 1, 0)[0][2], 1))
+    return cases
+
+def run_benchmarks(grid, repeats=5, name_filter=None):
+    """
+    Run every benchmark case
+
+    Returns:
+    --------
+    records : list of dict
+        One record per (benchmark, params) with time, throughput, unit,
+        peak memory and result
+    """
+    cases = (simulation_cases(grid) + transform_cases(grid) + risk_cases(grid)
+             + backtest_test_cases(grid) + covariance_cases(grid))
+    if (DATA_PATH / "returns.csv").exists():
+        cases += backtest_day_cases(grid)
+    else:
+        print("⚠️  returns.csv not found, skipping rolling_backtest_day")
+
+    records = []
+    for name, params, func, units in cases:
+        if name_filter and name_filter not in name:
+            continue
+
+        elapsed, peak, result = measure(func, repeats)
+        unit = 'days/sec' if name == 'rolling_backtest_day' else (
+            'obs/sec' if 'n_obs' in params else 'paths/sec')
+
+        records.append({
+            'name': name,
+            'params': params,
+            'time_s': elapsed,
+            'throughput': units / elapsed,
+            'unit': unit,
+            'peak_mem_mb': peak / 2**20,
+            'result': _scalar(result)
+        })
+
+        param_str = ", ".join(f"{k}={v:,}" for k, v in params.items())
+        print(f"  {name:28s} {param_str:24s} {elapsed*1e3:10.3f}ms  "
+              f"{units/elapsed:14,.0f} {unit:9s}  peak={peak/2**20:8.2f}MB")
+
+    return records
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path=HISTORY_FILE):
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_run(run, path=HISTORY_FILE):
+    """Append one benchmark run to the JSON history"""
+    history = load_history(path)
+    history.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+def compare_runs(previous, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Print time ratios current / previous for benchmarks present in both runs
+
+    Returns:
+    --------
+    regressions : list of (name, params, ratio) slower than threshold
+    """
+    key = lambda r: (r['name'], json.dumps(r['params'], sort_keys=True))
+    before = {key(r): r for r in previous['results']}
+
+    print(f"\nComparison with {previous.get('commit')} ({previous['timestamp']}):")
+    regressions = []
+    for r in current['results']:
+        if key(r) not in before:
+            continue
+        ratio = r['time_s'] / before[key(r)]['time_s']
+        if ratio > threshold:
+            regressions.append((r['name'], r['params'], ratio))
+            print(f"  ❌ {r['name']} {r['params']}: {ratio:.2f}x slower")
+
+    if not regressions:
+        print(f"  ✅ No benchmark slower than {threshold:.1f}x")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation / risk / backtest benchmarks")
+    parser.add_argument('--quick', action='store_true', help="small grid for a fast check")
+    parser.add_argument('--repeats', type=int, default=5, help="timed calls per case (best is kept)")
+    parser.add_argument('--filter', default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument('--no-save', action='store_true', help="do not append to the JSON history")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Benchmark Suite")
+    print("=" * 60)
+
+    grid = QUICK_GRID if args.quick else FULL_GRID
+    records = run_benchmarks(grid, repeats=args.repeats, name_filter=args.filter)
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'machine': platform.machine(),
+        'grid': 'quick' if args.quick else 'full',
+        'repeats': args.repeats,
+        'results': records
+    }
+
+    history = load_history()
+    comparable = [r for r in history if r.get('grid') == run['grid']]
+    if comparable:
+        compare_runs(comparable[-1], run)
+
+    if not args.no_save:
+        save_run(run)
+        print(f"\nResults appended to: {HISTORY_FILE}")
+
+if __name__ == "__main__":
+    main()
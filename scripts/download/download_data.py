@@ -20,15 +20,27 @@ tickers = {
 start = "2018-01-01"
 end   = "2024-12-31"
 
-def main():
+def download_prices(tickers=tickers, start=start, end=end):
+    """Download daily price history for every ticker as {name: DataFrame}"""
+    frames = {}
     for name, tkr in tickers.items():
         print(f"Downloading {name}...")
         df = yf.download(tkr, start=start, end=end, progress=False)
         # Flatten multi-index columns if present
         if isinstance(df.columns, pd.MultiIndex):
             df.columns = df.columns.get_level_values(0)
-        df.to_csv(DATA_PATH / f"{name}.csv")
+        frames[name] = df
+    return frames
+
+def save_raw(frames, path=DATA_PATH):
+    """Write each price frame to <path>/<name>.csv"""
+    os.makedirs(path, exist_ok=True)
+    for name, df in frames.items():
+        df.to_csv(path / f"{name}.csv")
         print(f"  Saved {name}: {df.shape[0]} rows")
+
+def main():
+    save_raw(download_prices())
     print("데이터 다운로드 완료!")
 
 if __name__ == "__main__":
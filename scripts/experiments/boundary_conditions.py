@@ -11,16 +11,19 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from simulation.mc_sim import mc_sim
-from simulation.qmc_sim import qmc_sim
-from var_cvar.var_cvar import var_cvar
+from simulation.batch_sim import simulate_batch
+from simulation.scenario_store import stored_scenarios
+from simulation.factorization import nearest_psd
+from var_cvar.var_cvar import var_cvar, tail_stats
+from instrumentation import stage, timed
+from preprocessing.storage import load_returns
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "data" / "processed"
 RESULTS_PATH = PROJECT_ROOT / "results" / "simulation"
 RESULTS_PATH.mkdir(parents=True, exist_ok=True)
 
-def test_dimension_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95):
+def test_dimension_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95, alphas=None):
     """
     Test: How does asset dimension affect MC vs QMC performance?
 
@@ -31,9 +34,11 @@ def test_dimension_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95
     print("=" * 60)
 
     dimensions = [2, 3, 5, 10, 15]
+    levels = np.atleast_1d(alpha if alphas is None else alphas)
     results = {
         'dimension': [],
         'method': [],
+        'alpha': [],
         'var_std': [],
         'var_rmse': [],
         'relative_efficiency': []
@@ -59,54 +64,41 @@ def test_dimension_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95
         weights = np.ones(d) / d
 
         # Compute reference VaR
-        portfolio_returns_ref = []
-        for _ in range(10):
-            scenarios = mc_sim(mu, cov, 50000)
-            portfolio_returns_ref.extend(scenarios @ weights)
-        var_ref, _ = var_cvar(np.array(portfolio_returns_ref), alpha)
+        portfolio_returns_ref = stored_scenarios(mu, cov, 500000, generator='mc', weights=weights)
+        var_ref, _ = var_cvar(portfolio_returns_ref, levels)
 
         # Test MC
-        vars_mc = []
-        for _ in range(n_runs):
-            scenarios = mc_sim(mu, cov, n_sims)
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha)
-            vars_mc.append(var_val)
-
-        mc_std = np.std(vars_mc)
-        mc_rmse = np.sqrt(np.mean((np.array(vars_mc) - var_ref)**2))
-
-        results['dimension'].append(d)
-        results['method'].append('MC')
-        results['var_std'].append(mc_std)
-        results['var_rmse'].append(mc_rmse)
-        results['relative_efficiency'].append(1.0)
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs, method='mc', weights=weights)
+        vars_mc, _ = tail_stats(portfolio_ret, levels)
 
         # Test QMC-Sobol
-        vars_qmc = []
-        for _ in range(n_runs):
-            scenarios = qmc_sim(mu, cov, n_sims, method='sobol')
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha)
-            vars_qmc.append(var_val)
-
-        qmc_std = np.std(vars_qmc)
-        qmc_rmse = np.sqrt(np.mean((np.array(vars_qmc) - var_ref)**2))
-        efficiency = mc_std / qmc_std
-
-        results['dimension'].append(d)
-        results['method'].append('QMC-Sobol')
-        results['var_std'].append(qmc_std)
-        results['var_rmse'].append(qmc_rmse)
-        results['relative_efficiency'].append(efficiency)
-
-        print(f"  MC   Std: {mc_std:.6f}, RMSE: {mc_rmse:.6f}")
-        print(f"  QMC  Std: {qmc_std:.6f}, RMSE: {qmc_rmse:.6f}")
-        print(f"  Efficiency Gain: {(efficiency - 1) * 100:.2f}%")
-
-    return pd.DataFrame(results)
-
-def test_volatility_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95):
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs, method='sobol', weights=weights)
+        vars_qmc, _ = tail_stats(portfolio_ret, levels)
+
+        for j, level in enumerate(levels):
+            mc_std = np.std(vars_mc[:, j])
+            mc_rmse = np.sqrt(np.mean((vars_mc[:, j] - var_ref[j])**2))
+            qmc_std = np.std(vars_qmc[:, j])
+            qmc_rmse = np.sqrt(np.mean((vars_qmc[:, j] - var_ref[j])**2))
+            efficiency = mc_std / qmc_std
+
+            results['dimension'].extend([d, d])
+            results['method'].extend(['MC', 'QMC-Sobol'])
+            results['alpha'].extend([level, level])
+            results['var_std'].extend([mc_std, qmc_std])
+            results['var_rmse'].extend([mc_rmse, qmc_rmse])
+            results['relative_efficiency'].extend([1.0, efficiency])
+
+            print(f"  [{level:.1%}] MC   Std: {mc_std:.6f}, RMSE: {mc_rmse:.6f}")
+            print(f"  [{level:.1%}] QMC  Std: {qmc_std:.6f}, RMSE: {qmc_rmse:.6f}")
+            print(f"  [{level:.1%}] Efficiency Gain: {(efficiency - 1) * 100:.2f}%")
+
+    df_results = pd.DataFrame(results)
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
+    return df_results
+
+def test_volatility_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95, alphas=None):
     """
     Test: How does volatility level affect MC vs QMC performance?
 
@@ -117,9 +109,11 @@ def test_volatility_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.9
     print("=" * 60)
 
     vol_scales = [0.5, 1.0, 1.5, 2.0, 3.0]  # Scale volatility
+    levels = np.atleast_1d(alpha if alphas is None else alphas)
     results = {
         'vol_scale': [],
         'method': [],
+        'alpha': [],
         'var_std': [],
         'relative_efficiency': []
     }
@@ -133,50 +127,38 @@ def test_volatility_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.9
         cov = base_cov * scale
 
         # Reference VaR
-        portfolio_returns_ref = []
-        for _ in range(10):
-            scenarios = mc_sim(mu, cov, 50000)
-            portfolio_returns_ref.extend(scenarios @ weights)
-        var_ref, _ = var_cvar(np.array(portfolio_returns_ref), alpha)
+        portfolio_returns_ref = stored_scenarios(mu, cov, 500000, generator='mc', weights=weights)
+        var_ref, _ = var_cvar(portfolio_returns_ref, levels)
 
         # MC
-        vars_mc = []
-        for _ in range(n_runs):
-            scenarios = mc_sim(mu, cov, n_sims)
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha)
-            vars_mc.append(var_val)
-
-        mc_std = np.std(vars_mc)
-
-        results['vol_scale'].append(scale)
-        results['method'].append('MC')
-        results['var_std'].append(mc_std)
-        results['relative_efficiency'].append(1.0)
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs, method='mc', weights=weights)
+        vars_mc, _ = tail_stats(portfolio_ret, levels)
 
         # QMC
-        vars_qmc = []
-        for _ in range(n_runs):
-            scenarios = qmc_sim(mu, cov, n_sims, method='sobol')
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha)
-            vars_qmc.append(var_val)
-
-        qmc_std = np.std(vars_qmc)
-        efficiency = mc_std / qmc_std
-
-        results['vol_scale'].append(scale)
-        results['method'].append('QMC-Sobol')
-        results['var_std'].append(qmc_std)
-        results['relative_efficiency'].append(efficiency)
-
-        print(f"  MC   Std: {mc_std:.6f}")
-        print(f"  QMC  Std: {qmc_std:.6f}")
-        print(f"  Efficiency Gain: {(efficiency - 1) * 100:.2f}%")
-
-    return pd.DataFrame(results)
-
-def test_correlation_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95):
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs, method='sobol', weights=weights)
+        vars_qmc, _ = tail_stats(portfolio_ret, levels)
+
+        for j, level in enumerate(levels):
+            mc_std = np.std(vars_mc[:, j])
+            qmc_std = np.std(vars_qmc[:, j])
+            efficiency = mc_std / qmc_std
+
+            results['vol_scale'].extend([scale, scale])
+            results['method'].extend(['MC', 'QMC-Sobol'])
+            results['alpha'].extend([level, level])
+            results['var_std'].extend([mc_std, qmc_std])
+            results['relative_efficiency'].extend([1.0, efficiency])
+
+            print(f"  [{level:.1%}] MC   Std: {mc_std:.6f}")
+            print(f"  [{level:.1%}] QMC  Std: {qmc_std:.6f}")
+            print(f"  [{level:.1%}] Efficiency Gain: {(efficiency - 1) * 100:.2f}%")
+
+    df_results = pd.DataFrame(results)
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
+    return df_results
+
+def test_correlation_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.95, alphas=None):
     """
     Test: How does correlation structure affect MC vs QMC?
 
@@ -187,9 +169,11 @@ def test_correlation_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.
     print("=" * 60)
 
     correlation_levels = [0.1, 0.3, 0.5, 0.7, 0.9]
+    levels = np.atleast_1d(alpha if alphas is None else alphas)
     results = {
         'correlation': [],
         'method': [],
+        'alpha': [],
         'var_std': [],
         'relative_efficiency': []
     }
@@ -201,63 +185,46 @@ def test_correlation_effect(base_mu, base_cov, n_sims=10000, n_runs=50, alpha=0.
     for corr in correlation_levels:
         print(f"\nTesting correlation={corr}...")
 
-        # Build covariance with target correlation
-        cov = np.eye(d)
-        for i in range(d):
-            for j in range(d):
-                if i != j:
-                    cov[i, j] = corr
-        # Scale by volatilities
-        for i in range(d):
-            for j in range(d):
-                cov[i, j] *= vol[i] * vol[j]
+        # Build covariance with target correlation, scaled by volatilities
+        corr_matrix = np.full((d, d), corr)
+        np.fill_diagonal(corr_matrix, 1.0)
+        cov = nearest_psd(corr_matrix * np.outer(vol, vol))
 
         mu = base_mu
 
         # Reference
-        portfolio_returns_ref = []
-        for _ in range(10):
-            scenarios = mc_sim(mu, cov, 50000)
-            portfolio_returns_ref.extend(scenarios @ weights)
-        var_ref, _ = var_cvar(np.array(portfolio_returns_ref), alpha)
+        portfolio_returns_ref = stored_scenarios(mu, cov, 500000, generator='mc', weights=weights)
+        var_ref, _ = var_cvar(portfolio_returns_ref, levels)
 
         # MC
-        vars_mc = []
-        for _ in range(n_runs):
-            scenarios = mc_sim(mu, cov, n_sims)
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha)
-            vars_mc.append(var_val)
-
-        mc_std = np.std(vars_mc)
-
-        results['correlation'].append(corr)
-        results['method'].append('MC')
-        results['var_std'].append(mc_std)
-        results['relative_efficiency'].append(1.0)
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs, method='mc', weights=weights)
+        vars_mc, _ = tail_stats(portfolio_ret, levels)
 
         # QMC
-        vars_qmc = []
-        for _ in range(n_runs):
-            scenarios = qmc_sim(mu, cov, n_sims, method='sobol')
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha)
-            vars_qmc.append(var_val)
-
-        qmc_std = np.std(vars_qmc)
-        efficiency = mc_std / qmc_std
-
-        results['correlation'].append(corr)
-        results['method'].append('QMC-Sobol')
-        results['var_std'].append(qmc_std)
-        results['relative_efficiency'].append(efficiency)
-
-        print(f"  MC   Std: {mc_std:.6f}")
-        print(f"  QMC  Std: {qmc_std:.6f}")
-        print(f"  Efficiency Gain: {(efficiency - 1) * 100:.2f}%")
-
-    return pd.DataFrame(results)
-
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs, method='sobol', weights=weights)
+        vars_qmc, _ = tail_stats(portfolio_ret, levels)
+
+        for j, level in enumerate(levels):
+            mc_std = np.std(vars_mc[:, j])
+            qmc_std = np.std(vars_qmc[:, j])
+            efficiency = mc_std / qmc_std
+
+            results['correlation'].extend([corr, corr])
+            results['method'].extend(['MC', 'QMC-Sobol'])
+            results['alpha'].extend([level, level])
+            results['var_std'].extend([mc_std, qmc_std])
+            results['relative_efficiency'].extend([1.0, efficiency])
+
+            print(f"  [{level:.1%}] MC   Std: {mc_std:.6f}")
+            print(f"  [{level:.1%}] QMC  Std: {qmc_std:.6f}")
+            print(f"  [{level:.1%}] Efficiency Gain: {(efficiency - 1) * 100:.2f}%")
+
+    df_results = pd.DataFrame(results)
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
+    return df_results
+
+@timed('plotting')
 def plot_boundary_conditions(df_dim, df_vol, df_corr, save_path=None):
     """Plot boundary condition analysis results"""
     if save_path is None:
@@ -321,22 +288,27 @@ def main():
     print("=" * 60)
 
     # Load base data
-    returns = pd.read_csv(DATA_PATH / "returns.csv", index_col=0, parse_dates=True)
-    base_mu = returns.mean().values
-    base_cov = returns.cov().values
+    with stage('csv_io'):
+        returns = load_returns(path=DATA_PATH)
+    with stage('parameter_estimation'):
+        base_mu = returns.mean().values
+        base_cov = returns.cov().values
 
     print(f"\nBase asset dimension: {len(base_mu)}")
     print(f"Base volatility (annualized): {np.sqrt(np.diag(base_cov) * 252)}")
 
     # Run tests
     df_dimension = test_dimension_effect(base_mu, base_cov, n_sims=10000, n_runs=50)
-    df_dimension.to_csv(RESULTS_PATH / "boundary_dimension.csv", index=False)
+    with stage('csv_io'):
+        df_dimension.to_csv(RESULTS_PATH / "boundary_dimension.csv", index=False)
 
     df_volatility = test_volatility_effect(base_mu, base_cov, n_sims=10000, n_runs=50)
-    df_volatility.to_csv(RESULTS_PATH / "boundary_volatility.csv", index=False)
+    with stage('csv_io'):
+        df_volatility.to_csv(RESULTS_PATH / "boundary_volatility.csv", index=False)
 
     df_correlation = test_correlation_effect(base_mu, base_cov, n_sims=10000, n_runs=50)
-    df_correlation.to_csv(RESULTS_PATH / "boundary_correlation.csv", index=False)
+    with stage('csv_io'):
+        df_correlation.to_csv(RESULTS_PATH / "boundary_correlation.csv", index=False)
 
     # Plot results
     plot_boundary_conditions(df_dimension, df_volatility, df_correlation)
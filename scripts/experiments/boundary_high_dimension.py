@@ -12,15 +12,16 @@ import time
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from simulation.mc_sim import mc_sim
-from simulation.qmc_sim import qmc_sim
+from simulation.portfolio_sim import simulate_portfolio_returns
+from simulation.scenario_store import stored_scenarios
+from simulation.factorization import nearest_psd, cholesky_factor
 from var_cvar.var_cvar import var_cvar
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 RESULTS_PATH = PROJECT_ROOT / "results" / "simulation"
 RESULTS_PATH.mkdir(parents=True, exist_ok=True)
 
-def test_dimension(d, n_sims=10000, n_runs=100):
+def test_dimension(d, n_sims=10000, n_runs=100, alphas=None):
     """
     Test MC vs QMC efficiency at dimension d
 
@@ -28,6 +29,8 @@ def test_dimension(d, n_sims=10000, n_runs=100):
         d: Number of assets (dimension)
         n_sims: Number of simulations per run
         n_runs: Number of independent runs
+        alphas: Optional confidence levels evaluated on the same scenario
+            sets (default 95% only; adds an 'alpha' column when given)
 
     Returns:
         Results dictionary
@@ -37,6 +40,8 @@ def test_dimension(d, n_sims=10000, n_runs=100):
     print(f"{'='*60}")
     print(f"Simulations: {n_sims}, Runs: {n_runs}")
 
+    levels = np.atleast_1d(0.95 if alphas is None else alphas)
+
     # Synthetic portfolio parameters
     np.random.seed(42)
 
@@ -56,12 +61,11 @@ def test_dimension(d, n_sims=10000, n_runs=100):
     cov = D @ cov_base @ D
 
     # Ensure positive definite
-    eigenvalues = np.linalg.eigvalsh(cov)
-    if eigenvalues.min() < 0:
-        cov += np.eye(d) * abs(eigenvalues.min()) * 1.1
+    cov = nearest_psd(cov)
 
     # Equal-weighted portfolio
     weights = np.ones(d) / d
+    L = cholesky_factor(cov)
 
     print(f"\nPortfolio statistics:")
     print(f"  Expected return: {np.dot(mu, weights):.6f}")
@@ -70,10 +74,10 @@ def test_dimension(d, n_sims=10000, n_runs=100):
 
     # Compute reference VaR with large MC
     print(f"\nComputing reference VaR (100,000 MC simulations)...")
-    ref_scenarios = mc_sim(mu, cov, 100000)
-    ref_portfolio_ret = ref_scenarios @ weights
-    ref_var, ref_cvar = var_cvar(ref_portfolio_ret, alpha=0.95)
-    print(f"Reference VaR: {ref_var:.6f}")
+    ref_portfolio_ret = stored_scenarios(mu, cov, 100000, generator='mc', weights=weights)
+    ref_var, ref_cvar = var_cvar(ref_portfolio_ret, alpha=levels)
+    for level, v in zip(levels, ref_var):
+        print(f"Reference VaR({level:.1%}): {v:.6f}")
 
     # Test methods
     methods = [
@@ -85,6 +89,7 @@ def test_dimension(d, n_sims=10000, n_runs=100):
     results = {
         'dimension': [],
         'method': [],
+        'alpha': [],
         'var_mean': [],
         'var_std': [],
         'var_rmse': [],
@@ -99,13 +104,10 @@ def test_dimension(d, n_sims=10000, n_runs=100):
         for i in range(n_runs):
             t_start = time.time()
 
-            if method_type == 'mc':
-                scenarios = mc_sim(mu, cov, n_sims)
-            else:
-                scenarios = qmc_sim(mu, cov, n_sims, method=method_type)
-
-            portfolio_ret = scenarios @ weights
-            var_val, _ = var_cvar(portfolio_ret, alpha=0.95)
+            # Projected on the fly: no (n_sims, d) scenario matrix
+            portfolio_ret = simulate_portfolio_returns(mu, cov, weights, n_sims,
+                                                       method=method_type, L=L)
+            var_val, _ = var_cvar(portfolio_ret, alpha=levels)
 
             vars_list.append(var_val)
             times_list.append(time.time() - t_start)
@@ -113,38 +115,47 @@ def test_dimension(d, n_sims=10000, n_runs=100):
             if (i + 1) % 20 == 0:
                 print(f"  Progress: {i+1}/{n_runs}")
 
-        vars_arr = np.array(vars_list)
-        var_mean = np.mean(vars_arr)
-        var_std = np.std(vars_arr)
-        var_rmse = np.sqrt(np.mean((vars_arr - ref_var)**2))
+        vars_all = np.array(vars_list)
         time_mean = np.mean(times_list)
 
-        results['dimension'].append(d)
-        results['method'].append(method_name)
-        results['var_mean'].append(var_mean)
-        results['var_std'].append(var_std)
-        results['var_rmse'].append(var_rmse)
-        results['time_mean'].append(time_mean)
-
-        print(f"  VaR Mean: {var_mean:.6f}")
-        print(f"  VaR Std: {var_std:.6f}")
-        print(f"  VaR RMSE: {var_rmse:.6f}")
+        for j, level in enumerate(levels):
+            vars_arr = vars_all[:, j]
+            var_mean = np.mean(vars_arr)
+            var_std = np.std(vars_arr)
+            var_rmse = np.sqrt(np.mean((vars_arr - ref_var[j])**2))
+
+            results['dimension'].append(d)
+            results['method'].append(method_name)
+            results['alpha'].append(level)
+            results['var_mean'].append(var_mean)
+            results['var_std'].append(var_std)
+            results['var_rmse'].append(var_rmse)
+            results['time_mean'].append(time_mean)
+
+            print(f"  VaR({level:.1%}) Mean: {var_mean:.6f}")
+            print(f"  VaR({level:.1%}) Std: {var_std:.6f}")
+            print(f"  VaR({level:.1%}) RMSE: {var_rmse:.6f}")
         print(f"  Time: {time_mean:.4f} sec")
 
     df_results = pd.DataFrame(results)
 
     # Compute efficiency gains
-    mc_std = df_results.loc[df_results['method'] == 'MC', 'var_std'].values[0]
-
     print(f"\n{'='*60}")
     print(f"Efficiency Gains vs MC (d={d})")
     print(f"{'='*60}")
 
-    for method in ['QMC-Sobol', 'QMC-Halton']:
-        qmc_std = df_results.loc[df_results['method'] == method, 'var_std'].values[0]
-        efficiency = ((mc_std / qmc_std) - 1) * 100
-        ratio = mc_std / qmc_std
-        print(f"{method:12s}: {efficiency:+6.1f}% ({ratio:.2f}× improvement)")
+    for level in levels:
+        df_level = df_results[df_results['alpha'] == level]
+        mc_std = df_level.loc[df_level['method'] == 'MC', 'var_std'].values[0]
+
+        for method in ['QMC-Sobol', 'QMC-Halton']:
+            qmc_std = df_level.loc[df_level['method'] == method, 'var_std'].values[0]
+            efficiency = ((mc_std / qmc_std) - 1) * 100
+            ratio = mc_std / qmc_std
+            print(f"{method:12s} ({level:.1%}): {efficiency:+6.1f}% ({ratio:.2f}× improvement)")
+
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
 
     return df_results
 
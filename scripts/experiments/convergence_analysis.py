@@ -10,9 +10,13 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from simulation.mc_sim import mc_sim
-from simulation.qmc_sim import qmc_sim
-from var_cvar.var_cvar import var_cvar
+from simulation.batch_sim import simulate_batch
+from simulation.rqmc import rqmc_var_cvar
+from simulation.scenario_store import stored_scenarios
+from var_cvar.var_cvar import var_cvar, tail_stats
+from instrumentation import stage, timed
+from var_cvar.streaming import streaming_var_cvar
+from preprocessing.storage import load_returns
 import time
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -20,21 +24,31 @@ DATA_PATH = PROJECT_ROOT / "data" / "processed"
 RESULTS_PATH = PROJECT_ROOT / "results" / "simulation"
 RESULTS_PATH.mkdir(parents=True, exist_ok=True)
 
-def compute_reference_var(returns, weights, n_ref=100000, alpha=0.95):
-    """Compute high-accuracy reference VaR using large MC simulation"""
-    mu = returns.mean().values
-    cov = returns.cov().values
+def compute_reference_var(returns, weights, n_ref=100000, alpha=0.95, seed=0, streaming=False):
+    """Compute high-accuracy reference VaR using large MC simulation
 
-    portfolio_returns = []
-    for _ in range(5):  # Average over 5 runs for stability
-        scenarios = mc_sim(mu, cov, n_ref)
-        portfolio_ret = scenarios @ weights
-        portfolio_returns.extend(portfolio_ret)
+    alpha may be a vector of confidence levels, in which case arrays of
+    VaR/CVaR are returned from the same reference scenario set. The
+    reference paths are seeded and kept in the on-disk scenario store, so
+    they are only simulated on the first run. With streaming=True the paths
+    are generated in chunks and never stored, keeping only the loss tail in
+    memory (for 1e7-1e8 path references).
+    """
+    with stage('parameter_estimation'):
+        mu = returns.mean().values
+        cov = returns.cov().values
+
+    if streaming:
+        return streaming_var_cvar(mu, cov, weights, 5 * n_ref, alpha, method='mc', rng=seed)
 
-    var_ref, cvar_ref = var_cvar(np.array(portfolio_returns), alpha)
+    # 5 * n_ref paths (equivalent to pooling 5 runs) for stability
+    portfolio_returns = stored_scenarios(mu, cov, 5 * n_ref, generator='mc',
+                                         seed=seed, weights=weights)
+
+    var_ref, cvar_ref = var_cvar(portfolio_returns, alpha)
     return var_ref, cvar_ref
 
-def convergence_experiment(returns, weights, n_simulations_list, n_runs=50, alpha=0.95):
+def convergence_experiment(returns, weights, n_simulations_list, n_runs=50, alpha=0.95, alphas=None):
     """
     Test convergence of MC vs QMC methods
 
@@ -50,17 +64,25 @@ def convergence_experiment(returns, weights, n_simulations_list, n_runs=50, alph
         Number of independent runs for each simulation count
     alpha : float
         VaR confidence level
+    alphas : array-like, optional
+        Several confidence levels evaluated on the same scenario sets
+        (overrides alpha and adds an 'alpha' column to the results)
     """
+    levels = np.atleast_1d(alpha if alphas is None else alphas)
+
     print("Computing reference VaR with large MC simulation...")
-    var_ref, cvar_ref = compute_reference_var(returns, weights, n_ref=100000, alpha=alpha)
-    print(f"Reference VaR: {var_ref:.6f}, CVaR: {cvar_ref:.6f}")
+    var_ref, cvar_ref = compute_reference_var(returns, weights, n_ref=100000, alpha=levels)
+    for level, v, c in zip(levels, var_ref, cvar_ref):
+        print(f"Reference VaR({level:.1%}): {v:.6f}, CVaR: {c:.6f}")
 
-    mu = returns.mean().values
-    cov = returns.cov().values
+    with stage('parameter_estimation'):
+        mu = returns.mean().values
+        cov = returns.cov().values
 
     results = {
         'n_sims': [],
         'method': [],
+        'alpha': [],
         'var_mean': [],
         'var_std': [],
         'cvar_mean': [],
@@ -81,54 +103,110 @@ def convergence_experiment(returns, weights, n_simulations_list, n_runs=50, alph
         print(f"\nTesting n_sims={n_sims}...")
 
         for method_name, method_type in methods:
-            vars_list = []
-            cvars_list = []
-            times_list = []
-
-            for run in range(n_runs):
-                t_start = time.time()
-
-                if method_type == 'mc':
-                    scenarios = mc_sim(mu, cov, n_sims)
-                else:
-                    scenarios = qmc_sim(mu, cov, n_sims, method=method_type.split('-')[-1].lower())
-
-                portfolio_ret = scenarios @ weights
-                var_val, cvar_val = var_cvar(portfolio_ret, alpha)
+            # All runs in one batched call; per-run time is the batch average
+            t_start = time.time()
+            portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs,
+                                           method=method_type, weights=weights)
+            vars_all, cvars_all = tail_stats(portfolio_ret, levels)
+            elapsed = time.time() - t_start
+
+            for j, level in enumerate(levels):
+                vars_arr = vars_all[:, j]
+                cvars_arr = cvars_all[:, j]
+
+                var_rmse = np.sqrt(np.mean((vars_arr - var_ref[j])**2))
+                cvar_rmse = np.sqrt(np.mean((cvars_arr - cvar_ref[j])**2))
+
+                results['n_sims'].append(n_sims)
+                results['method'].append(method_name)
+                results['alpha'].append(level)
+                results['var_mean'].append(np.mean(vars_arr))
+                results['var_std'].append(np.std(vars_arr))
+                results['cvar_mean'].append(np.mean(cvars_arr))
+                results['cvar_std'].append(np.std(cvars_arr))
+                results['var_rmse'].append(var_rmse)
+                results['cvar_rmse'].append(cvar_rmse)
+                results['time_mean'].append(elapsed / n_runs)
+                results['time_std'].append(np.nan)
+
+                print(f"  {method_name:15s} ({level:.1%}): VaR RMSE={var_rmse:.6f}, Time={elapsed / n_runs:.4f}s")
 
-                t_end = time.time()
-
-                vars_list.append(var_val)
-                cvars_list.append(cvar_val)
-                times_list.append(t_end - t_start)
+    df_results = pd.DataFrame(results)
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
+    with stage('csv_io'):
+        df_results.to_csv(RESULTS_PATH / "convergence_results.csv", index=False)
 
-            vars_arr = np.array(vars_list)
-            cvars_arr = np.array(cvars_list)
+    print("\n✅ Convergence experiment complete!")
+    print(f"Results saved to: {RESULTS_PATH / 'convergence_results.csv'}")
 
-            var_rmse = np.sqrt(np.mean((vars_arr - var_ref)**2))
-            cvar_rmse = np.sqrt(np.mean((cvars_arr - cvar_ref)**2))
+    return df_results
 
-            results['n_sims'].append(n_sims)
-            results['method'].append(method_name)
-            results['var_mean'].append(np.mean(vars_arr))
-            results['var_std'].append(np.std(vars_arr))
-            results['cvar_mean'].append(np.mean(cvars_arr))
-            results['cvar_std'].append(np.std(cvars_arr))
-            results['var_rmse'].append(var_rmse)
-            results['cvar_rmse'].append(cvar_rmse)
-            results['time_mean'].append(np.mean(times_list))
-            results['time_std'].append(np.std(times_list))
+def rqmc_experiment(returns, weights, m_list, n_replicates=16, alpha=0.95, confidence=0.95):
+    """
+    RQMC estimates with error bars from independent scrambles
 
-            print(f"  {method_name:15s}: VaR RMSE={var_rmse:.6f}, Time={np.mean(times_list):.4f}s")
+    For each n = 2**m, one call draws n_replicates scrambled Sobol and
+    Halton point sets and reports the VaR/CVaR estimate, its standard
+    error and confidence interval, and whether the interval covers the
+    large-MC reference.
 
-    df_results = pd.DataFrame(results)
-    df_results.to_csv(RESULTS_PATH / "convergence_results.csv", index=False)
+    Parameters:
+    -----------
+    returns : DataFrame
+        Historical returns
+    weights : array
+        Portfolio weights
+    m_list : list of int
+        log2 of the scenarios per replicate
+    n_replicates : int
+        Independent scrambles per estimate
+    alpha : float
+        VaR confidence level
+    confidence : float
+        Coverage of the confidence intervals
+    """
+    var_ref, cvar_ref = compute_reference_var(returns, weights, n_ref=100000, alpha=alpha)
 
-    print("\n✅ Convergence experiment complete!")
-    print(f"Results saved to: {RESULTS_PATH / 'convergence_results.csv'}")
+    with stage('parameter_estimation'):
+        mu = returns.mean().values
+        cov = returns.cov().values
+
+    rows = []
+    for m in m_list:
+        for method_name, sequence in [('RQMC-Sobol', 'sobol'), ('RQMC-Halton', 'halton')]:
+            t_start = time.time()
+            est = rqmc_var_cvar(mu, cov, weights, m, n_replicates, alpha, sequence,
+                                confidence=confidence, rng=m)
+            elapsed = time.time() - t_start
+
+            rows.append({
+                'n_sims': 2 ** m,
+                'method': method_name,
+                'n_replicates': n_replicates,
+                'var': est['var'],
+                'var_se': est['var_se'],
+                'var_ci_low': est['var_ci'][0],
+                'var_ci_high': est['var_ci'][1],
+                'var_ref_covered': est['var_ci'][0] <= var_ref <= est['var_ci'][1],
+                'cvar': est['cvar'],
+                'cvar_se': est['cvar_se'],
+                'cvar_ci_low': est['cvar_ci'][0],
+                'cvar_ci_high': est['cvar_ci'][1],
+                'cvar_ref_covered': est['cvar_ci'][0] <= cvar_ref <= est['cvar_ci'][1],
+                'time': elapsed
+            })
+            print(f"  {method_name:12s} n=2^{m:<2d}: VaR={est['var']:.6f} ± {est['var_se']:.6f}, "
+                  f"CVaR={est['cvar']:.6f} ± {est['cvar_se']:.6f} ({elapsed:.3f}s)")
+
+    df_results = pd.DataFrame(rows)
+    with stage('csv_io'):
+        df_results.to_csv(RESULTS_PATH / "rqmc_results.csv", index=False)
+    print(f"Results saved to: {RESULTS_PATH / 'rqmc_results.csv'}")
 
     return df_results
 
+@timed('plotting')
 def plot_convergence(df_results, save_path=None):
     """Plot convergence analysis results"""
     if save_path is None:
@@ -199,7 +277,8 @@ def main():
     print("=" * 60)
 
     # Load returns
-    returns = pd.read_csv(DATA_PATH / "returns.csv", index_col=0, parse_dates=True)
+    with stage('csv_io'):
+        returns = load_returns(path=DATA_PATH)
     print(f"\nLoaded returns: {returns.shape}")
     print(f"Assets: {returns.columns.tolist()}")
 
@@ -222,6 +301,12 @@ def main():
     # Plot results
     plot_convergence(df_results)
 
+    # RQMC: estimate and error bar from one call per sample size
+    print("\n" + "=" * 60)
+    print("Randomized QMC (16 independent scrambles)")
+    print("=" * 60)
+    rqmc_experiment(returns, weights, m_list=[7, 9, 10, 11, 12, 13, 14], n_replicates=16)
+
     # Print summary
     print("\n" + "=" * 60)
     print("SUMMARY: VaR RMSE at n=10000")
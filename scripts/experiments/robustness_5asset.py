@@ -11,7 +11,10 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from simulation.mc_sim import mc_sim
 from simulation.qmc_sim import qmc_sim
-from var_cvar.var_cvar import var_cvar
+from simulation.batch_sim import simulate_batch
+from preprocessing.rolling_moments import cube_moments
+from preprocessing.compute_covariance import rolling_cov_cube
+from var_cvar.var_cvar import var_cvar, tail_stats
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "data" / "processed"
@@ -51,14 +54,19 @@ def compute_5asset_returns():
 
     return returns
 
-def run_5asset_experiment(returns, n_sims=10000, n_runs=100):
+def run_5asset_experiment(returns, n_sims=10000, n_runs=100, alphas=None):
     """
     Run MC vs QMC comparison for 5-asset portfolio
 
     Focus on:
     - RMSE comparison at n=10,000
     - Backtesting violation rate
+
+    alphas: optional confidence levels evaluated on the same scenario sets
+    (default 95% only; adds an 'alpha' column when given)
     """
+    levels = np.atleast_1d(0.95 if alphas is None else alphas)
+
     print("\n" + "=" * 60)
     print("5-Asset Portfolio Robustness Test")
     print("=" * 60)
@@ -79,8 +87,9 @@ def run_5asset_experiment(returns, n_sims=10000, n_runs=100):
     print("\nComputing reference VaR (100,000 simulations)...")
     ref_scenarios = mc_sim(mu, cov, 100000)
     ref_portfolio_ret = ref_scenarios @ weights
-    ref_var, ref_cvar = var_cvar(ref_portfolio_ret, alpha=0.95)
-    print(f"Reference VaR: {ref_var:.6f}, CVaR: {ref_cvar:.6f}")
+    ref_var, ref_cvar = var_cvar(ref_portfolio_ret, alpha=levels)
+    for level, v, c in zip(levels, ref_var, ref_cvar):
+        print(f"Reference VaR({level:.1%}): {v:.6f}, CVaR: {c:.6f}")
 
     # Run MC vs QMC comparison
     methods = [
@@ -91,6 +100,7 @@ def run_5asset_experiment(returns, n_sims=10000, n_runs=100):
 
     results = {
         'method': [],
+        'alpha': [],
         'var_mean': [],
         'var_std': [],
         'var_rmse': [],
@@ -101,53 +111,47 @@ def run_5asset_experiment(returns, n_sims=10000, n_runs=100):
 
     for method_name, method_type in methods:
         print(f"\n{method_name}:")
-        vars_list = []
-        cvars_list = []
-
-        for i in range(n_runs):
-            if method_type == 'mc':
-                scenarios = mc_sim(mu, cov, n_sims)
-            else:
-                scenarios = qmc_sim(mu, cov, n_sims, method=method_type)
-
-            portfolio_ret = scenarios @ weights
-            var_val, cvar_val = var_cvar(portfolio_ret, alpha=0.95)
-            vars_list.append(var_val)
-            cvars_list.append(cvar_val)
-
-            if (i + 1) % 20 == 0:
-                print(f"  Progress: {i+1}/{n_runs}")
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_runs,
+                                       method=method_type, weights=weights)
+        vars_all, cvars_all = tail_stats(portfolio_ret, levels)
 
-        vars_arr = np.array(vars_list)
-        cvars_arr = np.array(cvars_list)
+        for j, level in enumerate(levels):
+            vars_arr = vars_all[:, j]
+            cvars_arr = cvars_all[:, j]
 
-        var_rmse = np.sqrt(np.mean((vars_arr - ref_var)**2))
-        cvar_rmse = np.sqrt(np.mean((cvars_arr - ref_cvar)**2))
+            var_rmse = np.sqrt(np.mean((vars_arr - ref_var[j])**2))
+            cvar_rmse = np.sqrt(np.mean((cvars_arr - ref_cvar[j])**2))
 
-        results['method'].append(method_name)
-        results['var_mean'].append(np.mean(vars_arr))
-        results['var_std'].append(np.std(vars_arr))
-        results['var_rmse'].append(var_rmse)
-        results['cvar_mean'].append(np.mean(cvars_arr))
-        results['cvar_std'].append(np.std(cvars_arr))
-        results['cvar_rmse'].append(cvar_rmse)
+            results['method'].append(method_name)
+            results['alpha'].append(level)
+            results['var_mean'].append(np.mean(vars_arr))
+            results['var_std'].append(np.std(vars_arr))
+            results['var_rmse'].append(var_rmse)
+            results['cvar_mean'].append(np.mean(cvars_arr))
+            results['cvar_std'].append(np.std(cvars_arr))
+            results['cvar_rmse'].append(cvar_rmse)
 
-        print(f"  VaR RMSE: {var_rmse:.6f}, Std: {np.std(vars_arr):.6f}")
-        print(f"  CVaR RMSE: {cvar_rmse:.6f}, Std: {np.std(cvars_arr):.6f}")
+            print(f"  VaR({level:.1%}) RMSE: {var_rmse:.6f}, Std: {np.std(vars_arr):.6f}")
+            print(f"  CVaR({level:.1%}) RMSE: {cvar_rmse:.6f}, Std: {np.std(cvars_arr):.6f}")
 
     df_results = pd.DataFrame(results)
 
     # Compute efficiency gains
-    mc_rmse = df_results.loc[df_results['method'] == 'MC', 'var_rmse'].values[0]
-
     print("\n" + "=" * 60)
     print("Efficiency Gains vs MC")
     print("=" * 60)
 
-    for method in ['QMC-Sobol', 'QMC-Halton']:
-        qmc_rmse = df_results.loc[df_results['method'] == method, 'var_rmse'].values[0]
-        efficiency = ((mc_rmse / qmc_rmse) - 1) * 100
-        print(f"{method:12s}: {efficiency:6.2f}% RMSE improvement")
+    for level in levels:
+        df_level = df_results[df_results['alpha'] == level]
+        mc_rmse = df_level.loc[df_level['method'] == 'MC', 'var_rmse'].values[0]
+
+        for method in ['QMC-Sobol', 'QMC-Halton']:
+            qmc_rmse = df_level.loc[df_level['method'] == method, 'var_rmse'].values[0]
+            efficiency = ((mc_rmse / qmc_rmse) - 1) * 100
+            print(f"{method:12s} ({level:.1%}): {efficiency:6.2f}% RMSE improvement")
+
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
 
     # Save results
     output_path = RESULTS_PATH / "robustness_5asset.csv"
@@ -177,26 +181,22 @@ def simple_backtest_5asset(returns, n_sims=10000, window=252):
     var_qmc_sobol = []
     var_qmc_halton = []
 
-    for t in range(window, n_obs):
-        # Estimate parameters from rolling window
-        window_returns = returns.iloc[t-window:t]
-        mu = window_returns.mean().values
-        cov = window_returns.cov().values
-
+    # Parameters from the precomputed rolling covariance cube
+    for t, _, mu, cov, L in cube_moments(returns, rolling_cov_cube(returns, window)):
         # MC VaR
-        scenarios_mc = mc_sim(mu, cov, n_sims)
+        scenarios_mc = mc_sim(mu, cov, n_sims, L=L)
         portfolio_ret_mc = scenarios_mc @ weights
         var_mc_val, _ = var_cvar(portfolio_ret_mc, alpha)
         var_mc.append(var_mc_val)
 
         # QMC-Sobol VaR
-        scenarios_sobol = qmc_sim(mu, cov, n_sims, method='sobol')
+        scenarios_sobol = qmc_sim(mu, cov, n_sims, method='sobol', L=L)
         portfolio_ret_sobol = scenarios_sobol @ weights
         var_sobol_val, _ = var_cvar(portfolio_ret_sobol, alpha)
         var_qmc_sobol.append(var_sobol_val)
 
         # QMC-Halton VaR
-        scenarios_halton = qmc_sim(mu, cov, n_sims, method='halton')
+        scenarios_halton = qmc_sim(mu, cov, n_sims, method='halton', L=L)
         portfolio_ret_halton = scenarios_halton @ weights
         var_halton_val, _ = var_cvar(portfolio_ret_halton, alpha)
         var_qmc_halton.append(var_halton_val)
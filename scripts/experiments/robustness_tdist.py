@@ -9,15 +9,22 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from simulation.tdist_sim import mc_sim_tdist, qmc_sim_tdist
+from simulation.portfolio_sim import simulate_portfolio_returns
 from var_cvar.var_cvar import var_cvar
+from preprocessing.storage import load_returns
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "data" / "processed"
 RESULTS_PATH = PROJECT_ROOT / "results" / "simulation"
 RESULTS_PATH.mkdir(parents=True, exist_ok=True)
 
-def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
+# Labels of the t constructions in simulation.portfolio_sim
+T_DISTRIBUTIONS = {
+    'mvt': 'Multivariate t',
+    't': 'Student-t'
+}
+
+def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100, alphas=None, distribution='mvt'):
     """
     Compare MC vs QMC under multivariate t-distribution
 
@@ -26,6 +33,10 @@ def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
         df: Degrees of freedom (ν). Lower = fatter tails
         n_sims: Number of simulations
         n_runs: Number of independent runs
+        alphas: Optional confidence levels evaluated on the same scenario
+            sets (default 95% only; adds an 'alpha' column when given)
+        distribution: 'mvt' (normal variance mixture, one chi-square draw
+            per scenario) or 't' (independent t marginals)
 
     Focus:
     - RMSE comparison under fat-tail distribution
@@ -36,6 +47,8 @@ def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
     print("=" * 60)
     print(f"n_simulations: {n_sims}, n_runs: {n_runs}")
 
+    levels = np.atleast_1d(0.95 if alphas is None else alphas)
+
     # Use 3-asset portfolio for consistency
     weights = np.array([1/3, 1/3, 1/3])
     print(f"Portfolio weights: {weights}")
@@ -50,18 +63,18 @@ def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
 
     # Compute reference VaR with large MC
     print(f"\nComputing reference VaR (100,000 t-distributed simulations)...")
-    ref_scenarios = mc_sim_tdist(mu, cov, 100000, df=df)
-    ref_portfolio_ret = ref_scenarios @ weights
-    ref_var, ref_cvar = var_cvar(ref_portfolio_ret, alpha=0.95)
-    print(f"Reference VaR: {ref_var:.6f}, CVaR: {ref_cvar:.6f}")
+    ref_portfolio_ret = simulate_portfolio_returns(mu, cov, weights, 100000,
+                                                   distribution=distribution, df=df)
+    ref_var, ref_cvar = var_cvar(ref_portfolio_ret, alpha=levels)
 
     # Compare with normal distribution reference
-    from simulation.mc_sim import mc_sim
-    ref_scenarios_normal = mc_sim(mu, cov, 100000)
-    ref_portfolio_normal = ref_scenarios_normal @ weights
-    ref_var_normal, ref_cvar_normal = var_cvar(ref_portfolio_normal, alpha=0.95)
-    print(f"Normal VaR:    {ref_var_normal:.6f}, CVaR: {ref_cvar_normal:.6f}")
-    print(f"Difference:    {abs(ref_var - ref_var_normal)/abs(ref_var_normal)*100:.2f}% (t vs normal)")
+    ref_portfolio_normal = simulate_portfolio_returns(mu, cov, weights, 100000)
+    ref_var_normal, ref_cvar_normal = var_cvar(ref_portfolio_normal, alpha=levels)
+
+    for j, level in enumerate(levels):
+        print(f"Reference VaR({level:.1%}): {ref_var[j]:.6f}, CVaR: {ref_cvar[j]:.6f}")
+        print(f"Normal VaR:    {ref_var_normal[j]:.6f}, CVaR: {ref_cvar_normal[j]:.6f}")
+        print(f"Difference:    {abs(ref_var[j] - ref_var_normal[j])/abs(ref_var_normal[j])*100:.2f}% (t vs normal)")
 
     # Run MC vs QMC comparison
     methods = [
@@ -74,6 +87,7 @@ def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
         'method': [],
         'distribution': [],
         'df': [],
+        'alpha': [],
         'var_mean': [],
         'var_std': [],
         'var_rmse': [],
@@ -88,51 +102,57 @@ def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
         cvars_list = []
 
         for i in range(n_runs):
-            if method_type == 'mc':
-                scenarios = mc_sim_tdist(mu, cov, n_sims, df=df)
-            else:
-                scenarios = qmc_sim_tdist(mu, cov, n_sims, df=df, method=method_type)
-
-            portfolio_ret = scenarios @ weights
-            var_val, cvar_val = var_cvar(portfolio_ret, alpha=0.95)
+            portfolio_ret = simulate_portfolio_returns(mu, cov, weights, n_sims, method=method_type,
+                                                       distribution=distribution, df=df)
+            var_val, cvar_val = var_cvar(portfolio_ret, alpha=levels)
             vars_list.append(var_val)
             cvars_list.append(cvar_val)
 
             if (i + 1) % 20 == 0:
                 print(f"  Progress: {i+1}/{n_runs}")
 
-        vars_arr = np.array(vars_list)
-        cvars_arr = np.array(cvars_list)
+        vars_all = np.array(vars_list)
+        cvars_all = np.array(cvars_list)
+
+        for j, level in enumerate(levels):
+            vars_arr = vars_all[:, j]
+            cvars_arr = cvars_all[:, j]
 
-        var_rmse = np.sqrt(np.mean((vars_arr - ref_var)**2))
-        cvar_rmse = np.sqrt(np.mean((cvars_arr - ref_cvar)**2))
+            var_rmse = np.sqrt(np.mean((vars_arr - ref_var[j])**2))
+            cvar_rmse = np.sqrt(np.mean((cvars_arr - ref_cvar[j])**2))
 
-        results['method'].append(method_name)
-        results['distribution'].append('Student-t')
-        results['df'].append(df)
-        results['var_mean'].append(np.mean(vars_arr))
-        results['var_std'].append(np.std(vars_arr))
-        results['var_rmse'].append(var_rmse)
-        results['cvar_mean'].append(np.mean(cvars_arr))
-        results['cvar_std'].append(np.std(cvars_arr))
-        results['cvar_rmse'].append(cvar_rmse)
+            results['method'].append(method_name)
+            results['distribution'].append(T_DISTRIBUTIONS[distribution])
+            results['df'].append(df)
+            results['alpha'].append(level)
+            results['var_mean'].append(np.mean(vars_arr))
+            results['var_std'].append(np.std(vars_arr))
+            results['var_rmse'].append(var_rmse)
+            results['cvar_mean'].append(np.mean(cvars_arr))
+            results['cvar_std'].append(np.std(cvars_arr))
+            results['cvar_rmse'].append(cvar_rmse)
 
-        print(f"  VaR RMSE: {var_rmse:.6f}, Std: {np.std(vars_arr):.6f}")
-        print(f"  CVaR RMSE: {cvar_rmse:.6f}, Std: {np.std(cvars_arr):.6f}")
+            print(f"  VaR({level:.1%}) RMSE: {var_rmse:.6f}, Std: {np.std(vars_arr):.6f}")
+            print(f"  CVaR({level:.1%}) RMSE: {cvar_rmse:.6f}, Std: {np.std(cvars_arr):.6f}")
 
     df_results = pd.DataFrame(results)
 
     # Compute efficiency gains
-    mc_rmse = df_results.loc[df_results['method'] == 'MC (t-dist)', 'var_rmse'].values[0]
-
     print("\n" + "=" * 60)
     print(f"Efficiency Gains vs MC (t-distribution, ν={df})")
     print("=" * 60)
 
-    for method in ['QMC-Sobol (t-dist)', 'QMC-Halton (t-dist)']:
-        qmc_rmse = df_results.loc[df_results['method'] == method, 'var_rmse'].values[0]
-        efficiency = ((mc_rmse / qmc_rmse) - 1) * 100
-        print(f"{method:25s}: {efficiency:6.2f}% RMSE improvement")
+    for level in levels:
+        df_level = df_results[df_results['alpha'] == level]
+        mc_rmse = df_level.loc[df_level['method'] == 'MC (t-dist)', 'var_rmse'].values[0]
+
+        for method in ['QMC-Sobol (t-dist)', 'QMC-Halton (t-dist)']:
+            qmc_rmse = df_level.loc[df_level['method'] == method, 'var_rmse'].values[0]
+            efficiency = ((mc_rmse / qmc_rmse) - 1) * 100
+            print(f"{method:25s} ({level:.1%}): {efficiency:6.2f}% RMSE improvement")
+
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
 
     # Save results
     output_path = RESULTS_PATH / f"robustness_tdist_df{df}.csv"
@@ -141,7 +161,7 @@ def run_tdist_experiment(returns, df=5, n_sims=10000, n_runs=100):
 
     return df_results
 
-def compare_normal_vs_tdist(returns, df=5, n_sims=10000, n_runs=100):
+def compare_normal_vs_tdist(returns, df=5, n_sims=10000, n_runs=100, distribution='mvt'):
     """
     Direct comparison: Normal vs t-distribution for both MC and QMC
     """
@@ -153,12 +173,9 @@ def compare_normal_vs_tdist(returns, df=5, n_sims=10000, n_runs=100):
     mu = returns.mean().values
     cov = returns.cov().values
 
-    from simulation.mc_sim import mc_sim
-    from simulation.qmc_sim import qmc_sim
-
     # Reference VaR (large sample)
-    ref_normal = mc_sim(mu, cov, 100000) @ weights
-    ref_tdist = mc_sim_tdist(mu, cov, 100000, df=df) @ weights
+    ref_normal = simulate_portfolio_returns(mu, cov, weights, 100000)
+    ref_tdist = simulate_portfolio_returns(mu, cov, weights, 100000, distribution=distribution, df=df)
 
     var_ref_normal, _ = var_cvar(ref_normal, alpha=0.95)
     var_ref_tdist, _ = var_cvar(ref_tdist, alpha=0.95)
@@ -173,8 +190,7 @@ def compare_normal_vs_tdist(returns, df=5, n_sims=10000, n_runs=100):
     # Normal
     vars_qmc_normal = []
     for _ in range(n_runs):
-        scenarios = qmc_sim(mu, cov, n_sims, method='sobol')
-        portfolio_ret = scenarios @ weights
+        portfolio_ret = simulate_portfolio_returns(mu, cov, weights, n_sims, method='sobol')
         var_val, _ = var_cvar(portfolio_ret, alpha=0.95)
         vars_qmc_normal.append(var_val)
 
@@ -183,8 +199,8 @@ def compare_normal_vs_tdist(returns, df=5, n_sims=10000, n_runs=100):
     # t-distribution
     vars_qmc_tdist = []
     for _ in range(n_runs):
-        scenarios = qmc_sim_tdist(mu, cov, n_sims, df=df, method='sobol')
-        portfolio_ret = scenarios @ weights
+        portfolio_ret = simulate_portfolio_returns(mu, cov, weights, n_sims, method='sobol',
+                                                   distribution=distribution, df=df)
         var_val, _ = var_cvar(portfolio_ret, alpha=0.95)
         vars_qmc_tdist.append(var_val)
 
@@ -202,7 +218,7 @@ def main():
     print("=" * 60)
 
     # Load 3-asset returns (same as main experiments)
-    returns = pd.read_csv(DATA_PATH / "returns.csv", index_col=0, parse_dates=True)
+    returns = load_returns(path=DATA_PATH)
     print(f"\nLoaded returns: {returns.shape}")
     print(f"Assets: {list(returns.columns)}")
 
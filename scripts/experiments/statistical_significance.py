@@ -11,31 +11,40 @@ import sys
 from scipy import stats
 sys.path.append(str(Path(__file__).parent.parent))
 
-from simulation.mc_sim import mc_sim
-from simulation.qmc_sim import qmc_sim
-from var_cvar.var_cvar import var_cvar
+from simulation.batch_sim import simulate_batch
+from simulation.scenario_store import stored_scenarios
+from var_cvar.var_cvar import tail_stats
+from preprocessing.storage import load_returns
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATA_PATH = PROJECT_ROOT / "data" / "processed"
 RESULTS_PATH = PROJECT_ROOT / "results" / "simulation"
 RESULTS_PATH.mkdir(parents=True, exist_ok=True)
 
-def bootstrap_var_comparison(returns, weights, n_sims=10000, n_bootstrap=100, alpha=0.95):
+def bootstrap_var_comparison(returns, weights, n_sims=10000, n_bootstrap=100, alpha=0.95, alphas=None):
     """
     Bootstrap analysis to test if MC vs QMC differences are statistically significant
 
-    Returns 95% confidence intervals for VaR estimates
+    Returns 95% confidence intervals for VaR estimates. If alphas is given,
+    every confidence level is evaluated on the same bootstrap scenario sets
+    and an 'alpha' column is added to the results.
     """
     print("\n" + "=" * 60)
     print("Bootstrap Confidence Interval Analysis")
     print("=" * 60)
     print(f"n_simulations: {n_sims}, n_bootstrap: {n_bootstrap}")
 
+    levels = np.atleast_1d(alpha if alphas is None else alphas)
+
     mu = returns.mean().values
     cov = returns.cov().values
 
+    # Same stored reference set as the convergence experiment
+    var_ref, _ = tail_stats(stored_scenarios(mu, cov, 500000, generator='mc', weights=weights), levels)
+
     results = {
         'method': [],
+        'alpha': [],
         'var_mean': [],
         'var_std': [],
         'var_ci_lower': [],
@@ -54,42 +63,32 @@ def bootstrap_var_comparison(returns, weights, n_sims=10000, n_bootstrap=100, al
 
     for method_name, method_type in methods:
         print(f"\n{method_name}:")
-        vars_bootstrap = []
-        cvars_bootstrap = []
-
-        for i in range(n_bootstrap):
-            if method_type == 'mc':
-                scenarios = mc_sim(mu, cov, n_sims)
-            else:
-                scenarios = qmc_sim(mu, cov, n_sims, method=method_type)
-
-            portfolio_ret = scenarios @ weights
-            var_val, cvar_val = var_cvar(portfolio_ret, alpha)
-            vars_bootstrap.append(var_val)
-            cvars_bootstrap.append(cvar_val)
-
-            if (i + 1) % 20 == 0:
-                print(f"  Progress: {i+1}/{n_bootstrap}")
-
-        vars_arr = np.array(vars_bootstrap)
-        cvars_arr = np.array(cvars_bootstrap)
-
-        # 95% confidence interval
-        var_ci = np.percentile(vars_arr, [2.5, 97.5])
-        cvar_ci = np.percentile(cvars_arr, [2.5, 97.5])
-
-        results['method'].append(method_name)
-        results['var_mean'].append(np.mean(vars_arr))
-        results['var_std'].append(np.std(vars_arr))
-        results['var_ci_lower'].append(var_ci[0])
-        results['var_ci_upper'].append(var_ci[1])
-        results['cvar_mean'].append(np.mean(cvars_arr))
-        results['cvar_std'].append(np.std(cvars_arr))
-        results['cvar_ci_lower'].append(cvar_ci[0])
-        results['cvar_ci_upper'].append(cvar_ci[1])
-
-        print(f"  VaR:  {np.mean(vars_arr):.6f} [{var_ci[0]:.6f}, {var_ci[1]:.6f}]")
-        print(f"  CVaR: {np.mean(cvars_arr):.6f} [{cvar_ci[0]:.6f}, {cvar_ci[1]:.6f}]")
+        portfolio_ret = simulate_batch(mu, cov, n_sims, n_runs=n_bootstrap,
+                                       method=method_type, weights=weights)
+        vars_all, cvars_all = tail_stats(portfolio_ret, levels)
+
+        for j, level in enumerate(levels):
+            vars_arr = vars_all[:, j]
+            cvars_arr = cvars_all[:, j]
+
+            # 95% confidence interval
+            var_ci = np.percentile(vars_arr, [2.5, 97.5])
+            cvar_ci = np.percentile(cvars_arr, [2.5, 97.5])
+
+            results['method'].append(method_name)
+            results['alpha'].append(level)
+            results['var_mean'].append(np.mean(vars_arr))
+            results['var_std'].append(np.std(vars_arr))
+            results['var_ci_lower'].append(var_ci[0])
+            results['var_ci_upper'].append(var_ci[1])
+            results['cvar_mean'].append(np.mean(cvars_arr))
+            results['cvar_std'].append(np.std(cvars_arr))
+            results['cvar_ci_lower'].append(cvar_ci[0])
+            results['cvar_ci_upper'].append(cvar_ci[1])
+
+            print(f"  VaR({level:.1%}):  {np.mean(vars_arr):.6f} [{var_ci[0]:.6f}, {var_ci[1]:.6f}]")
+            print(f"  CVaR({level:.1%}): {np.mean(cvars_arr):.6f} [{cvar_ci[0]:.6f}, {cvar_ci[1]:.6f}]")
+            print(f"  Bias vs reference VaR: {np.mean(vars_arr) - var_ref[j]:+.6f}")
 
     df_results = pd.DataFrame(results)
 
@@ -98,25 +97,31 @@ def bootstrap_var_comparison(returns, weights, n_sims=10000, n_bootstrap=100, al
     print("Confidence Interval Overlap Analysis")
     print("=" * 60)
 
-    mc_ci = (df_results.loc[df_results['method']=='MC', 'var_ci_lower'].values[0],
-             df_results.loc[df_results['method']=='MC', 'var_ci_upper'].values[0])
+    for level in levels:
+        df_level = df_results[df_results['alpha'] == level]
 
-    for method in ['QMC-Sobol', 'QMC-Halton']:
-        qmc_ci = (df_results.loc[df_results['method']==method, 'var_ci_lower'].values[0],
-                  df_results.loc[df_results['method']==method, 'var_ci_upper'].values[0])
+        mc_ci = (df_level.loc[df_level['method']=='MC', 'var_ci_lower'].values[0],
+                 df_level.loc[df_level['method']=='MC', 'var_ci_upper'].values[0])
 
-        overlap = max(0, min(mc_ci[1], qmc_ci[1]) - max(mc_ci[0], qmc_ci[0]))
+        for method in ['QMC-Sobol', 'QMC-Halton']:
+            qmc_ci = (df_level.loc[df_level['method']==method, 'var_ci_lower'].values[0],
+                      df_level.loc[df_level['method']==method, 'var_ci_upper'].values[0])
+
+            overlap = max(0, min(mc_ci[1], qmc_ci[1]) - max(mc_ci[0], qmc_ci[0]))
+
+            if overlap == 0:
+                significance = "✅ SIGNIFICANT (no overlap)"
+            else:
+                significance = "❌ NOT SIGNIFICANT (overlap detected)"
 
-        if overlap == 0:
-            significance = "✅ SIGNIFICANT (no overlap)"
-        else:
-            significance = "❌ NOT SIGNIFICANT (overlap detected)"
+            print(f"\nMC vs {method} (VaR {level:.1%}):")
+            print(f"  MC CI:  [{mc_ci[0]:.6f}, {mc_ci[1]:.6f}]")
+            print(f"  QMC CI: [{qmc_ci[0]:.6f}, {qmc_ci[1]:.6f}]")
+            print(f"  Overlap: {overlap:.6f}")
+            print(f"  {significance}")
 
-        print(f"\nMC vs {method}:")
-        print(f"  MC CI:  [{mc_ci[0]:.6f}, {mc_ci[1]:.6f}]")
-        print(f"  QMC CI: [{qmc_ci[0]:.6f}, {qmc_ci[1]:.6f}]")
-        print(f"  Overlap: {overlap:.6f}")
-        print(f"  {significance}")
+    if alphas is None:
+        df_results = df_results.drop(columns='alpha')
 
     return df_results
 
@@ -256,7 +261,7 @@ def main():
     print("=" * 60)
 
     # Load data
-    returns = pd.read_csv(DATA_PATH / "returns.csv", index_col=0, parse_dates=True)
+    returns = load_returns(path=DATA_PATH)
     weights = np.array([1/3, 1/3, 1/3])
 
     # Bootstrap analysis
@@ -1,6 +1,6 @@
 """
 RQ2: Variance Reduction Techniques Analysis
-Tests Antithetic Variates and Control Variates effectiveness
+Tests Antithetic Variates, Control Variates and Importance Sampling effectiveness
 """
 
 import numpy as np
@@ -12,8 +12,12 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from simulation.mc_sim import mc_sim
 from simulation.qmc_sim import qmc_sim
+from simulation.factorization import cholesky_factor
 from simulation.variance_reduction import antithetic, control_variate
-from var_cvar.var_cvar import var_cvar
+from simulation.importance_sampling import is_drift, is_portfolio_returns
+from var_cvar.var_cvar import var_cvar, weighted_var_cvar
+from instrumentation import stage, timed
+from preprocessing.storage import load_returns
 import time
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -32,13 +36,15 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     - QMC-Sobol (baseline)
     - QMC-Sobol + Antithetic
     - QMC-Sobol + Control Variate
+    - MC + Importance Sampling (mean shift to the VaR point, LR-weighted VaR/CVaR)
     """
     print("\n" + "=" * 60)
     print(f"Variance Reduction Analysis (n_sims={n_sims}, n_runs={n_runs})")
     print("=" * 60)
 
-    mu = returns.mean().values
-    cov = returns.cov().values
+    with stage('parameter_estimation'):
+        mu = returns.mean().values
+        cov = returns.cov().values
     control_mean = np.dot(mu, weights)  # Expected portfolio return
 
     results = {
@@ -53,7 +59,7 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     }
 
     # Baseline MC
-    print("\n[1/6] Running MC (baseline)...")
+    print("\n[1/7] Running MC (baseline)...")
     vars_mc, cvars_mc, times_mc = run_simulation('mc', mu, cov, weights, n_sims, n_runs, alpha)
     baseline_var_std = np.std(vars_mc)
     baseline_cvar_std = np.std(cvars_mc)
@@ -69,7 +75,7 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     print(f"  VaR Std: {baseline_var_std:.6f}")
 
     # MC + Antithetic
-    print("\n[2/6] Running MC + Antithetic...")
+    print("\n[2/7] Running MC + Antithetic...")
     vars_list, cvars_list, times_list = [], [], []
 
     for run in range(n_runs):
@@ -79,7 +85,7 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
         Z = np.random.randn(n_sims // 2, len(mu))
         Z_anti = antithetic(Z)
 
-        L = np.linalg.cholesky(cov)
+        L = cholesky_factor(cov)
         scenarios = mu + Z_anti @ L.T
 
         portfolio_ret = scenarios @ weights
@@ -104,7 +110,7 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     print(f"  VaR Std: {var_std:.6f}, Reduction: {var_reduction:.2f}%")
 
     # MC + Control Variate
-    print("\n[3/6] Running MC + Control Variate...")
+    print("\n[3/7] Running MC + Control Variate...")
     vars_list, cvars_list, times_list = [], [], []
 
     for run in range(n_runs):
@@ -138,7 +144,7 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     print(f"  VaR Std: {var_std:.6f}, Reduction: {var_reduction:.2f}%")
 
     # QMC baseline
-    print("\n[4/6] Running QMC-Sobol (baseline)...")
+    print("\n[4/7] Running QMC-Sobol (baseline)...")
     vars_qmc, cvars_qmc, times_qmc = run_simulation('qmc', mu, cov, weights, n_sims, n_runs, alpha)
     qmc_var_std = np.std(vars_qmc)
     qmc_cvar_std = np.std(cvars_qmc)
@@ -154,17 +160,17 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     print(f"  VaR Std: {qmc_var_std:.6f}")
 
     # QMC + Antithetic
-    print("\n[5/6] Running QMC-Sobol + Antithetic...")
+    print("\n[5/7] Running QMC-Sobol + Antithetic...")
     vars_list, cvars_list, times_list = [], [], []
 
     for run in range(n_runs):
         t_start = time.time()
 
         scenarios = qmc_sim(mu, cov, n_sims // 2, method='sobol')
-        Z = (scenarios - mu) @ np.linalg.inv(np.linalg.cholesky(cov)).T
+        Z = (scenarios - mu) @ np.linalg.inv(cholesky_factor(cov)).T
         Z_anti = antithetic(Z)
 
-        L = np.linalg.cholesky(cov)
+        L = cholesky_factor(cov)
         scenarios_anti = mu + Z_anti @ L.T
 
         portfolio_ret = scenarios_anti @ weights
@@ -188,7 +194,7 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     print(f"  VaR Std: {var_std:.6f}")
 
     # QMC + Control Variate
-    print("\n[6/6] Running QMC-Sobol + Control Variate...")
+    print("\n[6/7] Running QMC-Sobol + Control Variate...")
     vars_list, cvars_list, times_list = [], [], []
 
     for run in range(n_runs):
@@ -217,8 +223,41 @@ def variance_reduction_experiment(returns, weights, n_sims=10000, n_runs=100, al
     results['time_mean'].append(np.mean(times_list))
     print(f"  VaR Std: {var_std:.6f}")
 
+    # MC + Importance Sampling
+    print("\n[7/7] Running MC + Importance Sampling...")
+    vars_list, cvars_list, times_list = [], [], []
+
+    L = cholesky_factor(cov)
+    theta = is_drift(mu, cov, weights, alpha, drift='dominating', L=L)
+
+    for run in range(n_runs):
+        t_start = time.time()
+
+        portfolio_ret, lr_weights = is_portfolio_returns(mu, cov, weights, n_sims, alpha,
+                                                         drift=theta, L=L)
+        var_val, cvar_val = weighted_var_cvar(portfolio_ret, lr_weights, alpha)
+
+        vars_list.append(var_val)
+        cvars_list.append(cvar_val)
+        times_list.append(time.time() - t_start)
+
+    var_std = np.std(vars_list)
+    cvar_std = np.std(cvars_list)
+    var_reduction = (1 - var_std / baseline_var_std) * 100
+
+    results['method'].append('MC + Importance Sampling')
+    results['var_mean'].append(np.mean(vars_list))
+    results['var_std'].append(var_std)
+    results['var_reduction'].append(var_reduction)
+    results['cvar_mean'].append(np.mean(cvars_list))
+    results['cvar_std'].append(cvar_std)
+    results['cvar_reduction'].append((1 - cvar_std / baseline_cvar_std) * 100)
+    results['time_mean'].append(np.mean(times_list))
+    print(f"  VaR Std: {var_std:.6f}, Reduction: {var_reduction:.2f}%")
+
     df_results = pd.DataFrame(results)
-    df_results.to_csv(RESULTS_PATH / "variance_reduction_results.csv", index=False)
+    with stage('csv_io'):
+        df_results.to_csv(RESULTS_PATH / "variance_reduction_results.csv", index=False)
 
     print("\n✅ Variance reduction experiment complete!")
     print(f"Results saved to: {RESULTS_PATH / 'variance_reduction_results.csv'}")
@@ -246,6 +285,7 @@ def run_simulation(sim_type, mu, cov, weights, n_sims, n_runs, alpha):
 
     return vars_list, cvars_list, times_list
 
+@timed('plotting')
 def plot_variance_reduction(df_results, save_path=None):
     """Plot variance reduction comparison"""
     if save_path is None:
@@ -281,7 +321,8 @@ def main():
     print("=" * 60)
 
     # Load returns
-    returns = pd.read_csv(DATA_PATH / "returns.csv", index_col=0, parse_dates=True)
+    with stage('csv_io'):
+        returns = load_returns(path=DATA_PATH)
     weights = np.array([1/3, 1/3, 1/3])
 
     # Run experiment
@@ -0,0 +1,164 @@
+"""
+Per-stage timing instrumentation for the experiment runner
+
+Library code marks its stages with
+
+    with stage('random_generation'):
+        Z = rng.standard_normal((n, d))
+
+or with the @timed('statistical_tests') decorator. While instrumentation is
+disabled (the default) stage() returns a shared no-op context manager and
+timed functions call straight through, so the markers cost one flag check.
+
+Stage names used across the project: parameter_estimation,
+random_generation, inverse_cdf, cholesky, projection, quantile,
+statistical_tests, plotting and csv_io.
+
+Stages nest: each record is keyed by its full path, e.g.
+('convergence', 'random_generation'), with inclusive and self (exclusive)
+time. Only the calling process is recorded; stages executed inside
+ProcessPoolExecutor workers are not collected.
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+# path tuple -> [calls, inclusive seconds, self seconds]
+_records = defaultdict(lambda: [0, 0.0, 0.0])
+
+class _NullStage:
+    """Shared no-op context manager returned while disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if not hasattr(_local, 'names'):
+            _local.names = []
+            _local.child_time = []
+        _local.names.append(self.name)
+        _local.child_time.append(0.0)
+        self.t_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t_start
+        path = tuple(_local.names)
+        children = _local.child_time.pop()
+        _local.names.pop()
+        if _local.child_time:
+            _local.child_time[-1] += elapsed
+
+        with _lock:
+            record = _records[path]
+            record[0] += 1
+            record[1] += elapsed
+            record[2] += elapsed - children
+        return False
+
+def stage(name):
+    """Context manager timing a named stage (no-op while disabled)"""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+def timed(name=None):
+    """Decorator timing every call of a function as a stage"""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Discard all recorded timings"""
+    with _lock:
+        _records.clear()
+
+def records():
+    """
+    All recorded stages
+
+    Returns:
+    --------
+    df : DataFrame
+        One row per stage path with columns path, stage, calls, total_s
+        (inclusive) and self_s (exclusive of nested stages)
+    """
+    with _lock:
+        rows = [
+            {'path': '/'.join(path), 'stage': path[-1], 'calls': calls,
+             'total_s': total, 'self_s': own}
+            for path, (calls, total, own) in _records.items()
+        ]
+    columns = ['path', 'stage', 'calls', 'total_s', 'self_s']
+    return pd.DataFrame(rows, columns=columns).sort_values('self_s', ascending=False)
+
+def breakdown(prefix=None):
+    """
+    Self time per stage name, optionally restricted to paths under prefix
+
+    Time not covered by any nested stage is reported under the prefix
+    stage itself (e.g. the experiment's own bookkeeping).
+    """
+    df = records()
+    if prefix is not None:
+        df = df[(df['path'] == prefix) | df['path'].str.startswith(prefix + '/')]
+
+    summary = df.groupby('stage').agg(calls=('calls', 'sum'), self_s=('self_s', 'sum'))
+    summary = summary.sort_values('self_s', ascending=False)
+    total = summary['self_s'].sum()
+    summary['share'] = summary['self_s'] / total if total > 0 else 0.0
+    return summary
+
+def print_breakdown(prefix=None, title=None):
+    summary = breakdown(prefix)
+    total = summary['self_s'].sum()
+
+    print(f"\n⏱️  Stage breakdown{': ' + title if title else ''} (total {total:.2f}s)")
+    for name, row in summary.iterrows():
+        print(f"  {name:24s} {row['self_s']:9.3f}s  {row['share']:6.1%}  ({int(row['calls']):,} calls)")
+
+def write_folded(path):
+    """
+    Write self times in folded-stack format ("a;b;c <microseconds>"),
+    the input format of flamegraph.pl / speedscope / inferno
+    """
+    with _lock:
+        lines = [f"{';'.join(stack)} {int(round(own * 1e6))}"
+                 for stack, (_, _, own) in _records.items() if own > 0]
+    with open(path, 'w') as f:
+        f.write("\n".join(sorted(lines)) + "\n")
@@ -1,52 +1,172 @@
 """
 Full Pipeline: Data Download -> Preprocessing -> All Experiments
+
+Runs every step in-process, handing prices, returns and covariance cubes
+from one step to the next in memory. Checkpoints (raw CSVs, returns.csv/.npz,
+covariance pickles and .npy cubes) are written by default so the experiments
+and later runs can pick them up; --resume reuses the raw price files instead
+of downloading them again. Pass --yes for unattended (nightly) runs.
+
+Usage:
+    python scripts/pipeline.py [--yes | --no-experiments] [--resume]
+                               [--no-checkpoint] [--workers N]
 """
 
-import os
 import sys
+import argparse
 from pathlib import Path
 
-def main():
-    print("=" * 80)
-    print("MONTE CARLO vs QUASI-MONTE CARLO VaR/CVaR")
-    print("Complete Research Pipeline")
-    print("=" * 80)
+SCRIPTS_PATH = Path(__file__).parent
+sys.path.append(str(SCRIPTS_PATH))
 
-    # Step 1: Data Download
-    print("\n[STEP 1/4] Downloading market data...")
-    ret = os.system("python3 download/download_data.py")
-    if ret != 0:
-        print("❌ Data download failed!")
-        sys.exit(1)
+from preprocessing import compute_returns as returns_step
+from preprocessing import compute_covariance as covariance_step
+from preprocessing import storage
 
-    # Step 2: Compute Returns
-    print("\n[STEP 2/4] Computing returns...")
-    ret = os.system("python3 preprocessing/compute_returns.py")
-    if ret != 0:
-        print("❌ Returns computation failed!")
-        sys.exit(1)
+class Pipeline:
+    """
+    In-process research pipeline
 
-    # Step 3: Compute Covariance
-    print("\n[STEP 3/4] Computing covariance matrices...")
-    ret = os.system("python3 preprocessing/compute_covariance.py")
-    if ret != 0:
-        print("❌ Covariance computation failed!")
-        sys.exit(1)
+    Parameters:
+    -----------
+    checkpoint : bool
+        Persist each step's output under data/
+    resume : bool
+        Reuse existing raw price files instead of downloading them
+    """
+
+    def __init__(self, checkpoint=True, resume=False):
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.raw = None
+        self.returns = None
+        self.covariances = None
+
+    def download(self):
+        """Step 1: daily prices for every ticker"""
+        raw_files = [returns_step.RAW_PATH / f"{name}.csv" for name in returns_step.ASSETS]
+        if self.resume and all(path.exists() for path in raw_files):
+            print("⏭️  Using existing raw price files")
+            self.raw = returns_step.load_raw()
+            return self.raw
+
+        # Imported here so the other steps do not require yfinance
+        from download import download_data
+        self.raw = download_data.download_prices()
+        if self.checkpoint:
+            download_data.save_raw(self.raw)
+        return self.raw
+
+    def compute_returns(self):
+        """Step 2: log returns of the portfolio assets"""
+        if self.raw is None:
+            self.raw = returns_step.load_raw()
+        self.returns = returns_step.compute_returns(self.raw)
+        if self.checkpoint:
+            self.save_returns()
+
+        print(f"Returns shape: {self.returns.shape}")
+        print(f"Date range: {self.returns.index[0]} to {self.returns.index[-1]}")
+        return self.returns
+
+    def compute_covariance(self):
+        """Step 3: rolling and EWMA covariance cubes"""
+        self.covariances = covariance_step.compute_rolling_covariances(
+            self.returns, ewma_lambda=covariance_step.EWMA_LAMBDA)
+        if self.checkpoint:
+            covariance_step.save_covariances(self.covariances)
+
+        for key, cube in self.covariances.items():
+            print(f"{covariance_step.cube_name(key)} shape: {cube.cube.shape}")
+        return self.covariances
+
+    def save_returns(self):
+        path = returns_step.PROCESSED_PATH / "returns.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.returns.to_csv(path)
+        storage.save_returns(self.returns, path=path.parent)
+
+    def run_experiments(self, workers=1, force=False):
+        """Step 4: all experiments via the scheduler; True if all succeeded"""
+        # Experiments read returns.csv, so it must be on disk
+        if not self.checkpoint:
+            self.save_returns()
 
-    print("\n✅ Data preparation complete!")
+        import run_all_experiments
+        argv = ['--workers', str(workers)] + (['--force'] if force else [])
+        return run_all_experiments.main(argv)
+
+    def run(self, experiments=False, workers=1, force=False):
+        """Run the data steps and, if requested, the experiments"""
+        print("\n[STEP 1/4] Downloading market data...")
+        self.download()
+
+        print("\n[STEP 2/4] Computing returns...")
+        self.compute_returns()
+
+        print("\n[STEP 3/4] Computing covariance matrices...")
+        self.compute_covariance()
+
+        print("\n✅ Data preparation complete!")
+
+        if not experiments:
+            return True
+
+        print("\n[STEP 4/4] Running all experiments...")
+        return self.run_experiments(workers=workers, force=force)
+
+def confirm_experiments(args):
+    """Decide whether to run the experiments without blocking a batch job"""
+    if args.yes:
+        return True
+    if args.no_experiments:
+        return False
+    if not sys.stdin.isatty():
+        print("\nNon-interactive session: skipping experiments (pass --yes to run them)")
+        return False
 
-    # Step 4: Run All Experiments
-    print("\n[STEP 4/4] Running all experiments...")
     print("\nThis will run:")
     print("  - RQ1 & RQ3: Convergence Analysis")
     print("  - RQ2: Variance Reduction Techniques")
     print("  - RQ4: Stress Period Backtesting")
     print("  - RQ5: Boundary Condition Analysis")
-
+    print("  - Statistical Significance Testing")
     response = input("\nProceed with experiments? This may take 20-30 minutes. (y/n): ")
-    if response.lower() == 'y':
-        ret = os.system("python3 run_all_experiments.py")
-        if ret != 0:
+    return response.lower() == 'y'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Complete research pipeline")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--yes', '-y', action='store_true',
+                       help="run the experiments without prompting (batch mode)")
+    group.add_argument('--no-experiments', action='store_true',
+                       help="only prepare the data")
+    parser.add_argument('--resume', action='store_true',
+                        help="reuse existing raw price files instead of downloading")
+    parser.add_argument('--no-checkpoint', action='store_true',
+                        help="keep intermediate results in memory only")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="experiments run concurrently")
+    parser.add_argument('--force', action='store_true',
+                        help="rerun experiments even if up to date")
+    args = parser.parse_args(argv)
+
+    print("=" * 80)
+    print("MONTE CARLO vs QUASI-MONTE CARLO VaR/CVaR")
+    print("Complete Research Pipeline")
+    print("=" * 80)
+
+    pipeline = Pipeline(checkpoint=not args.no_checkpoint, resume=args.resume)
+
+    try:
+        pipeline.run(experiments=False)
+    except Exception as e:
+        print(f"❌ Data preparation failed: {e}")
+        sys.exit(1)
+
+    if confirm_experiments(args):
+        print("\n[STEP 4/4] Running all experiments...")
+        if not pipeline.run_experiments(workers=args.workers, force=args.force):
             print("❌ Some experiments failed!")
             sys.exit(1)
     else:
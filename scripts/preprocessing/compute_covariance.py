@@ -1,23 +1,151 @@
+import numpy as np
 import pandas as pd
 import os
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scipy.signal import lfilter
+from preprocessing.storage import CovCube, save_cov_cube, load_cov_cube, load_returns
 
 # Get project root directory
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 PROC = PROJECT_ROOT / "data" / "processed"
 
-def main():
-    returns = pd.read_csv(PROC / "returns.csv", index_col=0, parse_dates=True)
+# 252 is the training window of the rolling VaR backtests
+WINDOWS = (20, 60, 252)
+
+# RiskMetrics decay factor for daily data
+EWMA_LAMBDA = 0.94
+
+def rolling_cov_cube(returns, window, ddof=1):
+    """
+    Rolling mean and covariance of every full window as a (T - window + 1, d, d) cube
+
+    Window sums of x and x x^T are differences of cumulative sums, so all
+    windows are computed in O(T d^2) without a per-day .cov(). Returns are
+    centred on their full-sample mean first, which keeps the cumulative
+    sums small and the differences free of cancellation.
+
+    Parameters:
+    -----------
+    returns : DataFrame, shape (T, d)
+    window : int
+    ddof : int
+        Delta degrees of freedom (1 matches DataFrame.rolling().cov())
+
+    Returns:
+    --------
+    cube : CovCube
+        Row j covers returns[j:j+window] and is dated by its last day,
+        as in DataFrame.rolling(); cube.means holds the window means
+    """
+    X = np.asarray(returns, dtype=np.float64)
+    T, d = X.shape
+    if T < window:
+        raise ValueError(f"{T} observations are fewer than the window ({window})")
+
+    center = X.mean(axis=0)
+    Xc = X - center
+
+    S1 = np.zeros((T + 1, d))
+    np.cumsum(Xc, axis=0, out=S1[1:])
+    S2 = np.zeros((T + 1, d, d))
+    np.cumsum(Xc[:, :, None] * Xc[:, None, :], axis=0, out=S2[1:])
+
+    mean_c = (S1[window:] - S1[:-window]) / window
+    cov = S2[window:] - S2[:-window]
+    cov -= window * mean_c[:, :, None] * mean_c[:, None, :]
+    cov /= window - ddof
+
+    return CovCube(returns.index[window - 1:], returns.columns, cov, means=mean_c + center)
+
+def ewma_cov_cube(returns, lam=EWMA_LAMBDA):
+    """
+    RiskMetrics EWMA covariance S_t = lam S_{t-1} + (1 - lam) r_t r_t^T
+
+    The recursion runs over all d*d entries at once with scipy.signal.lfilter.
+    Means are zero as in RiskMetrics; the recursion is seeded with the
+    second moment of the first ceil(1 / (1 - lam)) days.
 
-    cov20 = returns.rolling(20).cov().dropna()
-    cov60 = returns.rolling(60).cov().dropna()
+    Returns:
+    --------
+    cube : CovCube
+        Row t uses returns up to and including day t
+    """
+    X = np.asarray(returns, dtype=np.float64)
+    T, d = X.shape
+
+    n_init = min(T, int(np.ceil(1 / (1 - lam))))
+    S0 = X[:n_init].T @ X[:n_init] / n_init
+
+    outer = (X[:, :, None] * X[:, None, :]).reshape(T, d * d)
+    cov = lfilter([1 - lam], [1, -lam], outer, axis=0, zi=lam * S0.reshape(1, d * d))[0]
+
+    return CovCube(returns.index, returns.columns, cov.reshape(T, d, d), means=np.zeros((T, d)))
+
+def compute_rolling_covariances(returns, windows=WINDOWS, ewma_lambda=None):
+    """Rolling covariance cubes as {window: CovCube}, plus {'ewma': CovCube} if ewma_lambda is set"""
+    covariances = {w: rolling_cov_cube(returns, w) for w in windows}
+    if ewma_lambda is not None:
+        covariances['ewma'] = ewma_cov_cube(returns, ewma_lambda)
+    return covariances
+
+def cube_name(key):
+    """File stem of a covariance cube: cov20, cov60, ..., cov_ewma"""
+    return f"cov{key}" if isinstance(key, int) else f"cov_{key}"
+
+def save_covariances(covariances, path=PROC):
+    """Write each cube as a memory-mappable .npy (and the rolling windows as the legacy .pkl panel)"""
+    for key, cube in covariances.items():
+        save_cov_cube(cube, cube_name(key), path)
+        if isinstance(key, int):
+            cube.to_frame().to_pickle(path / f"{cube_name(key)}.pkl")
+
+def _matches_returns(cube, returns, window):
+    """
+    Whether a stored cube was built from exactly these returns: same
+    dates and assets, the same window means (cheap cumulative sums) and
+    the same covariance in the first and last window
+    """
+    if (cube.means is None or cube.columns != list(returns.columns)
+            or not cube.dates.equals(pd.DatetimeIndex(returns.index[window - 1:]))):
+        return False
+
+    X = np.asarray(returns, dtype=np.float64)
+    S1 = np.zeros((len(X) + 1, X.shape[1]))
+    np.cumsum(X, axis=0, out=S1[1:])
+    means = (S1[window:] - S1[:-window]) / window
+    if not np.allclose(cube.means, means, rtol=1e-9, atol=1e-12):
+        return False
+
+    return all(np.allclose(cube.cube[j], np.cov(X[j:j + window], rowvar=False), rtol=1e-9, atol=1e-15)
+               for j in (0, len(cube) - 1))
+
+def rolling_cube(returns, window, path=PROC):
+    """
+    Rolling covariance cube of `returns`, read from <path>/cov{window}.npy
+    when the stored cube was built from these returns (same dates, assets
+    and data), computed otherwise
+    """
+    try:
+        cube = load_cov_cube(cube_name(window), path)
+    except FileNotFoundError:
+        cube = None
+
+    if cube is not None and _matches_returns(cube, returns, window):
+        return cube
+    return rolling_cov_cube(returns, window)
+
+def main():
+    returns = load_returns(path=PROC)
 
-    cov20.to_pickle(PROC / "cov20.pkl")
-    cov60.to_pickle(PROC / "cov60.pkl")
+    covariances = compute_rolling_covariances(returns, ewma_lambda=EWMA_LAMBDA)
+    save_covariances(covariances)
 
     print("공분산 계산 완료!")
-    print(f"Cov20 shape: {cov20.shape}")
-    print(f"Cov60 shape: {cov60.shape}")
+    for key, cube in covariances.items():
+        print(f"{cube_name(key)} shape: {cube.cube.shape}")
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 import os
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from preprocessing.storage import save_returns
 
 # Get project root directory
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -9,22 +13,27 @@ RAW_PATH = PROJECT_ROOT / "data" / "raw"
 PROCESSED_PATH = PROJECT_ROOT / "data" / "processed"
 os.makedirs(PROCESSED_PATH, exist_ok=True)
 
-def main():
-    kospi = pd.read_csv(RAW_PATH / "KOSPI200.csv", index_col=0, parse_dates=True)
-    ktb3y = pd.read_csv(RAW_PATH / "KTB3Y.csv", index_col=0, parse_dates=True)
-    ktb10y = pd.read_csv(RAW_PATH / "KTB10Y.csv", index_col=0, parse_dates=True)
+ASSETS = ["KOSPI200", "KTB3Y", "KTB10Y"]
+
+def load_raw(path=RAW_PATH, assets=ASSETS):
+    """Read the raw price CSVs of the portfolio assets as {name: DataFrame}"""
+    return {name: pd.read_csv(path / f"{name}.csv", index_col=0, parse_dates=True)
+            for name in assets}
 
+def compute_returns(raw, assets=ASSETS):
+    """Daily log returns of the portfolio assets on their common dates"""
     # Check available columns and use appropriate price column
-    price_col = "Adj Close" if "Adj Close" in kospi.columns else "Close"
+    first = raw[assets[0]]
+    price_col = "Adj Close" if "Adj Close" in first.columns else "Close"
 
-    prices = pd.DataFrame({
-        "KOSPI200": kospi[price_col],
-        "KTB3Y": ktb3y[price_col],
-        "KTB10Y": ktb10y[price_col]
-    }).dropna()
+    prices = pd.DataFrame({name: raw[name][price_col] for name in assets}).dropna()
 
-    returns = np.log(prices / prices.shift(1)).dropna()
+    return np.log(prices / prices.shift(1)).dropna()
+
+def main():
+    returns = compute_returns(load_raw())
     returns.to_csv(PROCESSED_PATH / "returns.csv")
+    save_returns(returns, path=PROCESSED_PATH)
 
     print("수익률 계산 완료!")
     print(f"Returns shape: {returns.shape}")
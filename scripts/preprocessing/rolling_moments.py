@@ -0,0 +1,178 @@
+"""
+Incremental rolling-window mean / covariance / Cholesky engine
+
+Slides a fixed-length window over the return history, updating the mean
+vector, the centred cross-product matrix and its Cholesky factor with a
+rank-1 update (new day) and rank-1 downdate (day leaving the window)
+instead of recomputing .mean() / .cov() from scratch every day.
+"""
+
+import numpy as np
+from collections import namedtuple
+from instrumentation import stage
+from simulation.factorization import batched_cholesky
+
+WindowMoments = namedtuple('WindowMoments', ['t', 'date', 'mu', 'cov', 'chol'])
+
+def cholesky_update(L, x, downdate=False):
+    """
+    Rank-1 update / downdate of a lower Cholesky factor
+
+    Returns L' with L' L'^T = L L^T + x x^T (or - x x^T when downdate=True).
+    Raises np.linalg.LinAlgError if a downdate loses positive definiteness.
+    """
+    L = L.copy()
+    x = np.array(x, dtype=float)
+    sign = -1.0 if downdate else 1.0
+    d = len(x)
+
+    for k in range(d):
+        r2 = L[k, k]**2 + sign * x[k]**2
+        if r2 <= 0:
+            raise np.linalg.LinAlgError("Cholesky downdate is not positive definite")
+        r = np.sqrt(r2)
+        c = r / L[k, k]
+        s = x[k] / L[k, k]
+        L[k, k] = r
+        if k + 1 < d:
+            L[k+1:, k] = (L[k+1:, k] + sign * s * x[k+1:]) / c
+            x[k+1:] = c * x[k+1:] - s * L[k+1:, k]
+
+    return L
+
+def _window_state(X):
+    """Exact mean, centred cross-product matrix and its Cholesky factor"""
+    mean = X.mean(axis=0)
+    centred = X - mean
+    M = centred.T @ centred
+    try:
+        L = np.linalg.cholesky(M)
+    except np.linalg.LinAlgError:
+        L = None
+    return mean, M, L
+
+def rolling_moments(returns, window=252, start=None, stop=None, refresh=None):
+    """
+    Generator of rolling-window moments for each forecast day
+
+    For every position t in [max(window, start), stop) yields the sample
+    mean, covariance (ddof=1, identical to DataFrame.cov()) and covariance
+    Cholesky factor estimated from returns[t-window:t].
+
+    Parameters:
+    -----------
+    returns : DataFrame or ndarray, shape (T, d)
+        Historical returns
+    window : int
+        Rolling window length
+    start, stop : int, optional
+        Range of forecast positions to generate (default: all)
+    refresh : int, optional
+        Recompute the window exactly every `refresh` steps to bound
+        floating-point drift (default: window). Refresh points are anchored
+        at positions window + k * refresh, so any [start, stop) slice yields
+        bit-identical moments to a full pass
+
+    Yields:
+    -------
+    WindowMoments(t, date, mu, cov, chol)
+        chol is None if the window covariance is not positive definite
+    """
+    X = np.asarray(returns, dtype=float)
+    index = getattr(returns, 'index', None)
+    n_obs = len(X)
+
+    first = window if start is None else max(start, window)
+    last = n_obs if stop is None else min(stop, n_obs)
+    if refresh is None:
+        refresh = window
+
+    # Coefficients of the add-then-remove update for a fixed window size
+    add_scale = np.sqrt(window / (window + 1))
+    remove_scale = np.sqrt((window + 1) / window)
+
+    mean = M = L = None
+
+    # Start from the refresh point preceding `first`
+    anchor = window + ((first - window) // refresh) * refresh
+
+    for t in range(anchor, last):
+        with stage('parameter_estimation'):
+            if (t - window) % refresh == 0:
+                mean, M, L = _window_state(X[t-window:t])
+            else:
+                x_new = X[t-1]
+                x_old = X[t-1-window]
+
+                # Add the newest day (window -> window + 1 observations)
+                delta = x_new - mean
+                mean = mean + delta / (window + 1)
+                M = M + (window / (window + 1)) * np.outer(delta, delta)
+
+                # Remove the oldest day (window + 1 -> window observations)
+                delta_old = x_old - mean
+                mean = mean - delta_old / window
+                M = M - ((window + 1) / window) * np.outer(delta_old, delta_old)
+
+                try:
+                    if L is None:
+                        raise np.linalg.LinAlgError
+                    L = cholesky_update(L, add_scale * delta)
+                    L = cholesky_update(L, remove_scale * delta_old, downdate=True)
+                except np.linalg.LinAlgError:
+                    # Downdate lost definiteness: refactor exactly
+                    mean, M, L = _window_state(X[t-window:t])
+
+        if t < first:
+            continue
+
+        date = index[t] if index is not None else t
+        cov = M / (window - 1)
+        chol = L / np.sqrt(window - 1) if L is not None else None
+
+        yield WindowMoments(t, date, mean, cov, chol)
+
+def cube_moments(returns, cube, start=None, stop=None):
+    """
+    Rolling-window moments read from a precomputed covariance cube
+
+    Same contract as rolling_moments(), but mu and cov come from `cube`
+    (see preprocessing.compute_covariance.rolling_cov_cube), and the
+    Cholesky factors of the requested range are computed in one batched
+    call. Windows whose covariance is not positive definite get a repaired
+    factor (see simulation.factorization.batched_cholesky), so chol is
+    never None.
+
+    Parameters:
+    -----------
+    returns : DataFrame or ndarray, shape (T, d)
+        Historical returns the cube was built from
+    cube : CovCube
+        Rolling cube of returns with means, one row per full window
+        (T - window + 1 rows)
+    start, stop : int, optional
+        Range of forecast positions to generate (default: all)
+
+    Yields:
+    -------
+    WindowMoments(t, date, mu, cov, chol)
+    """
+    n_obs = len(returns)
+    window = n_obs - len(cube) + 1
+    index = getattr(returns, 'index', None)
+
+    first = window if start is None else max(start, window)
+    last = n_obs if stop is None else min(stop, n_obs)
+    if first >= last:
+        return
+
+    # Forecast day t uses the window ending on day t - 1
+    rows = slice(first - window, last - window)
+    with stage('parameter_estimation'):
+        means = np.asarray(cube.means[rows])
+        covs = np.asarray(cube.cube[rows])
+        chols = batched_cholesky(covs)
+
+    for k, t in enumerate(range(first, last)):
+        date = index[t] if index is not None else t
+        yield WindowMoments(t, date, means[k], covs[k], chols[k])
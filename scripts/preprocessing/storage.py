@@ -0,0 +1,144 @@
+"""
+Binary storage for processed returns and covariance artifacts
+
+- Returns: <name>.npz with the (T, d) float64 values, the date index as
+  int64 nanoseconds and the column names. load_returns() prefers the .npz
+  and falls back to parsing <name>.csv (writing the .npz cache) when the
+  binary file is missing or older than the CSV.
+- Covariances: cov<w>.npy, a contiguous (T, d, d) float64 cube that can be
+  memory-mapped, plus cov<w>_index.npz with its dates, columns and (if
+  known) the window means. CovCube
+  looks matrices up by date with a binary search instead of a pandas
+  MultiIndex.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+PROCESSED_PATH = PROJECT_ROOT / "data" / "processed"
+
+def _atomic_savez(target, **arrays):
+    """np.savez to a temporary file renamed over target, so concurrent
+    experiments never read a half-written cache"""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, target)
+
+def _atomic_save(target, array):
+    """np.save counterpart of _atomic_savez (the .npy may be memory-mapped by readers)"""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, target)
+
+def save_returns(returns, name="returns", path=PROCESSED_PATH):
+    """Write a returns DataFrame as <path>/<name>.npz"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    _atomic_savez(path / f"{name}.npz",
+                  values=np.ascontiguousarray(returns.values, dtype=np.float64),
+                  dates=returns.index.values.astype('datetime64[ns]').astype(np.int64),
+                  columns=np.array(returns.columns, dtype=str))
+
+def load_returns(name="returns", path=PROCESSED_PATH):
+    """
+    Load a returns DataFrame (date index, one column per asset)
+
+    Reads <name>.npz when it is at least as new as <name>.csv; otherwise
+    parses the CSV once and refreshes the .npz for the next call.
+    """
+    path = Path(path)
+    npz_path = path / f"{name}.npz"
+    csv_path = path / f"{name}.csv"
+
+    binary_fresh = npz_path.exists() and (
+        not csv_path.exists() or npz_path.stat().st_mtime >= csv_path.stat().st_mtime)
+
+    if binary_fresh:
+        with np.load(npz_path) as data:
+            index = pd.DatetimeIndex(data['dates'].astype('datetime64[ns]'), name='Date')
+            return pd.DataFrame(data['values'], index=index, columns=list(data['columns']))
+
+    returns = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+    save_returns(returns, name, path)
+    return returns
+
+class CovCube:
+    """
+    Covariance matrices of consecutive dates stored as a (T, d, d) array
+
+    Parameters:
+    -----------
+    dates : DatetimeIndex, length T
+    columns : list of str, length d
+    cube : ndarray or np.memmap, shape (T, d, d)
+    means : ndarray, shape (T, d), optional
+        Mean vector belonging to each covariance matrix
+    """
+
+    def __init__(self, dates, columns, cube, means=None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.columns = list(columns)
+        self.cube = cube
+        self.means = means
+        self._keys = self.dates.values.astype('datetime64[ns]').astype(np.int64)
+
+    def __len__(self):
+        return len(self.cube)
+
+    def position(self, date):
+        """Row of `date` in the cube (KeyError if absent)"""
+        key = np.datetime64(pd.Timestamp(date), 'ns').astype(np.int64)
+        i = np.searchsorted(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            raise KeyError(date)
+        return int(i)
+
+    def at(self, date):
+        """(d, d) covariance matrix of `date`"""
+        return self.cube[self.position(date)]
+
+    def to_frame(self):
+        """Long-format MultiIndex DataFrame as produced by DataFrame.rolling().cov()"""
+        T, d, _ = self.cube.shape
+        index = pd.MultiIndex.from_product([self.dates, self.columns])
+        return pd.DataFrame(np.asarray(self.cube).reshape(T * d, d), index=index, columns=self.columns)
+
+    @classmethod
+    def from_frame(cls, panel):
+        """Build from a long-format (date, asset) x asset covariance DataFrame"""
+        columns = list(panel.columns)
+        d = len(columns)
+        values = np.ascontiguousarray(panel.values, dtype=np.float64).reshape(-1, d, d)
+        dates = panel.index.get_level_values(0)[::d]
+        return cls(dates, columns, values)
+
+def save_cov_cube(cube, name, path=PROCESSED_PATH):
+    """Write <path>/<name>.npy (the cube) and <path>/<name>_index.npz"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    # Both files are replaced atomically, cube first, so a reader never
+    # maps a truncated cube
+    _atomic_save(path / f"{name}.npy", np.ascontiguousarray(cube.cube, dtype=np.float64))
+    index = {'dates': cube.dates.values.astype('datetime64[ns]').astype(np.int64),
+             'columns': np.array(cube.columns, dtype=str)}
+    if cube.means is not None:
+        index['means'] = np.asarray(cube.means, dtype=np.float64)
+    _atomic_savez(path / f"{name}_index.npz", **index)
+
+def load_cov_cube(name, path=PROCESSED_PATH, mmap=True):
+    """Load a CovCube, memory-mapping the (T, d, d) array by default"""
+    path = Path(path)
+    cube = np.load(path / f"{name}.npy", mmap_mode='r' if mmap else None)
+    with np.load(path / f"{name}_index.npz") as index:
+        dates = index['dates'].astype('datetime64[ns]')
+        columns = list(index['columns'])
+        means = index['means'] if 'means' in index else None
+    if len(dates) != len(cube):
+        raise ValueError(f"{name}.npy has {len(cube)} rows but its index has {len(dates)} dates "
+                         "(cube rewritten while loading?)")
+    return CovCube(dates, columns, cube, means)
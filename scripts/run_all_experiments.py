@@ -5,79 +5,181 @@ Executes all research questions (RQ1-RQ5) in sequence
 
 import sys
 import time
+import argparse
+import cProfile
+import functools
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.append(str(PROJECT_ROOT / "scripts"))
 
-def run_experiment(script_name, description):
-    """Run a single experiment script"""
+import instrumentation
+from scheduler import Task, run_tasks, print_timing_summary
+
+PROFILE_PATH = PROJECT_ROOT / "results" / "profiling"
+
+RETURNS = "data/processed/returns.csv"
+PERIODS = ["covid19_crash", "legoland_crisis", "rate_surge_2023", "full_period"]
+
+# Declared inputs / outputs (relative to the project root) of every experiment
+TASKS = [
+    Task("convergence", "RQ1 & RQ3: Convergence Analysis (MC vs QMC)",
+         "experiments.convergence_analysis",
+         inputs=[RETURNS],
+         outputs=["results/simulation/convergence_results.csv",
+                  "results/simulation/rqmc_results.csv",
+                  "plots/convergence_analysis.png"]),
+    Task("variance_reduction", "RQ2: Variance Reduction Techniques",
+         "experiments.variance_reduction_analysis",
+         inputs=[RETURNS],
+         outputs=["results/simulation/variance_reduction_results.csv",
+                  "plots/variance_reduction.png"]),
+    Task("stress_backtesting", "RQ4: Stress Period Backtesting (2020/2022/2023)",
+         "experiments.stress_backtesting",
+         inputs=[RETURNS],
+         outputs=["results/backtesting/backtest_full.csv",
+                  "results/backtesting/backtest_full_summary.csv",
+                  "results/backtesting/backtest_clustering.csv",
+                  *[f"results/backtesting/backtest_{p}.csv" for p in PERIODS],
+                  "plots/stress_backtesting.png",
+                  "plots/stress_violation_heatmap.png"]),
+    Task("boundary_conditions", "RQ5: Boundary Condition Analysis",
+         "experiments.boundary_conditions",
+         inputs=[RETURNS],
+         outputs=["results/simulation/boundary_dimension.csv",
+                  "results/simulation/boundary_volatility.csv",
+                  "results/simulation/boundary_correlation.csv",
+                  "plots/boundary_conditions.png"]),
+    Task("statistical_significance", "Statistical Significance (bootstrap CI, McNemar)",
+         "experiments.statistical_significance",
+         inputs=[RETURNS, "results/backtesting/backtest_full.csv"],
+         outputs=["results/simulation/bootstrap_confidence_intervals.csv",
+                  "results/simulation/mcnemar_test_results.csv",
+                  "plots/bootstrap_confidence_intervals.png"]),
+]
+
+def run_experiment(script_name, description, cprofile=False):
+    """Run a single experiment script
+
+    With instrumentation enabled the run is recorded as a stage named
+    after the experiment and its per-stage breakdown is printed; with
+    cprofile a cProfile dump is written to results/profiling/.
+    """
     print("\n" + "=" * 80)
     print(f"RUNNING: {description}")
     print("=" * 80)
 
     start_time = time.time()
+    profiler = cProfile.Profile() if cprofile else None
 
     try:
-        # Import and run the experiment
-        if script_name == "convergence":
-            from experiments import convergence_analysis
-            convergence_analysis.main()
-        elif script_name == "variance_reduction":
-            from experiments import variance_reduction_analysis
-            variance_reduction_analysis.main()
-        elif script_name == "stress_backtesting":
-            from experiments import stress_backtesting
-            stress_backtesting.main()
-        elif script_name == "boundary_conditions":
-            from experiments import boundary_conditions
-            boundary_conditions.main()
+        if profiler is not None:
+            profiler.enable()
+        with instrumentation.stage(script_name):
+            _run(script_name)
+        if profiler is not None:
+            profiler.disable()
+            PROFILE_PATH.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(PROFILE_PATH / f"{script_name}.prof")
 
         elapsed = time.time() - start_time
         print(f"\n✅ {description} completed in {elapsed:.1f} seconds")
+        if instrumentation.is_enabled():
+            instrumentation.print_breakdown(script_name, description)
         return True
 
     except Exception as e:
+        if profiler is not None:
+            profiler.disable()
         print(f"\n❌ {description} failed with error:")
         print(f"   {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
-def main():
+def _run(script_name):
+    """Import and run the experiment"""
+    if script_name == "convergence":
+        from experiments import convergence_analysis
+        convergence_analysis.main()
+    elif script_name == "variance_reduction":
+        from experiments import variance_reduction_analysis
+        variance_reduction_analysis.main()
+    elif script_name == "stress_backtesting":
+        from experiments import stress_backtesting
+        stress_backtesting.main([])
+    elif script_name == "boundary_conditions":
+        from experiments import boundary_conditions
+        boundary_conditions.main()
+    elif script_name == "statistical_significance":
+        from experiments import statistical_significance
+        statistical_significance.main()
+    else:
+        raise ValueError(f"Unknown experiment: {script_name}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run all experiments (RQ1-RQ5)")
+    parser.add_argument('--profile', action='store_true',
+                        help="record per-stage timings and print a breakdown per experiment")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="write a cProfile dump per experiment to results/profiling/")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="experiments run concurrently in separate processes")
+    parser.add_argument('--force', action='store_true',
+                        help="rerun experiments whose inputs and code are unchanged")
+    args = parser.parse_args(argv)
+
+    workers = args.workers
+    if args.profile:
+        instrumentation.enable()
+        if workers > 1:
+            # Stage timings are only collected in this process
+            print("⚠️  --profile runs experiments in-process (workers=1)")
+            workers = 1
+
     print("=" * 80)
     print("MONTE CARLO vs QUASI-MONTE CARLO VaR/CVaR ANALYSIS")
     print("Full Experimental Pipeline")
     print("=" * 80)
 
-    experiments = [
-        ("convergence", "RQ1 & RQ3: Convergence Analysis (MC vs QMC)"),
-        ("variance_reduction", "RQ2: Variance Reduction Techniques"),
-        ("stress_backtesting", "RQ4: Stress Period Backtesting (2020/2022/2023)"),
-        ("boundary_conditions", "RQ5: Boundary Condition Analysis"),
-    ]
-
-    results = {}
     total_start = time.time()
 
-    for script_name, description in experiments:
-        success = run_experiment(script_name, description)
-        results[description] = "✅ Success" if success else "❌ Failed"
+    runner = functools.partial(run_experiment, cprofile=args.cprofile)
+    status, durations = run_tasks(TASKS, runner, workers=workers, force=args.force)
 
     total_elapsed = time.time() - total_start
 
+    labels = {
+        'success': "✅ Success",
+        'failed': "❌ Failed",
+        'skipped (up to date)': "⏭️  Up to date",
+        'skipped (dependency failed)': "❌ Skipped"
+    }
+    results = {task.description: labels[status[task.name]] for task in TASKS}
+
     # Print summary
     print("\n" + "=" * 80)
     print("EXPERIMENTAL PIPELINE SUMMARY")
     print("=" * 80)
 
-    for description, status in results.items():
-        print(f"{status:12s} | {description}")
+    for description, label in results.items():
+        print(f"{label:12s} | {description}")
 
     print(f"\nTotal execution time: {total_elapsed:.1f} seconds ({total_elapsed/60:.1f} minutes)")
+    print_timing_summary(TASKS, status, durations, total_elapsed)
+
+    if args.profile:
+        instrumentation.print_breakdown(title="all experiments")
+        PROFILE_PATH.mkdir(parents=True, exist_ok=True)
+        instrumentation.records().to_csv(PROFILE_PATH / "stage_timings.csv", index=False)
+        instrumentation.write_folded(PROFILE_PATH / "stage_timings.folded")
+        print(f"\nStage timings saved to: {PROFILE_PATH / 'stage_timings.csv'}")
+        print(f"Flamegraph input (folded stacks): {PROFILE_PATH / 'stage_timings.folded'}")
+    if args.cprofile:
+        print(f"cProfile dumps saved to: {PROFILE_PATH} (view with snakeviz / pstats)")
 
     # Check if all succeeded
-    all_success = all("Success" in status for status in results.values())
+    all_success = all(s in ('success', 'skipped (up to date)') for s in status.values())
 
     if all_success:
         print("\n" + "=" * 80)
@@ -97,5 +199,7 @@ def main():
         print("=" * 80)
         print("Please check error messages above and fix issues.")
 
+    return all_success
+
 if __name__ == "__main__":
     main()
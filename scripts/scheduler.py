@@ -0,0 +1,243 @@
+"""
+Dependency-aware experiment scheduler
+
+Each task declares the files it reads and writes. A task depends on every
+task that writes one of its inputs; independent tasks run concurrently in
+separate processes. A task is skipped when its outputs exist and neither
+its inputs nor its source code (the experiment module and every project
+module it imports, transitively) changed since its last successful run.
+"""
+
+import ast
+import hashlib
+import json
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+SCRIPTS_PATH = Path(__file__).parent
+PROJECT_ROOT = SCRIPTS_PATH.parent
+STATE_FILE = PROJECT_ROOT / "results" / ".scheduler_state.json"
+
+Task = namedtuple('Task', ['name', 'description', 'module', 'inputs', 'outputs'])
+
+def module_sources(module):
+    """
+    Source files of a project module and of every project module it imports
+
+    module is a dotted name relative to scripts/ (e.g. 'experiments.convergence_analysis')
+    """
+    seen = set()
+    pending = [module]
+
+    while pending:
+        name = pending.pop()
+        path = SCRIPTS_PATH / (name.replace('.', '/') + '.py')
+        if name in seen or not path.exists():
+            continue
+        seen.add(name)
+
+        tree = ast.parse(path.read_text())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                pending.append(node.module)
+                pending.extend(f"{node.module}.{alias.name}" for alias in node.names)
+            elif isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+
+    return sorted(SCRIPTS_PATH / (name.replace('.', '/') + '.py') for name in seen)
+
+def task_fingerprint(task):
+    """SHA-256 over the contents of the task's inputs and source files"""
+    h = hashlib.sha256()
+    for path in sorted(PROJECT_ROOT / p for p in task.inputs):
+        h.update(str(path.relative_to(PROJECT_ROOT)).encode())
+        h.update(path.read_bytes() if path.exists() else b"<missing>")
+    for path in module_sources(task.module):
+        h.update(str(path.relative_to(PROJECT_ROOT)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+def task_dependencies(tasks):
+    """{task name: set of task names producing one of its inputs}"""
+    producers = {}
+    for task in tasks:
+        for output in task.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is produced by both {producers[output]} and {task.name}")
+            producers[output] = task.name
+
+    deps = {task.name: {producers[i] for i in task.inputs if i in producers} - {task.name}
+            for task in tasks}
+
+    # Reject cycles (Kahn's algorithm)
+    remaining = {name: set(d) for name, d in deps.items()}
+    while remaining:
+        ready = [name for name, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Dependency cycle among tasks: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for d in remaining.values():
+            d.difference_update(ready)
+
+    return deps
+
+def load_state(path=STATE_FILE):
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(state, path=STATE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2)
+
+def is_up_to_date(task, state, fingerprint):
+    outputs_exist = all((PROJECT_ROOT / p).exists() for p in task.outputs)
+    return outputs_exist and state.get(task.name, {}).get('fingerprint') == fingerprint
+
+def _timed_call(runner, task):
+    """Run one task (in a worker process) and return (success, elapsed)"""
+    t_start = time.time()
+    success = runner(task.name, task.description)
+    return success, time.time() - t_start
+
+def critical_path(tasks, deps, durations):
+    """
+    Longest chain of dependent tasks by duration
+
+    Returns:
+    --------
+    path : list of task names
+    length : float, seconds
+    """
+    finish = {}
+    previous = {}
+
+    def finish_time(name):
+        if name not in finish:
+            best = max(deps[name], key=finish_time, default=None)
+            previous[name] = best
+            finish[name] = durations.get(name, 0.0) + (finish_time(best) if best else 0.0)
+        return finish[name]
+
+    end = max((task.name for task in tasks), key=finish_time)
+    path = [end]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return path[::-1], finish[end]
+
+def run_tasks(tasks, runner, workers=1, force=False, state_path=STATE_FILE):
+    """
+    Run tasks in dependency order
+
+    Parameters:
+    -----------
+    tasks : list of Task
+    runner : callable
+        runner(name, description) -> bool, run in the scheduler process when
+        workers == 1 and in worker processes otherwise (must be picklable)
+    workers : int
+        Maximum number of tasks running at once
+    force : bool
+        Run every task even if it is up to date
+
+    Returns:
+    --------
+    status : dict
+        {task name: 'success' | 'failed' | 'skipped (up to date)' |
+         'skipped (dependency failed)'}
+    durations : dict
+        {task name: seconds} for tasks that ran
+    """
+    deps = task_dependencies(tasks)
+    by_name = {task.name: task for task in tasks}
+    state = load_state(state_path)
+
+    status = {}
+    durations = {}
+    pending = [task.name for task in tasks]
+    running = {}
+
+    def start_ready(pool):
+        for name in list(pending):
+            if len(running) >= max(1, workers):
+                break
+            if any(status.get(d) in ('failed', 'skipped (dependency failed)') for d in deps[name]):
+                status[name] = 'skipped (dependency failed)'
+                pending.remove(name)
+                continue
+            if not all(d in status for d in deps[name]):
+                continue
+
+            pending.remove(name)
+            task = by_name[name]
+            # Fingerprint after dependencies finished, so fresh inputs are hashed
+            fingerprint = task_fingerprint(task)
+            if not force and is_up_to_date(task, state, fingerprint):
+                status[name] = 'skipped (up to date)'
+                print(f"⏭️  {task.description}: up to date, skipping")
+                continue
+
+            print(f"▶️  Starting: {task.description}")
+            if pool is None:
+                running[name] = (_timed_call(runner, task), fingerprint)
+            else:
+                running[name] = (pool.submit(_timed_call, runner, task), fingerprint)
+
+    def finish(name, success, elapsed, fingerprint):
+        durations[name] = elapsed
+        status[name] = 'success' if success else 'failed'
+        if success:
+            state[name] = {'fingerprint': fingerprint, 'elapsed': elapsed,
+                           'finished': time.strftime('%Y-%m-%dT%H:%M:%S')}
+            save_state(state, state_path)
+
+    if workers <= 1:
+        while pending:
+            start_ready(None)
+            for name, ((success, elapsed), fingerprint) in list(running.items()):
+                finish(name, success, elapsed, fingerprint)
+                del running[name]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            start_ready(pool)
+            while running:
+                futures = {future: name for name, (future, _) in running.items()}
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures[future]
+                    _, fingerprint = running.pop(name)
+                    try:
+                        success, elapsed = future.result()
+                    except Exception as e:
+                        print(f"❌ {name} crashed: {e}")
+                        success, elapsed = False, 0.0
+                    finish(name, success, elapsed, fingerprint)
+                start_ready(pool)
+
+    return status, durations
+
+def print_timing_summary(tasks, status, durations, wall_time):
+    """Per-task durations, critical path and achieved parallel speedup"""
+    deps = task_dependencies(tasks)
+    path, length = critical_path(tasks, deps, durations)
+    serial = sum(durations.values())
+
+    print("\n" + "=" * 80)
+    print("SCHEDULER TIMING SUMMARY")
+    print("=" * 80)
+    for task in tasks:
+        elapsed = durations.get(task.name)
+        elapsed_str = f"{elapsed:8.1f}s" if elapsed is not None else "       -"
+        print(f"  {task.name:26s} {elapsed_str}  {status.get(task.name, 'not run')}")
+
+    print(f"\nCritical path: {' -> '.join(path)} ({length:.1f}s)")
+    print(f"Sum of task times: {serial:.1f}s, wall time: {wall_time:.1f}s", end="")
+    if wall_time > 0 and serial > 0:
+        print(f" (parallel speedup {serial / wall_time:.2f}x)")
+    else:
+        print()
@@ -0,0 +1,160 @@
+"""
+Adaptive VaR/CVaR estimation that stops at a target precision
+
+Instead of a fixed n_sims, the estimator runs R independent replicates
+(independently scrambled Sobol/Halton sequences, or independent MC
+streams) and doubles the scenarios of every replicate each round, keeping
+the earlier draws: QMC replicates continue their sequence (random_base2
+keeps every total a power of two) and MC replicates continue their
+stream. After each round the spread of the R replicate estimates gives
+the standard error of VaR, and the loop stops as soon as it falls under
+the tolerance, the time budget would be exceeded, or a scenario cap is
+reached.
+"""
+
+import time
+
+import numpy as np
+from simulation.qmc_cache import QMC_ENGINES
+from simulation.portfolio_sim import DISTRIBUTIONS, standard_chunks
+from simulation.rqmc import (_replicate_engines, _standard_from_uniform, _portfolio_loading,
+                             replicate_summary)
+from simulation.rng import spawn_rngs
+from var_cvar.var_cvar import tail_stats
+from instrumentation import stage
+
+def _replicate_sources(method, dim, n_replicates, rng):
+    """Independent MC Generators or scrambled QMC engines, one per replicate"""
+    if method == 'mc':
+        if isinstance(rng, np.random.Generator):
+            return [rng] * n_replicates
+        return spawn_rngs(rng, n_replicates)
+    return _replicate_engines(method, dim, n_replicates, rng)
+
+def _draw(source, method, k, d, distribution, df):
+    """Next k standard draws of one replicate, continuing its stream or sequence"""
+    if method == 'mc':
+        _, _, Z = next(standard_chunks(d, k, 'mc', distribution, df, rng=source, chunk_size=None))
+        return Z
+
+    with stage('random_generation'):
+        if method == 'sobol':
+            # k equals the points drawn so far (or the first batch), so totals stay powers of two
+            U = source.random_base2(int(np.log2(k)))
+        else:
+            U = source.random(k)
+    with stage('inverse_cdf'):
+        return _standard_from_uniform(U, distribution, df)
+
+def adaptive_var_cvar(mu, cov, weights, alpha=0.95, tol=None, time_budget=None, method='sobol',
+                      n_replicates=8, initial_sims=1024, max_sims=2**20, distribution='normal',
+                      df=5, confidence=0.95, L=None, rng=None):
+    """
+    VaR/CVaR with doubling batches until the VaR standard error is below tol
+
+    Parameters:
+    -----------
+    mu, cov, weights : array-like
+        Mean vector, covariance matrix and portfolio weights
+    alpha : float or array-like
+        VaR confidence level(s); with several, every VaR must reach tol
+    tol : float, optional
+        Target standard error of VaR (same units as returns)
+    time_budget : float, optional
+        Seconds; no new round is started if its projected cost (twice
+        the last round) would exceed the budget. The stopping round then
+        depends on wall-clock time, so results are not reproducible from
+        rng alone
+    method : str, {'mc', 'sobol', 'halton'}
+    n_replicates : int
+        Independent replicates R used for the error estimate (>= 2)
+    initial_sims : int
+        Scenarios per replicate in the first round (a power of two for Sobol)
+    max_sims : int
+        Cap on the total scenarios over all replicates
+    distribution, df, L :
+        As in simulation.portfolio_sim.simulate_portfolio_returns
+    confidence : float
+        Coverage of the reported confidence intervals
+    rng : int, SeedSequence or Generator, optional
+        Source of MC streams / QMC scrambles (None = OS entropy)
+
+    Returns:
+    --------
+    results : dict
+        var, cvar, var_se, cvar_se, var_ci, cvar_ci as in
+        simulation.rqmc.rqmc_var_cvar, plus
+        n_sims : scenarios per replicate used
+        n_total : scenarios over all replicates
+        rounds : number of doubling rounds
+        converged : whether tol was reached
+        elapsed : seconds spent
+    """
+    if method != 'mc' and method not in QMC_ENGINES:
+        raise ValueError(f"Unknown method: {method}. Use 'mc', 'sobol' or 'halton'.")
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}. Use 'normal', 't' or 'mvt'.")
+    if n_replicates < 2:
+        raise ValueError("Adaptive error estimates need at least 2 replicates")
+    if method == 'sobol' and initial_sims & (initial_sims - 1):
+        raise ValueError(f"initial_sims must be a power of two for Sobol, got {initial_sims}")
+
+    t_start = time.perf_counter()
+    mu = np.asarray(mu, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    d = len(mu)
+    mean_ret, loading = _portfolio_loading(mu, cov, weights, distribution, df, L)
+
+    dim = d + 1 if distribution == 'mvt' and method != 'mc' else d
+    sources = _replicate_sources(method, dim, n_replicates, rng)
+
+    # Portfolio returns of every replicate, grown by doubling
+    portfolio_returns = np.empty((n_replicates, 0))
+    n = 0
+    batch = initial_sims
+    rounds = 0
+    converged = False
+
+    while True:
+        round_start = time.perf_counter()
+
+        grown = np.empty((n_replicates, n + batch))
+        grown[:, :n] = portfolio_returns
+        for r, source in enumerate(sources):
+            Z = _draw(source, method, batch, d, distribution, df)
+            with stage('projection'):
+                np.matmul(Z, loading, out=grown[r, n:])
+        grown[:, n:] += mean_ret
+        portfolio_returns = grown
+        n += batch
+        rounds += 1
+
+        var_reps, cvar_reps = tail_stats(portfolio_returns, alpha)
+        var_se = replicate_summary(var_reps, confidence)[1]
+
+        if tol is not None and np.all(var_se <= tol):
+            converged = True
+            break
+        if 2 * n * n_replicates > max_sims:
+            break
+        now = time.perf_counter()
+        if time_budget is not None and (now - t_start) + 2 * (now - round_start) > time_budget:
+            break
+        batch = n
+
+    var_mean, var_se, var_low, var_high = replicate_summary(var_reps, confidence)
+    cvar_mean, cvar_se, cvar_low, cvar_high = replicate_summary(cvar_reps, confidence)
+
+    return {
+        'var': var_mean,
+        'cvar': cvar_mean,
+        'var_se': var_se,
+        'cvar_se': cvar_se,
+        'var_ci': (var_low, var_high),
+        'cvar_ci': (cvar_low, cvar_high),
+        'n_sims': n,
+        'n_total': n * n_replicates,
+        'rounds': rounds,
+        'converged': converged,
+        'elapsed': time.perf_counter() - t_start
+    }
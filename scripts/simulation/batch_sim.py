@@ -0,0 +1,131 @@
+"""
+Batched multi-run simulation for MC / QMC experiments
+Generates n_runs independent scenario sets in one vectorized call
+"""
+
+import numpy as np
+from simulation.qmc_cache import QMC_ENGINES
+from simulation.transforms import inverse_normal
+from simulation.rng import make_rng
+from simulation.factorization import cholesky_factor
+from simulation.portfolio_sim import standard_chunks
+from instrumentation import stage
+
+# Upper bound on standard-normal draws held in memory at once
+# (2**24 float64 values = 128 MB)
+DEFAULT_CHUNK_ELEMENTS = 2 ** 24
+
+def _standard_normals(method, n_runs, n_sims, d, rng=None, out=None):
+    """Draw an (n_runs, n_sims, d) block of standard-normal variates into out"""
+    if out is None:
+        out = np.empty((n_runs, n_sims, d))
+
+    if method == 'mc':
+        with stage('random_generation'):
+            if rng is None:
+                # Same global stream order as n_runs sequential mc_sim calls
+                out[...] = np.random.randn(n_runs, n_sims, d)
+            else:
+                rng.standard_normal(out=out)
+        return out
+
+    if method not in QMC_ENGINES:
+        raise ValueError(f"Unknown method: {method}. Use 'mc', 'sobol' or 'halton'.")
+
+    # Each run gets its own independently scrambled sequence
+    with stage('random_generation'):
+        for r in range(n_runs):
+            out[r] = QMC_ENGINES[method](d, scramble=True, seed=rng).random(n_sims)
+    # Evaluated in place, without scipy.stats overhead
+    with stage('inverse_cdf'):
+        return inverse_normal(out, out=out)
+
+def simulate_batch(mu, cov, n_sims=10000, n_runs=1, method='mc', weights=None,
+                   chunk_elements=DEFAULT_CHUNK_ELEMENTS, rng=None):
+    """
+    Simulate n_runs independent scenario sets with a single Cholesky factor
+
+    Parameters:
+    -----------
+    mu : array-like, shape (d,)
+        Mean vector
+    cov : array-like, shape (d, d)
+        Covariance matrix
+    n_sims : int
+        Number of scenarios per run
+    n_runs : int
+        Number of independent runs
+    method : str, {'mc', 'sobol', 'halton'}
+        Sampling method
+    weights : array-like, shape (d,), optional
+        Portfolio weights. If given, the draws are projected onto the
+        portfolio chunk by chunk and only portfolio returns are returned
+    chunk_elements : int or None
+        Maximum number of normal draws held in memory at once. Whole runs
+        are batched while they fit; a run larger than this is drawn in
+        blocks of chunk_elements // d scenarios. None generates all runs
+        at once
+    rng : np.random.Generator, SeedSequence or int, optional
+        Source of randomness for MC draws and QMC scrambling. None keeps
+        the global np.random stream (MC) and OS entropy (QMC)
+
+    Returns:
+    --------
+    scenarios : ndarray, shape (n_runs, n_sims, d) or (n_runs, n_sims)
+        Simulated scenarios, or portfolio returns if weights is given
+    """
+    mu = np.asarray(mu, dtype=float)
+    d = len(mu)
+    L = cholesky_factor(cov)
+
+    if rng is not None:
+        rng = make_rng(rng)
+
+    if chunk_elements is None:
+        runs_per_chunk = n_runs
+        rows_per_chunk = n_sims
+    else:
+        runs_per_chunk = max(1, min(n_runs, chunk_elements // (n_sims * d)))
+        rows_per_chunk = max(1, min(n_sims, chunk_elements // d))
+
+    if weights is None:
+        out = np.empty((n_runs, n_sims, d))
+        project = lambda Z, target: np.add(np.matmul(Z, L.T, out=target), mu, out=target)
+    else:
+        # Portfolio returns only: each chunk is projected on L.T @ w, so no
+        # (n_runs, n_sims, d) scenario block is ever formed
+        mean_ret = mu @ weights
+        loading = L.T @ np.asarray(weights, dtype=float)
+        out = np.empty((n_runs, n_sims))
+        project = lambda Z, target: np.add(np.matmul(Z, loading, out=target), mean_ret, out=target)
+
+    if rows_per_chunk < n_sims:
+        # A single run exceeds the budget: draw each run in blocks of rows,
+        # continuing its MC stream or QMC sequence
+        for r in range(n_runs):
+            for start, stop, Z in standard_chunks(d, n_sims, method, rng=rng,
+                                                  chunk_size=rows_per_chunk):
+                with stage('projection'):
+                    project(Z, out[r, start:stop])
+        return out
+
+    # One normal buffer reused by every chunk of whole runs
+    buffer = np.empty((runs_per_chunk, n_sims, d))
+
+    for start in range(0, n_runs, runs_per_chunk):
+        stop = min(start + runs_per_chunk, n_runs)
+        Z = _standard_normals(method, stop - start, n_sims, d, rng, buffer[:stop - start])
+        with stage('projection'):
+            project(Z, out[start:stop])
+
+    return out
+
+def mc_sim_batch(mu, cov, n_sims=10000, n_runs=1, weights=None,
+                 chunk_elements=DEFAULT_CHUNK_ELEMENTS, rng=None):
+    """Batched counterpart of mc_sim (see simulate_batch)"""
+    return simulate_batch(mu, cov, n_sims, n_runs, 'mc', weights, chunk_elements, rng)
+
+def qmc_sim_batch(mu, cov, n_sims=10000, n_runs=1, method='sobol', weights=None,
+                  chunk_elements=DEFAULT_CHUNK_ELEMENTS, rng=None):
+    """Batched counterpart of qmc_sim (see simulate_batch)"""
+    return simulate_batch(mu, cov, n_sims, n_runs, method, weights, chunk_elements, rng)
@@ -0,0 +1,247 @@
+"""
+Covariance factorization for the simulators
+
+- batched_cholesky factors a whole (..., d, d) stack of covariance
+  matrices with one np.linalg.cholesky call. Matrices that are not
+  positive definite are repaired instead of aborting the run:
+  semidefinite ones (e.g. perfectly correlated assets) get an exact
+  LDL^T-based factor, indefinite ones are projected to the nearest PSD
+  matrix by eigenvalue clipping first.
+- cholesky_factor factors a single matrix through an LRU cache keyed by a
+  SHA-256 hash of its contents, so simulators called repeatedly with the
+  same covariance skip the factorization.
+
+Every factor L is lower triangular with L @ L.T equal to the (repaired)
+covariance, so it can be passed as L= to every simulator.
+"""
+
+import hashlib
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+from instrumentation import stage
+
+FALLBACKS = ('auto', 'clip', 'ldl', 'raise')
+
+# Eigenvalues down to -PSD_TOL * (largest eigenvalue) count as rounding
+# noise of a positive semidefinite matrix
+PSD_TOL = 1e-10
+
+# Relative floor of the clipped eigenvalues in nearest_psd
+EIG_FLOOR = 1e-10
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+def nearest_psd(cov, floor=EIG_FLOOR):
+    """
+    Nearest positive definite matrix by eigenvalue clipping
+
+    Symmetrizes each matrix and raises eigenvalues below
+    floor * (largest eigenvalue) to that value, which is the nearest
+    matrix in Frobenius norm with that spectrum bound. Matrices already
+    satisfying the bound are returned unchanged.
+
+    Parameters:
+    -----------
+    cov : array-like, shape (..., d, d)
+    floor : float
+        Relative lower bound of the eigenvalues
+
+    Returns:
+    --------
+    cov_psd : ndarray, shape (..., d, d)
+    """
+    cov = np.array(cov, dtype=float)
+    sym = (cov + np.swapaxes(cov, -1, -2)) / 2
+    eigval, eigvec = np.linalg.eigh(sym)
+
+    bound = floor * np.maximum(eigval[..., -1:], np.finfo(float).tiny)
+    needs_repair = eigval[..., 0] < bound[..., 0]
+    if not np.any(needs_repair):
+        return cov
+
+    clipped = np.maximum(eigval, bound)
+    repaired = (eigvec * clipped[..., None, :]) @ np.swapaxes(eigvec, -1, -2)
+    cov[needs_repair] = repaired[needs_repair]
+    return cov
+
+def ldl_factor(cov, tol=PSD_TOL):
+    """
+    Lower-triangular factor of a positive semidefinite matrix via LDL^T
+
+    Runs the unpivoted LDL^T recursion and returns L @ sqrt(D). Pivots
+    below tol * (largest diagonal entry) are set to zero together with
+    their column, so singular PSD matrices are reproduced exactly where
+    np.linalg.cholesky fails; negative pivots of indefinite input are
+    clipped the same way.
+
+    Parameters:
+    -----------
+    cov : array-like, shape (..., d, d)
+
+    Returns:
+    --------
+    L : ndarray, shape (..., d, d)
+    """
+    A = np.asarray(cov, dtype=float)
+    d = A.shape[-1]
+    unit = np.zeros_like(A)
+    D = np.zeros(A.shape[:-1])
+    threshold = tol * np.max(np.abs(np.diagonal(A, axis1=-2, axis2=-1)), axis=-1)
+
+    for k in range(d):
+        LD = unit[..., k, :k] * D[..., :k]
+        pivot = A[..., k, k] - np.sum(LD * unit[..., k, :k], axis=-1)
+        positive = pivot > threshold
+        D[..., k] = np.where(positive, pivot, 0.0)
+        unit[..., k, k] = 1.0
+
+        if k + 1 < d:
+            column = A[..., k+1:, k] - np.einsum('...ij,...j->...i', unit[..., k+1:, :k], LD)
+            safe_pivot = np.where(positive, pivot, 1.0)[..., None]
+            unit[..., k+1:, k] = np.where(positive[..., None], column / safe_pivot, 0.0)
+
+    return unit * np.sqrt(D)[..., None, :]
+
+def _repair_factors(covs, fallback):
+    """Factors of an (m, d, d) stack of matrices np.linalg.cholesky rejected"""
+    if fallback == 'clip':
+        return np.linalg.cholesky(nearest_psd(covs))
+    if fallback == 'ldl':
+        return ldl_factor(covs)
+
+    # auto: exact LDL^T factor for semidefinite matrices, clipping otherwise
+    eigval = np.linalg.eigvalsh((covs + np.swapaxes(covs, -1, -2)) / 2)
+    semidefinite = eigval[:, 0] >= -PSD_TOL * np.maximum(eigval[:, -1], 0.0)
+
+    factors = np.empty_like(covs)
+    factors[semidefinite] = ldl_factor(covs[semidefinite])
+    if not np.all(semidefinite):
+        warnings.warn(f"{np.sum(~semidefinite)} covariance matrices are not positive "
+                      f"semidefinite; using their nearest PSD approximation")
+        factors[~semidefinite] = np.linalg.cholesky(nearest_psd(covs[~semidefinite]))
+    return factors
+
+def batched_cholesky(covs, fallback='auto'):
+    """
+    Lower Cholesky factors of a stack of covariance matrices
+
+    Parameters:
+    -----------
+    covs : array-like, shape (..., d, d)
+    fallback : str, {'auto', 'clip', 'ldl', 'raise'}
+        Treatment of matrices that are not positive definite:
+        'auto' uses the LDL^T factor for semidefinite matrices and
+        eigenvalue clipping (with a warning) for indefinite ones,
+        'clip' always clips, 'ldl' always uses ldl_factor and 'raise'
+        propagates np.linalg.LinAlgError
+
+    Returns:
+    --------
+    L : ndarray, shape (..., d, d)
+    """
+    if fallback not in FALLBACKS:
+        raise ValueError(f"Unknown fallback: {fallback}. Use one of {FALLBACKS}.")
+
+    covs = np.asarray(covs, dtype=float)
+    try:
+        return np.linalg.cholesky(covs)
+    except np.linalg.LinAlgError:
+        if fallback == 'raise':
+            raise
+
+    # Factor one by one to find the offending matrices, then repair those together
+    d = covs.shape[-1]
+    flat = covs.reshape(-1, d, d)
+    factors = np.empty_like(flat)
+    failed = []
+    for i, cov in enumerate(flat):
+        try:
+            factors[i] = np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            failed.append(i)
+    factors[failed] = _repair_factors(flat[failed], fallback)
+
+    return factors.reshape(covs.shape)
+
+class FactorCache:
+    """LRU cache of Cholesky factors keyed by a hash of the covariance matrix"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(cov, fallback):
+        h = hashlib.sha256()
+        h.update(str(cov.shape).encode())
+        h.update(fallback.encode())
+        h.update(np.ascontiguousarray(cov).tobytes())
+        return h.hexdigest()
+
+    def get(self, cov, fallback='auto'):
+        """Return the cached factor of cov, factoring and storing it on a miss"""
+        cov = np.asarray(cov, dtype=float)
+        key = self.key(cov, fallback)
+
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        L = batched_cholesky(cov, fallback)
+        # Shared between callers, so never hand out a writable view
+        L.setflags(write=False)
+
+        if L.nbytes <= self.max_bytes:
+            self._entries[key] = L
+            self.nbytes += L.nbytes
+            self._evict()
+
+        return L
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            'entries': len(self._entries),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+_default_cache = FactorCache()
+
+def cholesky_factor(cov, fallback='auto', cache=True):
+    """
+    Lower Cholesky factor of one covariance matrix (see batched_cholesky)
+
+    With cache=True the (read-only) factor is shared by every call with an
+    identical matrix.
+    """
+    with stage('cholesky'):
+        if not cache:
+            return batched_cholesky(cov, fallback)
+        return _default_cache.get(cov, fallback)
+
+def factor_cache_info():
+    """Statistics of the module-level factor cache"""
+    return _default_cache.info()
+
+def clear_factor_cache():
+    _default_cache.clear()
@@ -1,7 +1,33 @@
 import numpy as np
+from simulation.rng import make_rng, correlate_inplace
+from simulation.factorization import cholesky_factor
+from instrumentation import stage
 
-def mc_sim(mu, cov, n_sims=10000):
+def mc_sim(mu, cov, n_sims=10000, L=None, rng=None, out=None):
+    """
+    Monte Carlo simulation of multivariate normal returns
+
+    rng may be a Generator, SeedSequence or int (None keeps the global
+    np.random stream). With out, an (n_sims, d) float64 buffer, normals are
+    drawn straight into it and correlated in place.
+    """
     d = len(mu)
-    Z = np.random.randn(n_sims, d)
-    L = np.linalg.cholesky(cov)
-    return mu + Z @ L.T
+    if L is None:
+        L = cholesky_factor(cov)
+
+    if out is not None:
+        with stage('random_generation'):
+            if rng is None:
+                out[...] = np.random.randn(n_sims, d)
+            else:
+                make_rng(rng).standard_normal(out=out)
+        with stage('projection'):
+            return correlate_inplace(out, L, mu)
+
+    with stage('random_generation'):
+        if rng is None:
+            Z = np.random.randn(n_sims, d)
+        else:
+            Z = make_rng(rng).standard_normal((n_sims, d))
+    with stage('projection'):
+        return mu + Z @ L.T
@@ -0,0 +1,157 @@
+"""
+Portfolio-return simulation without materializing scenario matrices
+
+For a fixed weight vector w the simulated portfolio return is
+
+    (mu + Z @ L.T) @ w = mu @ w + Z @ (L.T @ w)
+
+so each block of standard draws Z is collapsed with a single matrix-vector
+product and the (n_sims, d) scenario matrix is never formed. Draws are made
+in chunks of rows, which bounds memory at chunk_size * d for any n_sims.
+"""
+
+import numpy as np
+from scipy.stats import t as student_t
+from simulation.qmc_cache import QMC_ENGINES, qmc_points
+from simulation.transforms import inverse_normal, inverse_t, multivariate_t_from_uniform
+from simulation.rng import make_rng
+from simulation.factorization import cholesky_factor
+from instrumentation import stage
+
+# Rows drawn per chunk (2**18 rows x 50 assets = 100 MB of float64)
+DEFAULT_CHUNK_SIZE = 2 ** 18
+
+DISTRIBUTIONS = ('normal', 't', 'mvt')
+
+def simulate_portfolio_returns(mu, cov, weights, n_sims=10000, method='mc',
+                               distribution='normal', df=5, L=None, rng=None,
+                               cache=False, chunk_size=DEFAULT_CHUNK_SIZE, out=None):
+    """
+    Simulate portfolio returns mu @ w + Z @ (L.T @ w) chunk by chunk
+
+    Parameters:
+    -----------
+    mu : array-like, shape (d,)
+        Mean vector
+    cov : array-like, shape (d, d)
+        Covariance matrix
+    weights : array-like, shape (d,)
+        Portfolio weights
+    n_sims : int
+        Number of scenarios
+    method : str, {'mc', 'sobol', 'halton'}
+        Sampling method
+    distribution : str, {'normal', 't', 'mvt'}
+        Distribution of the standard draws: independent normal or
+        Student-t marginals, or 'mvt' for a multivariate t (normal draws
+        times one chi-square mixing factor sqrt(df / W) per scenario)
+    df : float
+        Degrees of freedom for distribution='t' or 'mvt' (variance-scaled
+        as in simulation.tdist_sim)
+    L : ndarray, shape (d, d), optional
+        Precomputed lower Cholesky factor of cov
+    rng : np.random.Generator, SeedSequence or int, optional
+        MC stream or QMC scrambling seed. None keeps the global np.random
+        stream (MC) and OS entropy (QMC)
+    cache : bool
+        QMC only: reuse the cached point set for an integer rng seed
+    chunk_size : int or None
+        Rows drawn per chunk (None = all at once)
+    out : ndarray, shape (n_sims,), optional
+        Preallocated output buffer
+
+    Returns:
+    --------
+    portfolio_returns : ndarray, shape (n_sims,)
+        Identical (up to rounding) to simulating scenarios and taking @ weights
+    """
+    mu = np.asarray(mu, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    d = len(mu)
+
+    if method != 'mc' and method not in QMC_ENGINES:
+        raise ValueError(f"Unknown method: {method}. Use 'mc', 'sobol' or 'halton'.")
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}. Use 'normal', 't' or 'mvt'.")
+
+    if L is None:
+        L = cholesky_factor(cov)
+    loading = L.T @ weights
+    mean_ret = mu @ weights
+
+    # Student-t variance scaling Var(t_ν) = ν/(ν-2), folded into the loading
+    if distribution != 'normal' and df > 2:
+        loading = loading * np.sqrt((df - 2) / df)
+
+    if out is None:
+        out = np.empty(n_sims)
+
+    if method != 'mc' and cache:
+        Z = qmc_points(method, d, n_sims, seed=rng, distribution=distribution, df=df)
+        with stage('projection'):
+            np.matmul(Z, loading, out=out)
+            out += mean_ret
+        return out
+
+    for start, stop, Z in standard_chunks(d, n_sims, method, distribution, df, rng, chunk_size):
+        with stage('projection'):
+            np.matmul(Z, loading, out=out[start:stop])
+
+    out += mean_ret
+    return out
+
+def standard_chunks(d, n_sims, method='mc', distribution='normal', df=5, rng=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield (start, stop, Z) blocks of n_sims standard d-dimensional draws
+
+    Consecutive blocks continue one MC stream or one QMC sequence, so the
+    concatenation equals a single draw of n_sims rows. MC normal and 'mvt'
+    blocks share one buffer: consume each Z before requesting the next.
+    """
+    if chunk_size is None:
+        chunk_size = n_sims
+    chunk_size = max(1, min(chunk_size, n_sims))
+
+    if method == 'mc':
+        gen = None if rng is None else make_rng(rng)
+        # Normal draws are written into one reused buffer
+        if distribution != 't' and gen is not None:
+            buffer = np.empty((chunk_size, d))
+    elif method in QMC_ENGINES:
+        # The multivariate t takes one extra dimension for its mixing variable
+        dim = d + 1 if distribution == 'mvt' else d
+        engine = QMC_ENGINES[method](dim, scramble=True, seed=rng)
+    else:
+        raise ValueError(f"Unknown method: {method}. Use 'mc', 'sobol' or 'halton'.")
+
+    for start in range(0, n_sims, chunk_size):
+        stop = min(start + chunk_size, n_sims)
+        k = stop - start
+
+        if method == 'mc':
+            with stage('random_generation'):
+                if distribution == 't':
+                    Z = student_t.rvs(df=df, size=(k, d), random_state=gen)
+                elif gen is None:
+                    Z = np.random.randn(k, d)
+                else:
+                    Z = gen.standard_normal(out=buffer[:k])
+
+                # One chi-square draw per scenario: Z * sqrt(ν / W)
+                if distribution == 'mvt':
+                    W = np.random.chisquare(df, k) if gen is None else gen.chisquare(df, k)
+                    Z *= np.sqrt(df / W)[:, None]
+        else:
+            # Successive engine.random calls continue one sequence
+            with stage('random_generation'):
+                Z = engine.random(k)
+            with stage('inverse_cdf'):
+                if distribution == 't':
+                    inverse_t(Z, df, out=Z)
+                elif distribution == 'mvt':
+                    Z = multivariate_t_from_uniform(Z, df)
+                else:
+                    inverse_normal(Z, out=Z)
+
+        yield start, stop, Z
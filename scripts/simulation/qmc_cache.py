@@ -0,0 +1,150 @@
+"""
+Cache of inverse-transformed low-discrepancy point sets
+
+A scrambled Sobol/Halton sequence with a fixed seed always yields the same
+points, so the (n, d) matrix of normal (or Student-t) variates can be built
+once and reused; repeated QMC calls then only pay for the affine map
+mu + Z @ L.T. Entries are kept in an LRU bounded by a byte budget.
+"""
+
+import numpy as np
+from collections import OrderedDict
+from scipy.stats.qmc import Sobol, Halton
+from simulation.transforms import inverse_normal, inverse_t, multivariate_t_from_uniform
+from instrumentation import stage
+
+# Default byte budget: 256 MB (a 10000 x 3 float64 point set is 240 KB)
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+QMC_ENGINES = {
+    'sobol': Sobol,
+    'halton': Halton
+}
+
+def generate_qmc_points(sequence, d, n, seed=None, distribution='normal', df=None):
+    """
+    Draw n scrambled low-discrepancy points and map them through an inverse CDF
+
+    Parameters:
+    -----------
+    sequence : str, {'sobol', 'halton'}
+        Low-discrepancy sequence
+    d : int
+        Dimension
+    n : int
+        Number of points
+    seed : int, np.random.Generator or None
+        Scrambling seed (None = fresh OS entropy)
+    distribution : str, {'normal', 't', 'mvt', 'uniform'}
+        Target distribution: independent normal, Student-t or uniform
+        marginals, or 'mvt' for a standard multivariate t built as a
+        normal variance mixture (one extra sequence dimension drives the
+        chi-square mixing variable)
+    df : float, optional
+        Degrees of freedom for distribution='t' or 'mvt'
+
+    Returns:
+    --------
+    Z : ndarray, shape (n, d)
+    """
+    if sequence not in QMC_ENGINES:
+        raise ValueError(f"Unknown sequence: {sequence}. Use 'sobol' or 'halton'.")
+
+    dim = d + 1 if distribution == 'mvt' else d
+    with stage('random_generation'):
+        U = QMC_ENGINES[sequence](dim, scramble=True, seed=seed).random(n)
+
+    if distribution == 'normal':
+        with stage('inverse_cdf'):
+            return inverse_normal(U, out=U)
+    elif distribution == 't':
+        with stage('inverse_cdf'):
+            return inverse_t(U, df, out=U)
+    elif distribution == 'mvt':
+        with stage('inverse_cdf'):
+            return multivariate_t_from_uniform(U, df)
+    elif distribution == 'uniform':
+        return U
+    else:
+        raise ValueError(f"Unknown distribution: {distribution}. Use 'normal', 't', 'mvt' or 'uniform'.")
+
+class QMCPointCache:
+    """LRU cache of point sets keyed by (sequence, d, n, seed, distribution, df)"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, sequence, d, n, seed, distribution='normal', df=None):
+        """Return the cached point set, generating and storing it on a miss"""
+        key = (sequence, int(d), int(n), seed, distribution, df)
+
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        Z = generate_qmc_points(sequence, d, n, seed, distribution, df)
+        # Shared between callers, so never hand out a writable view
+        Z.setflags(write=False)
+
+        if Z.nbytes <= self.max_bytes:
+            self._entries[key] = Z
+            self.nbytes += Z.nbytes
+            self._evict()
+
+        return Z
+
+    def resize(self, max_bytes):
+        """Change the byte budget, evicting least recently used entries"""
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            'entries': len(self._entries),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+_default_cache = QMCPointCache()
+
+def qmc_points(sequence, d, n, seed=None, distribution='normal', df=None, fresh=False):
+    """
+    Cached QMC point set
+
+    Only integer seeds are cacheable. With fresh=True (or seed=None / a
+    Generator) a new independent scramble is drawn on every call.
+    """
+    cacheable = isinstance(seed, (int, np.integer)) and not fresh
+    if not cacheable:
+        return generate_qmc_points(sequence, d, n, seed, distribution, df)
+    return _default_cache.get(sequence, d, n, int(seed), distribution, df)
+
+def qmc_cache_info():
+    """Statistics of the module-level point cache"""
+    return _default_cache.info()
+
+def clear_qmc_cache():
+    _default_cache.clear()
+
+def set_qmc_cache_budget(max_bytes):
+    """Change the byte budget of the module-level cache"""
+    _default_cache.resize(max_bytes)
@@ -1,26 +1,34 @@
 import numpy as np
-from scipy.stats import norm
-from scipy.stats.qmc import Sobol, Halton
+from simulation.qmc_cache import qmc_points
+from simulation.rng import correlate_inplace
+from simulation.factorization import cholesky_factor
+from instrumentation import stage
 
-def qmc_sim_sobol(mu, cov, n_sims=10000):
+def qmc_sim_sobol(mu, cov, n_sims=10000, L=None, rng=None, cache=False, out=None):
     """Quasi-Monte Carlo simulation using Sobol sequence"""
     d = len(mu)
-    sobol = Sobol(d, scramble=True)
-    U = sobol.random(n_sims)
-    Z = norm.ppf(U)
-    L = np.linalg.cholesky(cov)
-    return mu + Z @ L.T
+    Z = qmc_points('sobol', d, n_sims, seed=rng, fresh=not cache)
+    if L is None:
+        L = cholesky_factor(cov)
+    with stage('projection'):
+        if out is not None:
+            np.copyto(out, Z)
+            return correlate_inplace(out, L, mu)
+        return mu + Z @ L.T
 
-def qmc_sim_halton(mu, cov, n_sims=10000):
+def qmc_sim_halton(mu, cov, n_sims=10000, L=None, rng=None, cache=False, out=None):
     """Quasi-Monte Carlo simulation using Halton sequence"""
     d = len(mu)
-    halton = Halton(d, scramble=True)
-    U = halton.random(n_sims)
-    Z = norm.ppf(U)
-    L = np.linalg.cholesky(cov)
-    return mu + Z @ L.T
+    Z = qmc_points('halton', d, n_sims, seed=rng, fresh=not cache)
+    if L is None:
+        L = cholesky_factor(cov)
+    with stage('projection'):
+        if out is not None:
+            np.copyto(out, Z)
+            return correlate_inplace(out, L, mu)
+        return mu + Z @ L.T
 
-def qmc_sim(mu, cov, n_sims=10000, method='sobol'):
+def qmc_sim(mu, cov, n_sims=10000, method='sobol', L=None, rng=None, cache=False, out=None):
     """
     Quasi-Monte Carlo simulation with selectable sequence
 
@@ -34,6 +42,15 @@ def qmc_sim(mu, cov, n_sims=10000, method='sobol'):
         Number of scenarios
     method : str, {'sobol', 'halton'}
         QMC sequence type
+    L : ndarray, shape (d, d), optional
+        Precomputed lower Cholesky factor of cov
+    rng : np.random.Generator or int, optional
+        Seed for the scrambling (default: fresh OS entropy)
+    cache : bool
+        Reuse the normal point set for an integer rng seed instead of
+        regenerating it (see simulation.qmc_cache)
+    out : ndarray, shape (n_sims, d), optional
+        Preallocated buffer that receives the scenarios
 
     Returns:
     --------
@@ -41,8 +58,8 @@ def qmc_sim(mu, cov, n_sims=10000, method='sobol'):
         Simulated scenarios
     """
     if method == 'sobol':
-        return qmc_sim_sobol(mu, cov, n_sims)
+        return qmc_sim_sobol(mu, cov, n_sims, L, rng, cache, out)
     elif method == 'halton':
-        return qmc_sim_halton(mu, cov, n_sims)
+        return qmc_sim_halton(mu, cov, n_sims, L, rng, cache, out)
     else:
         raise ValueError(f"Unknown method: {method}. Use 'sobol' or 'halton'.")
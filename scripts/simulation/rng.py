@@ -0,0 +1,76 @@
+"""
+Random number generator construction and stream spawning
+
+All simulators accept an explicit np.random.Generator so experiments are
+reproducible and safe to parallelize: a root seed is turned into a
+SeedSequence whose spawned children give statistically independent streams
+per worker / run / day.
+"""
+
+import numpy as np
+
+BIT_GENERATORS = {
+    'pcg64': np.random.PCG64,
+    'pcg64dxsm': np.random.PCG64DXSM,
+    'philox': np.random.Philox
+}
+
+def _bit_generator_cls(bit_generator):
+    if bit_generator not in BIT_GENERATORS:
+        raise ValueError(f"Unknown bit_generator: {bit_generator}. "
+                         f"Use one of {sorted(BIT_GENERATORS)}.")
+    return BIT_GENERATORS[bit_generator]
+
+def as_seed_sequence(seed=None):
+    """SeedSequence from an int, a SeedSequence or None (OS entropy)"""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+def make_rng(seed=None, bit_generator='pcg64'):
+    """
+    Build a np.random.Generator
+
+    Parameters:
+    -----------
+    seed : None, int, SeedSequence or Generator
+        Generators are returned unchanged; anything else seeds a new one
+    bit_generator : str, {'pcg64', 'pcg64dxsm', 'philox'}
+        Underlying bit generator. 'pcg64' matches np.random.default_rng
+
+    Returns:
+    --------
+    rng : np.random.Generator
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(_bit_generator_cls(bit_generator)(as_seed_sequence(seed)))
+
+def spawn_seeds(seed, n):
+    """n independent child SeedSequences of a root seed"""
+    return as_seed_sequence(seed).spawn(n)
+
+def spawn_rngs(seed, n, bit_generator='pcg64'):
+    """
+    n independent Generators, e.g. one per worker or per run
+
+    A Generator seed spawns from its bit generator's SeedSequence, so the
+    parent stream itself is not consumed.
+    """
+    if isinstance(seed, np.random.Generator):
+        return [np.random.Generator(type(seed.bit_generator)(child))
+                for child in seed.bit_generator.seed_seq.spawn(n)]
+    return [make_rng(child, bit_generator) for child in spawn_seeds(seed, n)]
+
+def correlate_inplace(Z, L, mu=None):
+    """
+    Overwrite Z (n, d) with mu + Z @ L.T for lower-triangular L
+
+    Column j of the result only depends on columns 0..j of Z, so filling
+    columns from last to first needs no second (n, d) array.
+    """
+    for j in range(Z.shape[1] - 1, -1, -1):
+        Z[:, j] = Z[:, :j + 1] @ L[j, :j + 1]
+    if mu is not None:
+        Z += mu
+    return Z
@@ -0,0 +1,183 @@
+"""
+Randomized QMC with independent scrambles and built-in error estimates
+
+A single scrambled Sobol/Halton point set gives an unbiased estimate but
+no error bar. Drawing R independently scrambled replicates (scipy's
+linear matrix scrambling plus digital shift, one engine per replicate)
+turns the R estimates into i.i.d. samples, so their spread gives a
+standard error and a Student-t confidence interval from one call instead
+of 50-100 reruns.
+
+Sobol replicates use random_base2(m), i.e. n = 2**m points, which keeps
+the balance properties of the sequence (and avoids scipy's warning for
+sizes such as n = 10000).
+"""
+
+import numpy as np
+from scipy import stats
+from simulation.qmc_cache import QMC_ENGINES
+from simulation.portfolio_sim import DISTRIBUTIONS
+from simulation.transforms import inverse_normal, inverse_t, multivariate_t_from_uniform
+from simulation.rng import spawn_rngs
+from simulation.factorization import cholesky_factor
+from var_cvar.var_cvar import tail_stats
+from instrumentation import stage
+
+def _replicate_engines(sequence, dim, n_replicates, rng):
+    """n_replicates independently scrambled engines"""
+    if sequence not in QMC_ENGINES:
+        raise ValueError(f"Unknown sequence: {sequence}. Use 'sobol' or 'halton'.")
+    # A Generator is consumed sequentially; seeds are spawned into independent streams
+    if isinstance(rng, np.random.Generator):
+        seeds = [rng] * n_replicates
+    else:
+        seeds = spawn_rngs(rng, n_replicates)
+    return [QMC_ENGINES[sequence](dim, scramble=True, seed=seed) for seed in seeds]
+
+def _standard_from_uniform(U, distribution, df):
+    """Map (..., n, dim) uniforms to standard draws, in place where possible"""
+    if distribution == 'normal':
+        return inverse_normal(U, out=U)
+    if distribution == 't':
+        return inverse_t(U, df, out=U)
+    dim = U.shape[-1]
+    Z = multivariate_t_from_uniform(U.reshape(-1, dim), df)
+    return Z.reshape(U.shape[:-1] + (dim - 1,))
+
+def _portfolio_loading(mu, cov, weights, distribution, df, L=None):
+    """mean return mu @ w and loading L.T @ w (variance-scaled for t) of a portfolio"""
+    if L is None:
+        L = cholesky_factor(cov)
+    loading = L.T @ weights
+    # Student-t variance scaling as in simulation.portfolio_sim
+    if distribution != 'normal' and df > 2:
+        loading = loading * np.sqrt((df - 2) / df)
+    return mu @ weights, loading
+
+def rqmc_points(d, m, n_replicates=16, sequence='sobol', distribution='normal', df=5, rng=None):
+    """
+    Standard draws of n_replicates independently scrambled point sets
+
+    Parameters:
+    -----------
+    d : int
+        Dimension
+    m : int
+        log2 of the points per replicate (n = 2**m)
+    n_replicates : int
+        Number of independent scrambles R
+    sequence : str, {'sobol', 'halton'}
+    distribution : str, {'normal', 't', 'mvt'}
+        As in simulation.portfolio_sim ('mvt' uses one extra dimension)
+    df : float
+        Degrees of freedom for 't' and 'mvt'
+    rng : int, SeedSequence or Generator, optional
+        Source of the scrambles (None = OS entropy)
+
+    Returns:
+    --------
+    Z : ndarray, shape (n_replicates, 2**m, d)
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}. Use 'normal', 't' or 'mvt'.")
+
+    n = 2 ** m
+    dim = d + 1 if distribution == 'mvt' else d
+    engines = _replicate_engines(sequence, dim, n_replicates, rng)
+
+    U = np.empty((n_replicates, n, dim))
+    with stage('random_generation'):
+        for r, engine in enumerate(engines):
+            U[r] = engine.random_base2(m) if sequence == 'sobol' else engine.random(n)
+
+    # One inverse transform over every replicate
+    with stage('inverse_cdf'):
+        return _standard_from_uniform(U, distribution, df)
+
+def rqmc_portfolio_returns(mu, cov, weights, m=13, n_replicates=16, sequence='sobol',
+                           distribution='normal', df=5, L=None, rng=None):
+    """
+    Portfolio returns of every RQMC replicate (see rqmc_points)
+
+    Returns:
+    --------
+    portfolio_returns : ndarray, shape (n_replicates, 2**m)
+    """
+    mu = np.asarray(mu, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    mean_ret, loading = _portfolio_loading(mu, cov, weights, distribution, df, L)
+
+    Z = rqmc_points(len(mu), m, n_replicates, sequence, distribution, df, rng)
+    with stage('projection'):
+        portfolio_returns = Z @ loading
+        portfolio_returns += mean_ret
+    return portfolio_returns
+
+def replicate_summary(estimates, confidence=0.95):
+    """
+    Mean, standard error and Student-t confidence interval of i.i.d.
+    replicate estimates (along axis 0)
+
+    Returns:
+    --------
+    mean, se, ci_low, ci_high : ndarray, shape estimates.shape[1:]
+    """
+    estimates = np.asarray(estimates, dtype=float)
+    R = estimates.shape[0]
+    mean = estimates.mean(axis=0)
+    se = estimates.std(axis=0, ddof=1) / np.sqrt(R)
+    half_width = stats.t.ppf(0.5 + confidence / 2, df=R - 1) * se
+    return mean, se, mean - half_width, mean + half_width
+
+def rqmc_var_cvar(mu, cov, weights, m=13, n_replicates=16, alpha=0.95, sequence='sobol',
+                  distribution='normal', df=5, confidence=0.95, L=None, rng=None):
+    """
+    RQMC VaR/CVaR estimate with its standard error from one call
+
+    Parameters:
+    -----------
+    mu, cov, weights : array-like
+        Mean vector, covariance matrix and portfolio weights
+    m : int
+        log2 of the scenarios per replicate (default 2**13 = 8192)
+    n_replicates : int
+        Number of independent scrambles R (>= 2)
+    alpha : float or array-like
+        VaR confidence level(s)
+    sequence, distribution, df, L, rng :
+        As in rqmc_portfolio_returns
+    confidence : float
+        Coverage of the confidence intervals
+
+    Returns:
+    --------
+    results : dict
+        var, cvar : replicate means (the RQMC estimates)
+        var_se, cvar_se : standard errors of those means
+        var_ci, cvar_ci : (low, high) confidence intervals
+        var_replicates, cvar_replicates : per-replicate estimates, shape
+            (n_replicates,) or (n_replicates, k) for k alphas
+        n_sims : scenarios per replicate; n_replicates
+    """
+    if n_replicates < 2:
+        raise ValueError("RQMC error estimates need at least 2 replicates")
+
+    portfolio_returns = rqmc_portfolio_returns(mu, cov, weights, m, n_replicates, sequence,
+                                               distribution, df, L, rng)
+    var_reps, cvar_reps = tail_stats(portfolio_returns, alpha)
+
+    var_mean, var_se, var_low, var_high = replicate_summary(var_reps, confidence)
+    cvar_mean, cvar_se, cvar_low, cvar_high = replicate_summary(cvar_reps, confidence)
+
+    return {
+        'var': var_mean,
+        'cvar': cvar_mean,
+        'var_se': var_se,
+        'cvar_se': cvar_se,
+        'var_ci': (var_low, var_high),
+        'cvar_ci': (cvar_low, cvar_high),
+        'var_replicates': var_reps,
+        'cvar_replicates': cvar_reps,
+        'n_sims': 2 ** m,
+        'n_replicates': n_replicates
+    }
@@ -0,0 +1,134 @@
+"""
+Persistent on-disk store of simulated scenario sets
+
+Large reference simulations (hundreds of thousands of paths) are generated
+once with an explicit seed, written in chunks to .npy files under
+data/scenarios/ and reopened as read-only memory maps on later runs. Files
+are keyed by a SHA-256 hash of (mu, cov, weights, generator, seed, n), so
+any experiment asking for the same reference set gets the same file.
+"""
+
+import os
+import hashlib
+import numpy as np
+from pathlib import Path
+from numpy.lib.format import open_memmap
+from simulation.qmc_cache import QMC_ENGINES
+from simulation.transforms import inverse_normal
+from simulation.factorization import cholesky_factor
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SCENARIO_PATH = PROJECT_ROOT / "data" / "scenarios"
+
+# Rows generated per chunk while writing (bounded memory for any n)
+DEFAULT_CHUNK_ROWS = 2 ** 16
+
+GENERATORS = ('mc', 'sobol', 'halton')
+
+def scenario_key(mu, cov, generator, seed, n, weights=None):
+    """SHA-256 key of a scenario set definition"""
+    h = hashlib.sha256()
+    h.update(f"{generator}|{seed}|{int(n)}|".encode())
+    for arr in (mu, cov, weights):
+        if arr is None:
+            h.update(b"none|")
+        else:
+            arr = np.ascontiguousarray(arr, dtype=np.float64)
+            h.update(str(arr.shape).encode())
+            h.update(arr.tobytes())
+    return h.hexdigest()
+
+class ScenarioStore:
+    """Directory of memory-mapped scenario sets keyed by scenario_key"""
+
+    def __init__(self, root=SCENARIO_PATH, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.root = Path(root)
+        self.chunk_rows = chunk_rows
+
+    def path(self, key):
+        return self.root / f"{key}.npy"
+
+    def get(self, mu, cov, n, generator='mc', seed=0, weights=None):
+        """
+        Return a scenario set, generating and saving it on first use
+
+        Parameters:
+        -----------
+        mu : array-like, shape (d,)
+            Mean vector
+        cov : array-like, shape (d, d)
+            Covariance matrix
+        n : int
+            Number of scenarios
+        generator : str, {'mc', 'sobol', 'halton'}
+            Sampling method
+        seed : int
+            Seed of the generator (MC stream or QMC scramble)
+        weights : array-like, shape (d,), optional
+            If given, only portfolio returns are stored
+
+        Returns:
+        --------
+        scenarios : np.memmap (read-only), shape (n, d) or (n,)
+        """
+        if generator not in GENERATORS:
+            raise ValueError(f"Unknown generator: {generator}. Use 'mc', 'sobol' or 'halton'.")
+        if seed is None:
+            raise ValueError("Stored scenarios need an explicit integer seed")
+
+        key = scenario_key(mu, cov, generator, seed, n, weights)
+        path = self.path(key)
+        if not path.exists():
+            self._write(path, mu, cov, n, generator, seed, weights)
+        return np.load(path, mmap_mode='r')
+
+    def _write(self, path, mu, cov, n, generator, seed, weights):
+        mu = np.asarray(mu, dtype=float)
+        d = len(mu)
+        L = cholesky_factor(cov)
+
+        if weights is None:
+            shape = (n, d)
+        else:
+            weights = np.asarray(weights, dtype=float)
+            loading = L.T @ weights
+            mean_ret = mu @ weights
+            shape = (n,)
+
+        if generator == 'mc':
+            rng = np.random.default_rng(seed)
+        else:
+            engine = QMC_ENGINES[generator](d, scramble=True, seed=seed)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary name so concurrent readers never see a partial file
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        out = open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=shape)
+
+        for start in range(0, n, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n)
+            if generator == 'mc':
+                Z = rng.standard_normal((stop - start, d))
+            else:
+                Z = inverse_normal(engine.random(stop - start))
+
+            if weights is None:
+                out[start:stop] = mu + Z @ L.T
+            else:
+                out[start:stop] = mean_ret + Z @ loading
+
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Delete every stored scenario set"""
+        if self.root.exists():
+            for path in self.root.glob("*.npy"):
+                path.unlink()
+
+_default_store = ScenarioStore()
+
+def stored_scenarios(mu, cov, n, generator='mc', seed=0, weights=None):
+    """Scenario set from the default store under data/scenarios/"""
+    return _default_store.get(mu, cov, n, generator, seed, weights)
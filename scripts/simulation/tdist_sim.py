@@ -1,14 +1,40 @@
 """
 Multivariate t-distribution simulation for fat-tail robustness testing
 Replaces normal distribution with Student-t to test QMC robustness
+
+By default scenarios follow a true multivariate t, built as the normal
+variance mixture Z * sqrt(ν/W) with Z ~ N(0, I) and one W ~ χ²_ν per
+scenario, so all assets share the same tail shock (tail dependence).
+multivariate=False keeps the older construction of d independent t_ν
+marginals correlated through the Cholesky factor.
 """
 
 import numpy as np
 from scipy.stats import t as student_t
-from scipy.stats.qmc import Sobol, Halton
-from scipy.stats import norm
-
-def mc_sim_tdist(mu, cov, n_sims=10000, df=5):
+from simulation.qmc_cache import qmc_points
+from simulation.rng import make_rng, correlate_inplace
+from simulation.factorization import cholesky_factor
+from instrumentation import stage
+
+def _finish(mu, cov, Z, df, L, out):
+    """Variance-scale t variates and apply mean / correlation"""
+    if L is None:
+        L = cholesky_factor(cov)
+
+    with stage('projection'):
+        if out is not None:
+            np.copyto(out, Z)
+            Z = out
+            # Scale to match Student-t variance: Var(t_ν) = ν/(ν-2) for ν > 2
+            if df > 2:
+                Z *= np.sqrt((df - 2) / df)
+            return correlate_inplace(Z, L, mu)
+
+        if df > 2:
+            Z = Z * np.sqrt((df - 2) / df)
+        return mu + Z @ L.T
+
+def mc_sim_tdist(mu, cov, n_sims=10000, df=5, L=None, rng=None, out=None, multivariate=True):
     """
     Monte Carlo simulation with multivariate t-distribution
 
@@ -17,31 +43,35 @@ def mc_sim_tdist(mu, cov, n_sims=10000, df=5):
         cov: Covariance matrix (d, d)
         n_sims: Number of scenarios
         df: Degrees of freedom (ν). Lower = fatter tails
+        L: Optional precomputed lower Cholesky factor of cov
+        rng: Generator, SeedSequence or int (None = global np.random state)
+        out: Optional preallocated (n_sims, d) buffer for the scenarios
+        multivariate: Normal variance mixture (True) or independent t marginals
 
     Returns:
         scenarios: (n_sims, d) array of simulated returns
     """
     d = len(mu)
-
-    # Generate standard t-distributed variables
-    # Method: Z ~ t_ν for each dimension, then correlate via Cholesky
-    Z = student_t.rvs(df=df, size=(n_sims, d))
-
-    # Scale to match Student-t variance
-    # Var(t_ν) = ν/(ν-2) for ν > 2
-    if df > 2:
-        Z = Z * np.sqrt((df - 2) / df)
-
-    # Apply correlation structure via Cholesky
-    L = np.linalg.cholesky(cov)
-    correlated_Z = Z @ L.T
-
-    # Add mean
-    scenarios = mu + correlated_Z
-
-    return scenarios
-
-def qmc_sim_tdist_sobol(mu, cov, n_sims=10000, df=5):
+    random_state = None if rng is None else make_rng(rng)
+
+    with stage('random_generation'):
+        if multivariate:
+            # d normals plus one chi-square per scenario: Z * sqrt(ν / W)
+            if random_state is None:
+                Z = np.random.randn(n_sims, d)
+                W = np.random.chisquare(df, n_sims)
+            else:
+                Z = random_state.standard_normal((n_sims, d))
+                W = random_state.chisquare(df, n_sims)
+            Z *= np.sqrt(df / W)[:, None]
+        else:
+            # Z ~ t_ν for each dimension, then correlate via Cholesky
+            Z = student_t.rvs(df=df, size=(n_sims, d), random_state=random_state)
+
+    return _finish(mu, cov, Z, df, L, out)
+
+def qmc_sim_tdist_sobol(mu, cov, n_sims=10000, df=5, L=None, rng=None, cache=False, out=None,
+                        multivariate=True):
     """
     Quasi-Monte Carlo simulation with Sobol sequence + t-distribution
 
@@ -50,66 +80,50 @@ def qmc_sim_tdist_sobol(mu, cov, n_sims=10000, df=5):
         cov: Covariance matrix (d, d)
         n_sims: Number of scenarios
         df: Degrees of freedom
+        L: Optional precomputed lower Cholesky factor of cov
+        rng: Generator or int seed for the scrambling (None = OS entropy)
+        cache: Reuse the t point set for an integer rng seed
+        out: Optional preallocated (n_sims, d) buffer for the scenarios
+        multivariate: Normal variance mixture, with W driven by one extra
+            Sobol dimension (True), or independent t marginals
 
     Returns:
         scenarios: (n_sims, d) array
     """
     d = len(mu)
 
-    # Generate Sobol sequence in [0,1]^d
-    sobol = Sobol(d, scramble=True)
-    U = sobol.random(n_sims)
+    # Scrambled Sobol points mapped to t_ν via the inverse CDF
+    distribution = 'mvt' if multivariate else 't'
+    Z = qmc_points('sobol', d, n_sims, seed=rng, distribution=distribution, df=df, fresh=not cache)
 
-    # Transform uniform to t-distributed via inverse CDF
-    Z = student_t.ppf(U, df=df)
+    return _finish(mu, cov, Z, df, L, out)
 
-    # Scale for variance
-    if df > 2:
-        Z = Z * np.sqrt((df - 2) / df)
-
-    # Apply correlation
-    L = np.linalg.cholesky(cov)
-    correlated_Z = Z @ L.T
-
-    scenarios = mu + correlated_Z
-
-    return scenarios
-
-def qmc_sim_tdist_halton(mu, cov, n_sims=10000, df=5):
+def qmc_sim_tdist_halton(mu, cov, n_sims=10000, df=5, L=None, rng=None, cache=False, out=None,
+                         multivariate=True):
     """
     Quasi-Monte Carlo simulation with Halton sequence + t-distribution
+    (arguments as in qmc_sim_tdist_sobol)
     """
     d = len(mu)
 
-    # Generate Halton sequence
-    halton = Halton(d, scramble=True)
-    U = halton.random(n_sims)
-
-    # Transform to t-distribution
-    Z = student_t.ppf(U, df=df)
-
-    # Scale
-    if df > 2:
-        Z = Z * np.sqrt((df - 2) / df)
-
-    # Correlate
-    L = np.linalg.cholesky(cov)
-    correlated_Z = Z @ L.T
-
-    scenarios = mu + correlated_Z
+    # Scrambled Halton points mapped to t_ν via the inverse CDF
+    distribution = 'mvt' if multivariate else 't'
+    Z = qmc_points('halton', d, n_sims, seed=rng, distribution=distribution, df=df, fresh=not cache)
 
-    return scenarios
+    return _finish(mu, cov, Z, df, L, out)
 
-def qmc_sim_tdist(mu, cov, n_sims=10000, df=5, method='sobol'):
+def qmc_sim_tdist(mu, cov, n_sims=10000, df=5, method='sobol', L=None, rng=None,
+                  cache=False, out=None, multivariate=True):
     """
     Unified interface for t-distribution QMC simulation
 
     Args:
         method: 'sobol' or 'halton'
+        (other arguments as in qmc_sim_tdist_sobol)
     """
     if method == 'sobol':
-        return qmc_sim_tdist_sobol(mu, cov, n_sims, df)
+        return qmc_sim_tdist_sobol(mu, cov, n_sims, df, L, rng, cache, out, multivariate)
     elif method == 'halton':
-        return qmc_sim_tdist_halton(mu, cov, n_sims, df)
+        return qmc_sim_tdist_halton(mu, cov, n_sims, df, L, rng, cache, out, multivariate)
     else:
         raise ValueError(f"Unknown method: {method}")
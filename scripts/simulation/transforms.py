@@ -0,0 +1,298 @@
+"""
+Inverse-CDF transforms that map uniform (QMC) points to normal and Student-t variates
+
+- inverse_normal: scipy.special.ndtri by default (Cephes rational
+  approximation, full double precision). Acklam's rational approximation
+  with one Halley refinement step is available as method='acklam'; in
+  NumPy it needs several passes over the data and benchmarks slower than
+  ndtri, so it is not the default.
+- inverse_t: Student-t quantiles from a per-df lookup table. The map
+  x -> t_ν^{-1}(Φ(x)) is smooth in x = Φ^{-1}(u), and asinh of it grows
+  only quadratically in the tails, so a cubic Hermite interpolant of
+  asinh(t_ν^{-1}(Φ(x))) on a uniform x grid reproduces scipy's stdtrit to
+  ~1e-11 relative error. Evaluating it costs one ndtri, a table lookup and
+  a sinh, roughly 10x faster than the iterative stdtrit. Points beyond the
+  table (|x| > TABLE_BOUND, i.e. u below ~6e-16) fall back to scipy.
+- mixing_scale / multivariate_t_from_uniform: the chi-square mixing
+  factor sqrt(ν/W) of the multivariate t, tabulated the same way, and
+  the map of (d + 1)-dimensional uniform points to multivariate t draws.
+
+Tables are built once per degrees of freedom and cached.
+"""
+
+from functools import lru_cache, wraps
+
+import numpy as np
+from scipy.special import ndtri, ndtr, stdtrit, erfc, gammaincinv, gammainccinv
+from scipy.stats import chi2
+from scipy.stats import t as student_t
+
+# Tabulated range of x = Φ^{-1}(u) and grid spacing of the inverse-t table
+TABLE_BOUND = 8.0
+TABLE_STEP = 1 / 128
+
+# Acklam's coefficients: central region |u - 0.5| <= 0.5 - ACKLAM_SPLIT
+ACKLAM_SPLIT = 0.02425
+_ACKLAM_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+             1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_ACKLAM_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+             6.680131188771972e+01, -1.328068155288572e+01)
+_ACKLAM_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+             -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_ACKLAM_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+             3.754408661907416e+00)
+
+def _polyval(coefs, x):
+    """Horner evaluation with the highest-order coefficient first"""
+    result = np.full_like(x, coefs[0])
+    for c in coefs[1:]:
+        result *= x
+        result += c
+    return result
+
+def _accepts_scalars(func):
+    """Run a 0-d input through a 1-element array (the kernels assign by mask and into out=)"""
+    @wraps(func)
+    def wrapper(u, *args, **kwargs):
+        if np.ndim(u) != 0:
+            return func(u, *args, **kwargs)
+        out = kwargs.pop('out', None)
+        value = func(np.reshape(np.asarray(u, dtype=float), 1), *args, **kwargs)[0]
+        if out is None:
+            return value
+        out[...] = value
+        return out
+    return wrapper
+
+@_accepts_scalars
+def acklam_ndtri(u):
+    """
+    Acklam's rational approximation of the inverse normal CDF
+
+    The raw approximation has relative error below 1.15e-9; one Halley
+    step against erfc brings it to double precision.
+    """
+    u = np.asarray(u, dtype=float)
+
+    q = u - 0.5
+    r = q * q
+    x = _polyval(_ACKLAM_A, r) * q / (_polyval(_ACKLAM_B, r) * r + 1)
+
+    tail = (u < ACKLAM_SPLIT) | (u > 1 - ACKLAM_SPLIT)
+    if np.any(tail):
+        p = np.minimum(u[tail], 1 - u[tail])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.sqrt(-2 * np.log(p))
+            x_tail = _polyval(_ACKLAM_C, s) / (_polyval(_ACKLAM_D, s) * s + 1)
+        x[tail] = np.where(u[tail] < 0.5, x_tail, -x_tail)
+
+    # Halley refinement on the lower half (1 - u is exact for u > 0.5):
+    # e = Φ(x) - p, x -= e / (φ(x) + x e / 2)
+    upper = u > 0.5
+    p = np.where(upper, 1 - u, u)
+    x = -np.abs(x)
+    with np.errstate(over='ignore', invalid='ignore'):
+        e = 0.5 * erfc(-x / np.sqrt(2)) - p
+        w = e * np.sqrt(2 * np.pi) * np.exp(x * x / 2)
+        x -= w / (1 + x * w / 2)
+    x[upper] *= -1
+
+    x[u == 0] = -np.inf
+    x[u == 1] = np.inf
+    return x
+
+def inverse_normal(u, out=None, method='ndtri'):
+    """
+    Standard normal quantiles of u
+
+    Parameters:
+    -----------
+    u : array-like
+        Probabilities in (0, 1)
+    out : ndarray, optional
+        Output buffer (may be u itself for an in-place transform)
+    method : str, {'ndtri', 'acklam'}
+
+    Returns:
+    --------
+    z : ndarray, same shape as u
+    """
+    if method == 'ndtri':
+        return ndtri(u, out=out)
+    if method == 'acklam':
+        z = acklam_ndtri(u)
+        if out is None:
+            return z
+        out[...] = z
+        return out
+    raise ValueError(f"Unknown method: {method}. Use 'ndtri' or 'acklam'.")
+
+def _hermite_coefficients(h, dh):
+    """Per-interval cubic coefficients (c0, c1, c2, c3) from node values and (step-scaled) slopes"""
+    h0, h1, d0, d1 = h[:-1], h[1:], dh[:-1], dh[1:]
+    coefs = (h0, d0, 3 * (h1 - h0) - 2 * d0 - d1, 2 * (h0 - h1) + d0 + d1)
+    return tuple(np.ascontiguousarray(c) for c in coefs)
+
+def _interpolate(u, coefs, out=None):
+    """
+    Evaluate a table over x = Φ^{-1}(u) at the points u
+
+    Returns:
+    --------
+    y : ndarray, same shape as u
+        Interpolated values (meaningless where beyond is True)
+    beyond : ndarray of bool
+        Points outside the table (or NaN)
+    u_beyond : ndarray or None
+        Copy of u at those points, taken before out (possibly u) is written
+    """
+    c0, c1, c2, c3 = coefs
+    s = ndtri(u)
+    beyond = ~(np.abs(s) <= TABLE_BOUND)
+    u_beyond = None
+    if np.any(beyond):
+        u_beyond = u[beyond]
+        s[beyond] = 0.0
+
+    # Interval index and position within it
+    s += TABLE_BOUND
+    s *= 1 / TABLE_STEP
+    i = s.astype(np.intp)
+    np.clip(i, 0, len(c0) - 1, out=i)
+    s -= i
+
+    y = np.take(c3, i, out=out)
+    y *= s
+    y += np.take(c2, i)
+    y *= s
+    y += np.take(c1, i)
+    y *= s
+    y += np.take(c0, i)
+    return y, beyond, u_beyond
+
+@lru_cache(maxsize=32)
+def _t_table(df):
+    """Hermite table of asinh(t_df^{-1}(Φ(x)))"""
+    # Nodes on the left half only, where ndtr is accurate; the map is odd
+    x = np.arange(-TABLE_BOUND, TABLE_STEP / 2, TABLE_STEP)
+    g = stdtrit(df, ndtr(x))
+    g[-1] = 0.0
+    # dg/dx = φ(x) / f_t(g)
+    dg = np.exp(-x * x / 2 - 0.5 * np.log(2 * np.pi) - student_t.logpdf(g, df))
+
+    h = np.arcsinh(g)
+    dh = dg / np.sqrt(1 + g * g) * TABLE_STEP
+    h = np.concatenate([h, -h[-2::-1]])
+    dh = np.concatenate([dh, dh[-2::-1]])
+    return _hermite_coefficients(h, dh)
+
+@_accepts_scalars
+def inverse_t(u, df, out=None, exact=False):
+    """
+    Student-t quantiles of u with df degrees of freedom
+
+    Parameters:
+    -----------
+    u : array-like
+        Probabilities in (0, 1)
+    df : float
+        Degrees of freedom (> 0; np.inf gives normal quantiles)
+    out : ndarray, optional
+        Output buffer (may be u itself for an in-place transform)
+    exact : bool
+        Use scipy.stats.t.ppf instead of the cached table
+
+    Returns:
+    --------
+    t : ndarray, same shape as u
+        Within ~1e-11 relative error of scipy.stats.t.ppf
+    """
+    if not df > 0:
+        raise ValueError(f"Degrees of freedom must be positive, got {df}")
+    if np.isinf(df):
+        return inverse_normal(u, out=out)
+    if exact:
+        t = student_t.ppf(u, df)
+        if out is None:
+            return t
+        out[...] = t
+        return out
+
+    u = np.asarray(u, dtype=float)
+    y, beyond, u_beyond = _interpolate(u, _t_table(float(df)), out)
+    np.sinh(y, out=y)
+
+    # Outside the table (and NaN) the exact quantile is evaluated instead
+    if u_beyond is not None:
+        y[beyond] = student_t.ppf(u_beyond, df)
+    return y
+
+def _chi2_quantile(u, df):
+    """χ²_df quantiles, through the survival function above the median for accuracy"""
+    u = np.asarray(u, dtype=float)
+    upper = u > 0.5
+    return np.where(upper, 2 * gammainccinv(df / 2, 1 - u), 2 * gammaincinv(df / 2, u))
+
+@lru_cache(maxsize=32)
+def _mixing_table(df):
+    """Hermite table of log sqrt(df / W(x)), W(x) = χ²_df^{-1}(Φ(x))"""
+    x = np.arange(-TABLE_BOUND, TABLE_BOUND + TABLE_STEP / 2, TABLE_STEP)
+    W = np.where(x > 0, 2 * gammainccinv(df / 2, ndtr(-x)), 2 * gammaincinv(df / 2, ndtr(x)))
+
+    h = 0.5 * (np.log(df) - np.log(W))
+    # dW/dx = φ(x) / f_χ²(W), dh/dx = -dW/dx / (2 W)
+    dh = -0.5 * np.exp(-x * x / 2 - 0.5 * np.log(2 * np.pi) - chi2.logpdf(W, df) - np.log(W))
+    return _hermite_coefficients(h, dh * TABLE_STEP)
+
+@_accepts_scalars
+def mixing_scale(u, df, out=None):
+    """
+    Normal-variance-mixture scale sqrt(df / W) with W = χ²_df^{-1}(u)
+
+    For independent Z ~ N(0, I) and W ~ χ²_df, Z * sqrt(df / W) is a
+    standard multivariate t with df degrees of freedom. Evaluated from a
+    cached per-df table like inverse_t.
+
+    Parameters:
+    -----------
+    u : array-like
+        Probabilities in (0, 1)
+    df : float
+        Degrees of freedom (> 0)
+    out : ndarray, optional
+        Output buffer (may be u itself)
+
+    Returns:
+    --------
+    scale : ndarray, same shape as u
+        Decreasing in u
+    """
+    if not df > 0:
+        raise ValueError(f"Degrees of freedom must be positive, got {df}")
+
+    u = np.asarray(u, dtype=float)
+    y, beyond, u_beyond = _interpolate(u, _mixing_table(float(df)), out)
+    np.exp(y, out=y)
+
+    if u_beyond is not None:
+        with np.errstate(divide='ignore'):
+            y[beyond] = np.sqrt(df / _chi2_quantile(u_beyond, df))
+    return y
+
+def multivariate_t_from_uniform(U, df, out=None):
+    """
+    Standard multivariate t draws from (n, d + 1) uniform points
+
+    The first column drives the chi-square mixing variable (so it gets the
+    best-distributed coordinate of a low-discrepancy sequence), the other
+    d columns the normal components.
+
+    Returns:
+    --------
+    T : ndarray, shape (n, d)
+    """
+    U = np.asarray(U, dtype=float)
+    scale = mixing_scale(U[:, 0], df)
+    T = inverse_normal(U[:, 1:], out=out)
+    T *= scale[:, None]
+    return T
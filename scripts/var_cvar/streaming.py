@@ -0,0 +1,114 @@
+"""
+Streaming VaR/CVaR with O(tail) memory
+
+For a known total number of scenarios n, VaR at level alpha only depends on
+the order statistics up to position floor((n-1)(1-alpha)) + 1, and CVaR on
+the values at or below VaR. Keeping a bounded buffer of the smallest
+returns seen so far therefore gives tail statistics identical to tail_stats
+on the full sample, while scenarios are generated and discarded chunk by
+chunk.
+"""
+
+import numpy as np
+from simulation.portfolio_sim import DEFAULT_CHUNK_SIZE, standard_chunks
+from simulation.factorization import cholesky_factor
+
+class StreamingTail:
+    """
+    Bounded buffer of the k smallest values of a stream of known length
+
+    Values tied with the current k-th smallest are kept as well, so ties
+    at VaR are counted exactly as in tail_stats.
+    """
+
+    def __init__(self, n_total, alphas=0.95):
+        self.n_total = int(n_total)
+        self.alphas = alphas
+        alpha_arr = np.atleast_1d(np.asarray(alphas, dtype=float))
+
+        # Order-statistic positions of np.quantile's linear interpolation
+        h = (self.n_total - 1) * (1 - alpha_arr)
+        self.lo = np.floor(h).astype(int)
+        self.hi = np.minimum(self.lo + 1, self.n_total - 1)
+        self.frac = h - self.lo
+
+        # Number of smallest values that must be retained
+        self.k = int(self.hi.max()) + 1
+        self.n_seen = 0
+        self.buffer = np.empty(0)
+
+    def update(self, values):
+        """Merge a chunk of values into the tail buffer"""
+        values = np.asarray(values, dtype=float).ravel()
+        self.n_seen += len(values)
+        if self.n_seen > self.n_total:
+            raise ValueError(f"Stream longer than n_total={self.n_total}")
+
+        # Only the chunk's own k smallest (and ties) can enter the tail
+        values = self._smallest(values)
+        self.buffer = self._smallest(np.concatenate([self.buffer, values]))
+
+    def _smallest(self, values):
+        if len(values) <= self.k:
+            return values
+        threshold = np.partition(values, self.k - 1)[self.k - 1]
+        return values[values <= threshold]
+
+    def result(self):
+        """
+        VaR and CVaR of the completed stream
+
+        Returns:
+        --------
+        VaR, CVaR : float for scalar alphas, ndarray of shape (k,) otherwise
+        """
+        if self.n_seen != self.n_total:
+            raise ValueError(f"Stream incomplete: {self.n_seen} of {self.n_total} values seen")
+
+        tail = np.sort(self.buffer)
+        x_lo = tail[self.lo]
+        x_hi = tail[self.hi]
+        VaR = x_lo + self.frac * (x_hi - x_lo)
+
+        # Every value tied with VaR is in the buffer (ties are never evicted)
+        prefix = np.cumsum(tail)
+        tail_sum = prefix[self.lo]
+        tail_count = (self.lo + 1).astype(float)
+        for j in range(len(self.lo)):
+            n_tied = np.sum(tail[self.lo[j] + 1:] == VaR[j])
+            tail_sum[j] += n_tied * VaR[j]
+            tail_count[j] += n_tied
+
+        CVaR = tail_sum / tail_count
+
+        if np.ndim(self.alphas) == 0:
+            return VaR[0], CVaR[0]
+        return VaR, CVaR
+
+def streaming_var_cvar(mu, cov, weights, n_sims, alphas=0.95, method='mc',
+                       distribution='normal', df=5, rng=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Simulate n_sims portfolio returns in chunks and return exact VaR/CVaR
+
+    Memory is O(chunk_size * d + tail size) regardless of n_sims, so 1e7-1e8
+    path reference values fit on a workstation. Arguments follow
+    simulation.portfolio_sim.simulate_portfolio_returns.
+
+    Returns:
+    --------
+    VaR, CVaR : as tail_stats(portfolio_returns, alphas)
+    """
+    mu = np.asarray(mu, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+
+    L = cholesky_factor(cov)
+    loading = L.T @ weights
+    mean_ret = mu @ weights
+    if distribution == 't' and df > 2:
+        loading = loading * np.sqrt((df - 2) / df)
+
+    tail = StreamingTail(n_sims, alphas)
+    for _, _, Z in standard_chunks(len(mu), n_sims, method, distribution, df, rng, chunk_size):
+        tail.update(mean_ret + Z @ loading)
+
+    return tail.result()
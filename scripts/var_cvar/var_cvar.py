@@ -1,6 +1,134 @@
 import numpy as np
+from instrumentation import timed
+
+# Basel / FRTB reporting levels
+DEFAULT_ALPHAS = (0.95, 0.975, 0.99)
+
+@timed('quantile')
+def tail_stats(losses, alphas=0.95):
+    """
+    Selection-based VaR/CVaR kernel
+
+    Uses a single np.partition over the order statistics needed by every
+    alpha (no full sort, no boolean tail mask). VaR matches
+    np.quantile(losses, 1 - alpha) with linear interpolation; CVaR is the
+    mean of the order statistics at or below VaR.
+
+    Parameters:
+    -----------
+    losses : array-like, shape (..., n)
+        Portfolio returns; statistics are taken along the last axis so
+        leading axes (runs, days, ...) are evaluated in one pass
+    alphas : float or array-like, shape (k,)
+        VaR confidence level(s)
+
+    Returns:
+    --------
+    VaR, CVaR : ndarray, shape (...) for scalar alphas, (..., k) otherwise
+    """
+    losses = np.asarray(losses, dtype=float)
+    n = losses.shape[-1]
+    alpha_arr = np.atleast_1d(np.asarray(alphas, dtype=float))
+
+    # Order-statistic positions of np.quantile's linear interpolation
+    h = (n - 1) * (1 - alpha_arr)
+    lo = np.floor(h).astype(int)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = h - lo
+
+    kth = np.union1d(lo, hi)
+    part = np.partition(losses, kth, axis=-1)
+
+    x_lo = part[..., lo]
+    x_hi = part[..., hi]
+    VaR = x_lo + frac * (x_hi - x_lo)
+
+    # Partitioning around every kth makes each prefix the k smallest values
+    prefix = np.cumsum(part[..., :lo.max() + 1], axis=-1)
+    tail_sum = prefix[..., lo]
+    tail_count = np.broadcast_to(lo + 1, tail_sum.shape).astype(float)
+
+    # Values tied with VaR above position lo also belong to the tail;
+    # only possible for discrete data, so the extra scan is rarely taken
+    ties = (x_hi <= VaR) & (hi > lo)
+    for j in np.flatnonzero(ties.reshape(-1, len(lo)).any(axis=0)):
+        n_tied = np.sum(part[..., lo[j] + 1:] == VaR[..., j:j + 1], axis=-1)
+        tail_sum[..., j] += n_tied * VaR[..., j]
+        tail_count[..., j] += n_tied
+
+    CVaR = tail_sum / tail_count
+
+    if np.ndim(alphas) == 0:
+        return VaR[..., 0][()], CVaR[..., 0][()]
+    return VaR, CVaR
 
 def var_cvar(losses, alpha=0.95):
-    VaR = np.quantile(losses, 1 - alpha)
-    CVaR = losses[losses <= VaR].mean()
+    """
+    VaR and CVaR of simulated portfolio returns
+
+    alpha may be a float or a vector of confidence levels; with a vector,
+    arrays of VaR/CVaR (one per level) are returned from one partition.
+    """
+    return tail_stats(losses, alpha)
+
+@timed('quantile')
+def weighted_var_cvar(losses, weights, alpha=0.95, normalize=False):
+    """
+    VaR and CVaR of weighted scenarios, e.g. importance-sampling output
+
+    The return distribution is estimated as
+    F(x) = sum(w_i * [x_i <= x]) / n, VaR is the smallest scenario with
+    F(VaR) >= 1 - alpha and CVaR is the weighted mean of the returns below
+    it, with VaR filling the remaining probability mass up to 1 - alpha.
+    With unit weights this is the empirical quantile (lower order
+    statistic, no interpolation) and the plain tail mean.
+
+    Parameters:
+    -----------
+    losses : array-like, shape (n,)
+        Portfolio returns
+    weights : array-like, shape (n,)
+        Scenario weights (likelihood ratios)
+    alpha : float or array-like, shape (k,)
+        VaR confidence level(s)
+    normalize : bool
+        Divide by sum(weights) instead of n (self-normalized estimator)
+
+    Returns:
+    --------
+    VaR, CVaR : float, or ndarray of shape (k,) for array alphas
+    """
+    losses = np.asarray(losses, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    p = 1 - np.atleast_1d(np.asarray(alpha, dtype=float))
+
+    order = np.argsort(losses)
+    x = losses[order]
+    w = weights[order] / (weights.sum() if normalize else len(x))
+
+    cdf = np.cumsum(w)
+    k = np.minimum(np.searchsorted(cdf, p), len(x) - 1)
+    VaR = x[k]
+
+    # Mass strictly below VaR, then top up to p at VaR
+    mass_below = cdf[k] - w[k]
+    sum_below = np.cumsum(w * x)[k] - w[k] * x[k]
+    CVaR = (sum_below + VaR * (p - mass_below)) / p
+
+    if np.ndim(alpha) == 0:
+        return VaR[0], CVaR[0]
     return VaR, CVaR
+
+def risk_report(losses, alphas=DEFAULT_ALPHAS):
+    """
+    Multi-confidence-level risk report from a single scenario set
+
+    Returns:
+    --------
+    report : dict
+        {alpha: (VaR, CVaR)} for every requested level; values keep any
+        leading batch shape of losses
+    """
+    levels = np.atleast_1d(alphas)
+    VaR, CVaR = tail_stats(losses, levels)
+    return {float(a): (VaR[..., j], CVaR[..., j]) for j, a in enumerate(levels)}